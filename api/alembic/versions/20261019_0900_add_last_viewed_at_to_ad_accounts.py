@@ -0,0 +1,26 @@
+"""Add last_viewed_at column to ad_accounts
+
+Revision ID: b7c1d2e3f4a5
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-19
+
+Tracks the last dashboard view of an account so the cron scheduler
+can prioritize refreshes of accounts users actually look at.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'b7c1d2e3f4a5'
+down_revision = 'a1b2c3d4e5f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('ad_accounts', sa.Column('last_viewed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('ad_accounts', 'last_viewed_at')
@@ -0,0 +1,43 @@
+"""Add graph_circuits table (circuit breaker per token / ad account)
+
+Revision ID: c2d3e4f5a6b7
+Revises: b7c1d2e3f4a5
+Create Date: 2026-10-19
+
+Stores the circuit breaker state for Meta auth/permission errors
+(190, 200, 10, 403), shared by the cron, the scheduler and the API.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'c2d3e4f5a6b7'
+down_revision = 'b7c1d2e3f4a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('graph_circuits',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('key', sa.String(length=320), nullable=False),
+    sa.Column('tenant_id', sa.UUID(), nullable=False),
+    sa.Column('fb_account_id', sa.String(length=255), nullable=True),
+    sa.Column('state', sa.Enum('CLOSED', 'OPEN', 'HALF_OPEN', name='circuitstate'), nullable=False),
+    sa.Column('failures', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('last_error_code', sa.Integer(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('opened_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('next_probe_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('probe_started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key', name='uq_graph_circuits_key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('graph_circuits')
+    sa.Enum(name='circuitstate').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,28 @@
+"""Add next_refresh_at column to ad_accounts
+
+Revision ID: d3e4f5a6b7c8
+Revises: c2d3e4f5a6b7
+Create Date: 2026-10-19
+
+Per-account due time written after each refresh (cadence + jitter),
+polled by the long-running refresh worker.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'd3e4f5a6b7c8'
+down_revision = 'c2d3e4f5a6b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('ad_accounts', sa.Column('next_refresh_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_ad_accounts_next_refresh_at'), 'ad_accounts', ['next_refresh_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ad_accounts_next_refresh_at'), table_name='ad_accounts')
+    op.drop_column('ad_accounts', 'next_refresh_at')
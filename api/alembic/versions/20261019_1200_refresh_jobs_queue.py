@@ -0,0 +1,53 @@
+"""Turn refresh_jobs into a claimable queue (priority, source, lease, attempts)
+
+Revision ID: e4f5a6b7c8d9
+Revises: d3e4f5a6b7c8
+Create Date: 2026-10-19
+
+Workers claim QUEUED jobs with SELECT ... FOR UPDATE SKIP LOCKED, by
+priority then age. A partial unique index keeps one active job per account.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'e4f5a6b7c8d9'
+down_revision = 'd3e4f5a6b7c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('refresh_jobs', sa.Column('priority', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('refresh_jobs', sa.Column('source', sa.String(length=20), server_default='api', nullable=False))
+    op.add_column('refresh_jobs', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('refresh_jobs', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+
+    # Doublons actifs hérités (BackgroundTasks perdus au redémarrage): garder le plus récent
+    op.execute("""
+        UPDATE refresh_jobs AS old SET status = 'ERROR', finished_at = now(),
+            error = 'Superseded by a newer job (queue migration)'
+        WHERE old.status IN ('QUEUED', 'RUNNING')
+          AND EXISTS (
+            SELECT 1 FROM refresh_jobs AS newer
+            WHERE newer.ad_account_id = old.ad_account_id
+              AND newer.status IN ('QUEUED', 'RUNNING')
+              AND (newer.created_at, newer.id) > (old.created_at, old.id)
+          )
+    """)
+
+    op.create_index('ix_refresh_jobs_queue', 'refresh_jobs', ['status', 'priority', 'created_at'], unique=False)
+    op.create_index(
+        'uq_refresh_jobs_active_account', 'refresh_jobs', ['ad_account_id'], unique=True,
+        postgresql_where=sa.text("status IN ('QUEUED', 'RUNNING')")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_refresh_jobs_active_account', table_name='refresh_jobs')
+    op.drop_index('ix_refresh_jobs_queue', table_name='refresh_jobs')
+    op.drop_column('refresh_jobs', 'attempts')
+    op.drop_column('refresh_jobs', 'lease_expires_at')
+    op.drop_column('refresh_jobs', 'source')
+    op.drop_column('refresh_jobs', 'priority')
@@ -0,0 +1,63 @@
+"""Add refresh_runs table (per-job refresh telemetry)
+
+Revision ID: f5a6b7c8d9e0
+Revises: e4f5a6b7c8d9
+Create Date: 2026-10-19
+
+One row per account refresh: stage durations, Graph calls/pages, rows,
+bytes written, peak RSS and throttle sleep. Aggregated by the admin API.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'f5a6b7c8d9e0'
+down_revision = 'e4f5a6b7c8d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('refresh_runs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('job_id', sa.UUID(), nullable=True),
+    sa.Column('tenant_id', sa.UUID(), nullable=False),
+    sa.Column('fb_account_id', sa.String(length=255), nullable=False),
+    sa.Column('cycle_id', sa.String(length=64), nullable=True),
+    sa.Column('source', sa.String(length=20), nullable=True),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('refresh_mode', sa.String(length=10), nullable=True),
+    sa.Column('days_fetched', sa.Integer(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('total_ms', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('fetch_ms', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('enrich_ms', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('transform_ms', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('write_ms', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('demographics_ms', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('throttle_sleep_ms', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('graph_calls', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('graph_pages', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('rows_fetched', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('daily_rows', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('unique_ads', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('bytes_written', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.Column('peak_rss_mb', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['refresh_jobs.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_refresh_runs_fb_account_id'), 'refresh_runs', ['fb_account_id'], unique=False)
+    op.create_index(op.f('ix_refresh_runs_cycle_id'), 'refresh_runs', ['cycle_id'], unique=False)
+    op.create_index(op.f('ix_refresh_runs_started_at'), 'refresh_runs', ['started_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_refresh_runs_started_at'), table_name='refresh_runs')
+    op.drop_index(op.f('ix_refresh_runs_cycle_id'), table_name='refresh_runs')
+    op.drop_index(op.f('ix_refresh_runs_fb_account_id'), table_name='refresh_runs')
+    op.drop_table('refresh_runs')
@@ -0,0 +1,31 @@
+"""Add memory cost columns for refresh admission
+
+Revision ID: a6b7c8d9e0f1
+Revises: f5a6b7c8d9e0
+Create Date: 2026-10-19
+
+Per-account memory estimate (EWMA of observed RSS growth) and daily row
+count used by the workers' memory budget, plus the observed growth per
+refresh run.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'a6b7c8d9e0f1'
+down_revision = 'f5a6b7c8d9e0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('ad_accounts', sa.Column('memory_estimate_mb', sa.Integer(), nullable=True))
+    op.add_column('ad_accounts', sa.Column('daily_rows', sa.Integer(), nullable=True))
+    op.add_column('refresh_runs', sa.Column('memory_mb', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('refresh_runs', 'memory_mb')
+    op.drop_column('ad_accounts', 'daily_rows')
+    op.drop_column('ad_accounts', 'memory_estimate_mb')
@@ -0,0 +1,27 @@
+"""Add lease token to refresh jobs
+
+Revision ID: b7c8d9e0f1a2
+Revises: a6b7c8d9e0f1
+Create Date: 2026-10-19
+
+Token set at each claim of a job: lease renewal, release and completion
+only apply to the claim that still holds the job (a worker whose lease
+expired can no longer touch the job once another worker took it over).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'b7c8d9e0f1a2'
+down_revision = 'a6b7c8d9e0f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('refresh_jobs', sa.Column('lease_token', sa.UUID(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('refresh_jobs', 'lease_token')
@@ -23,6 +23,8 @@ class Settings(BaseSettings):
     META_APP_ID: str = ""  # Optional for cron jobs (no OAuth callback)
     META_APP_SECRET: str = ""  # Optional for cron jobs
     META_API_VERSION: str = "v23.0"
+    META_GRAPH_URL: str = "https://graph.facebook.com"  # Override pour un faux serveur Graph (tests)
+    META_HTTP2: bool = False  # HTTP/2 multiplexé vers Graph (nécessite le paquet 'h2')
     META_REDIRECT_URI: str = ""  # Optional for cron jobs
 
     # Production token (for seeding Ads Alchimie tenant)
@@ -42,6 +44,8 @@ class Settings(BaseSettings):
     # Storage (R2/S3)
     STORAGE_MODE: str = "local"  # "local" or "r2"
     LOCAL_DATA_ROOT: str = "./data"  # For local storage mode
+    INSIGHTS_SPOOL_DIR: str = "/tmp/insights_spool"  # Checkpoints disque des refresh en cours (reprise)
+    MEMORY_BUDGET_MB: int = 1536  # RSS max visé par process refresh_worker (limite du container - marge)
     STORAGE_ENDPOINT: str = ""
     STORAGE_ACCESS_KEY: str = ""
     STORAGE_SECRET_KEY: str = ""
@@ -51,6 +55,7 @@ class Settings(BaseSettings):
     # Security
     TOKEN_ENCRYPTION_KEY: str
     JWT_ISSUER: str = "creative-testing-api"  # JWT issuer claim
+    ADMIN_API_KEY: str = ""  # Header X-Admin-Key des routes /api/admin (vide = routes désactivées)
 
     # Supabase Auth Integration (pour unification auth)
     SUPABASE_JWT_SECRET: str = ""  # JWT secret pour valider les tokens Supabase
@@ -6,7 +6,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from sqlalchemy.orm import Session
 from .config import settings
-from .routers import auth, accounts, data, billing
+from .routers import auth, accounts, data, billing, admin
 from .database import get_db
 from .middleware.csrf import CSRFFromCookieGuard
 
@@ -44,6 +44,21 @@ app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(accounts.router, prefix="/api/accounts", tags=["Accounts"])
 app.include_router(data.router, prefix="/api/data", tags=["Data"])
 app.include_router(billing.router, prefix="/billing", tags=["Billing"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+
+
+@app.on_event("shutdown")
+async def close_meta_http_client():
+    """Ferme proprement le pool de connexions partagé vers Meta Graph API"""
+    from .services.meta_client import meta_client
+    await meta_client.aclose()
+
+
+@app.on_event("shutdown")
+async def close_refresh_progress_listener():
+    """Arrête le listener LISTEN/NOTIFY de la progression des refresh (flux SSE)"""
+    from .services.refresh_progress import broker
+    await broker.aclose()
 
 
 @app.get("/")
@@ -7,9 +7,12 @@ from .subscription import Subscription, SubscriptionPlan, SubscriptionStatus
 from .ad_account import AdAccount, AccountProfile
 from .oauth_token import OAuthToken
 from .refresh_job import RefreshJob, JobStatus
+from .refresh_run import RefreshRun
 from .naming_override import NamingOverride
+from .graph_circuit import GraphCircuit, CircuitState
 
 __all__ = [
     "Tenant", "User", "UserRole", "Subscription", "SubscriptionPlan", "SubscriptionStatus",
     "AdAccount", "AccountProfile", "OAuthToken", "RefreshJob", "JobStatus", "NamingOverride",
+    "GraphCircuit", "CircuitState", "RefreshRun",
 ]
@@ -35,6 +35,12 @@ class AdAccount(Base):
 
     # Metadata
     last_refresh_at = Column(DateTime(timezone=True), nullable=True)
+    last_viewed_at = Column(DateTime(timezone=True), nullable=True)  # Dernière consultation dashboard (priorité refresh)
+    next_refresh_at = Column(DateTime(timezone=True), nullable=True, index=True)  # Échéance du prochain refresh (worker)
+
+    # Coût mémoire observé (admission des workers, voir utils/memory_admission)
+    memory_estimate_mb = Column(Integer, nullable=True)  # EWMA de la mémoire prise par un refresh
+    daily_rows = Column(Integer, nullable=True)  # Rows journalières du dernier refresh réussi
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -0,0 +1,44 @@
+"""
+Modèle GraphCircuit (circuit breaker des erreurs d'accès Meta, par token et par compte)
+"""
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Enum, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+import enum
+
+from ..database import Base
+
+
+class CircuitState(str, enum.Enum):
+    """États d'un circuit"""
+    CLOSED = "closed"        # Appels autorisés
+    OPEN = "open"            # Échec immédiat jusqu'à next_probe_at
+    HALF_OPEN = "half_open"  # Un seul refresh "sonde" en cours
+
+
+class GraphCircuit(Base):
+    __tablename__ = "graph_circuits"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # "token:{tenant_id}" ou "account:{tenant_id}:{fb_account_id}"
+    key = Column(String(320), nullable=False, unique=True)
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    fb_account_id = Column(String(255), nullable=True)  # None = circuit du token
+
+    state = Column(Enum(CircuitState), nullable=False, default=CircuitState.CLOSED)
+    failures = Column(Integer, nullable=False, default=0)  # Ouvertures consécutives (backoff)
+
+    # Dernière erreur Meta
+    last_error_code = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    # Timing
+    opened_at = Column(DateTime(timezone=True), nullable=True)
+    next_probe_at = Column(DateTime(timezone=True), nullable=True)
+    probe_started_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<GraphCircuit {self.key} {self.state}>"
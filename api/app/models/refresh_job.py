@@ -1,7 +1,11 @@
 """
-Modèle RefreshJob (suivi des jobs de rafraîchissement)
+Modèle RefreshJob (file de jobs de rafraîchissement)
+
+La table est la file: l'API et le scheduler insèrent des jobs QUEUED,
+les workers (refresh_worker.py, N containers) les prennent via
+SELECT ... FOR UPDATE SKIP LOCKED (voir services/job_queue.py).
 """
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Enum, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -29,6 +33,15 @@ class RefreshJob(Base):
     # Status
     status = Column(Enum(JobStatus), nullable=False, default=JobStatus.QUEUED)
 
+    # File: priorité décroissante (interactif avant planifié), origine du job
+    priority = Column(Integer, nullable=False, default=0, server_default="0")
+    source = Column(String(20), nullable=False, default="api", server_default="api")  # "api" | "scheduler" | "cron"
+
+    # Bail du worker: expiré → le job repasse QUEUED (jusqu'à MAX_JOB_ATTEMPTS)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    lease_token = Column(UUID(as_uuid=True), nullable=True)  # Nouveau à chaque claim: seul ce claim renouvelle/termine le job
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+
     # Timing
     started_at = Column(DateTime(timezone=True), nullable=True)
     finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -42,5 +55,16 @@ class RefreshJob(Base):
     tenant = relationship("Tenant", back_populates="refresh_jobs")
     ad_account = relationship("AdAccount", back_populates="refresh_jobs")
 
+    __table_args__ = (
+        # Claim: prochains jobs QUEUED par priorité puis ancienneté
+        Index("ix_refresh_jobs_queue", "status", "priority", "created_at"),
+        # Un seul job actif par compte (enqueue concurrent de deux workers / de l'API)
+        Index(
+            "uq_refresh_jobs_active_account", "ad_account_id", unique=True,
+            postgresql_where=status.in_([JobStatus.QUEUED, JobStatus.RUNNING]),
+            sqlite_where=status.in_([JobStatus.QUEUED, JobStatus.RUNNING]),
+        ),
+    )
+
     def __repr__(self):
         return f"<RefreshJob {self.status} - account={self.ad_account_id}>"
@@ -0,0 +1,57 @@
+"""
+Modèle RefreshRun (télémétrie d'un refresh de compte)
+
+Une ligne par exécution (réussie ou non): durées par étape, appels Graph,
+volumes, RAM, pauses rate limit. Sert au dimensionnement des workers et à
+repérer les comptes les plus coûteux (voir routers/admin.py).
+"""
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Integer, BigInteger
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+
+from ..database import Base
+
+
+class RefreshRun(Base):
+    __tablename__ = "refresh_runs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_id = Column(UUID(as_uuid=True), ForeignKey("refresh_jobs.id", ondelete="SET NULL"), nullable=True)
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    fb_account_id = Column(String(255), nullable=False, index=True)
+
+    # Regroupement: "cron:<début du cycle>" ou "worker:<heure>"
+    cycle_id = Column(String(64), nullable=True, index=True)
+    source = Column(String(20), nullable=True)  # Origine du job (api, scheduler, cron)
+    status = Column(String(10), nullable=False)  # "ok" | "error"
+    refresh_mode = Column(String(10), nullable=True)  # BASELINE | TAIL
+    days_fetched = Column(Integer, nullable=True)
+
+    # Timing (ms)
+    started_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    finished_at = Column(DateTime(timezone=True), nullable=False)
+    total_ms = Column(Integer, nullable=False, default=0)
+    fetch_ms = Column(Integer, nullable=False, default=0)
+    enrich_ms = Column(Integer, nullable=False, default=0)
+    transform_ms = Column(Integer, nullable=False, default=0)
+    write_ms = Column(Integer, nullable=False, default=0)
+    demographics_ms = Column(Integer, nullable=False, default=0)
+    throttle_sleep_ms = Column(Integer, nullable=False, default=0)
+
+    # Volumes
+    graph_calls = Column(Integer, nullable=False, default=0)
+    graph_pages = Column(Integer, nullable=False, default=0)
+    rows_fetched = Column(Integer, nullable=False, default=0)
+    daily_rows = Column(Integer, nullable=False, default=0)
+    unique_ads = Column(Integer, nullable=False, default=0)
+    bytes_written = Column(BigInteger, nullable=False, default=0)
+    peak_rss_mb = Column(Integer, nullable=True)  # Pic du process (refresh parallèles inclus)
+    memory_mb = Column(Integer, nullable=True)  # Croissance du RSS pendant ce refresh (admission mémoire)
+
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<RefreshRun {self.fb_account_id} {self.status} {self.total_ms}ms>"
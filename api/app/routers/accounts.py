@@ -1,76 +1,43 @@
 """
 Router pour la gestion des comptes publicitaires et informations utilisateur
 
-🔒 LIMITES GLOBALES: L'API a la priorité sur le CRON
-- API peut utiliser jusqu'à 10 workers (nouvel user qui attend)
-- Le CRON s'efface automatiquement si l'API est occupée
+📬 FILE DE JOBS: l'API ne fait plus de refresh dans son process
+- Les refresh demandés ici sont enfilés dans refresh_jobs en priorité INTERACTIVE
+- Les workers (refresh_worker.py) les prennent avant les refresh planifiés
+
+📡 PROGRESSION: GET /refresh/events (Server-Sent Events) pousse l'avancement
+des jobs du tenant (ou d'un job) au lieu de poller /refresh/status/{job_id}
 """
+import asyncio
+import json
 from uuid import UUID
-from datetime import datetime, timezone, timedelta
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-from typing import Dict, Any, Optional, List
-import asyncio
+from typing import Dict, Any, Optional
 
-from ..database import get_db, SessionLocal
+from ..database import get_db
 from ..dependencies.auth import get_current_tenant_id, get_current_user_id
 from .. import models
-from ..models.refresh_job import RefreshJob, JobStatus
-from ..services.refresher import sync_account_data, RefreshError
-from ..config import settings
-from ..utils.jwt import create_access_token
-from ..utils.job_limiter import can_api_proceed, MAX_API_WORKERS
+from ..models.refresh_job import RefreshJob
+from ..services.circuit_breaker import is_blocked, load_open_circuits
+from ..services.job_queue import (
+    enqueue_job,
+    estimate_queue,
+    queued_jobs_in_order,
+    JOB_PRIORITY_INTERACTIVE,
+    ACTIVE_STATUSES
+)
+from ..services import refresh_progress
+from ..services.refresh_telemetry import estimate_account_seconds, DEFAULT_TAIL_SECONDS
+from ..utils.job_limiter import MAX_GLOBAL_WORKERS, can_api_proceed, get_running_job_count
 
 router = APIRouter()
 
-
-def _utcnow():
-    """Helper pour datetime UTC"""
-    return datetime.now(timezone.utc)
-
-
-async def _run_refresh_job(job_id: UUID, fb_account_id: str, tenant_id: UUID):
-    """
-    Exécute le refresh en background et met à jour le statut du job.
-
-    Cette fonction tourne en background via FastAPI BackgroundTasks.
-    Elle crée sa propre session DB pour éviter les conflits.
-    """
-    db = SessionLocal()
-    try:
-        # 1. Marquer le job comme RUNNING
-        job = db.get(RefreshJob, job_id)
-        if not job:
-            return
-        job.status = JobStatus.RUNNING
-        job.started_at = _utcnow()
-        db.commit()
-
-        # 2. Exécuter la sync (30s-15min selon la taille du compte)
-        await sync_account_data(
-            ad_account_id=fb_account_id,
-            tenant_id=tenant_id,
-            db=db
-        )
-
-        # 3. Marquer comme OK
-        job = db.get(RefreshJob, job_id)
-        if job:
-            job.status = JobStatus.OK
-            job.finished_at = _utcnow()
-            db.commit()
-
-    except Exception as e:
-        # 4. En cas d'erreur, marquer comme ERROR
-        job = db.get(RefreshJob, job_id)
-        if job:
-            job.status = JobStatus.ERROR
-            job.error = str(e)[:1000]  # Limiter à 1000 chars
-            job.finished_at = _utcnow()
-            db.commit()
-    finally:
-        db.close()
+# Flux SSE de progression
+SSE_KEEPALIVE_SECONDS = 15     # Commentaire ":" pour garder la connexion (proxies)
+SSE_MAX_STREAM_SECONDS = 600   # EventSource se reconnecte seul: pas de flux éternel
 
 
 @router.get("/me")
@@ -145,7 +112,6 @@ async def list_accounts(
 @router.post("/refresh/{fb_account_id}")
 async def trigger_refresh(
     fb_account_id: str,
-    background_tasks: BackgroundTasks,
     current_tenant_id: UUID = Depends(get_current_tenant_id),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
@@ -154,13 +120,13 @@ async def trigger_refresh(
 
     🔒 Protected endpoint - requires valid JWT
     🏢 Tenant-isolated - can only refresh accounts belonging to your tenant
-    ⚡ Asynchronous - returns immediately with job_id, polling required
+    ⚡ Asynchronous - returns immediately with job_id
+       (progression: GET /refresh/events?job_id=..., ou polling /refresh/status)
 
     Flow:
     1. Vérifie ownership du compte (tenant isolation)
-    2. Crée un RefreshJob (status=QUEUED)
-    3. Lance le refresh en background
-    4. Retourne immédiatement avec job_id
+    2. Enfile un RefreshJob (status=QUEUED, priorité INTERACTIVE)
+    3. Retourne immédiatement avec job_id (un worker l'exécute)
 
     Returns:
         {
@@ -183,44 +149,23 @@ async def trigger_refresh(
             detail=f"Ad account {fb_account_id} not found for your workspace"
         )
 
-    # 2. Vérifier si un job est déjà en cours (idempotence)
-    existing_job = db.execute(
-        select(RefreshJob).where(
-            RefreshJob.tenant_id == current_tenant_id,
-            RefreshJob.ad_account_id == ad_account.id,
-            RefreshJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])
+    # 1b. Circuit ouvert (token révoqué / permission retirée) → inutile de lancer un job
+    if is_blocked(load_open_circuits(db), current_tenant_id, fb_account_id):
+        raise HTTPException(
+            status_code=409,
+            detail="Meta access lost for this account. Reconnect Meta to refresh it."
         )
-    ).scalar_one_or_none()
-
-    if existing_job:
-        return {
-            "status": "processing",
-            "job_id": str(existing_job.id),
-            "already_processing": True
-        }
 
-    # 3. Créer un nouveau job
-    job = RefreshJob(
-        tenant_id=current_tenant_id,
-        ad_account_id=ad_account.id,
-        status=JobStatus.QUEUED
-    )
-    db.add(job)
-    db.commit()
-    db.refresh(job)
-
-    # 4. Lancer le refresh en background
-    background_tasks.add_task(
-        _run_refresh_job,
-        job.id,
-        fb_account_id,
-        current_tenant_id
+    # 2. Enfiler (idempotent: réutilise le job actif du compte, remonté en priorité)
+    job, created = enqueue_job(
+        db, current_tenant_id, ad_account.id,
+        priority=JOB_PRIORITY_INTERACTIVE, source="api"
     )
 
     return {
         "status": "processing",
         "job_id": str(job.id),
-        "already_processing": False
+        "already_processing": not created
     }
 
 
@@ -260,9 +205,89 @@ async def get_refresh_status(
     }
 
 
+@router.get("/refresh/events")
+async def stream_refresh_events(
+    request: Request,
+    job_id: Optional[UUID] = None,
+    current_tenant_id: UUID = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db)
+) -> StreamingResponse:
+    """
+    Flux Server-Sent Events de la progression des refresh
+
+    🔒 Protected endpoint - requires valid JWT (cookie: compatible EventSource)
+    🏢 Tenant-isolated - only events of your jobs
+
+    - Sans job_id: tous les jobs du tenant (onboarding: 60 comptes, une connexion)
+    - Avec job_id: ce job seulement, le flux se ferme à la fin du job
+
+    Premier(s) message(s): état actuel des jobs (snapshot DB), puis les
+    événements publiés par les workers:
+        event: progress
+        data: {"job_id", "account_id", "stage", "percent", "pages", "rows", "status"?, "error"?}
+
+    stage: queued | started | fetch | enrich | transform | write | demographics | done
+    """
+    # Abonnement AVANT le snapshot: aucun événement perdu entre les deux
+    subscription = refresh_progress.broker.subscribe(current_tenant_id, job_id)
+    try:
+        query = (
+            select(RefreshJob, models.AdAccount.fb_account_id)
+            .join(models.AdAccount, models.AdAccount.id == RefreshJob.ad_account_id)
+            .where(RefreshJob.tenant_id == current_tenant_id)
+        )
+        if job_id is not None:
+            query = query.where(RefreshJob.id == job_id)
+        else:
+            query = query.where(RefreshJob.status.in_(ACTIVE_STATUSES))
+        snapshot = [refresh_progress.job_snapshot(job, fb_account_id) for job, fb_account_id in db.execute(query).all()]
+    except Exception:
+        refresh_progress.broker.unsubscribe(subscription)
+        raise
+    # Pas de connexion DB tenue pendant toute la durée du flux
+    db.close()
+
+    if job_id is not None and not snapshot:
+        refresh_progress.broker.unsubscribe(subscription)
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        try:
+            for event in snapshot:
+                yield _sse(event)
+            if job_id is not None and snapshot[0]["stage"] == "done":
+                return
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + SSE_MAX_STREAM_SECONDS
+            while loop.time() < deadline:
+                if await request.is_disconnected():
+                    return
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event)
+                if job_id is not None and event.get("stage") == "done":
+                    return
+        finally:
+            refresh_progress.broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    """Événement au format SSE (tenant_id interne retiré)"""
+    payload = {key: value for key, value in event.items() if key != "tenant_id"}
+    return f"event: progress\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
 @router.post("/refresh-tenant-accounts")
 async def refresh_tenant_accounts(
-    background_tasks: BackgroundTasks,
     current_tenant_id: UUID = Depends(get_current_tenant_id),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
@@ -271,33 +296,39 @@ async def refresh_tenant_accounts(
 
     🔒 Protected - requires valid JWT
     🏢 Tenant-isolated - only refreshes YOUR accounts
-    ⚡ Async - returns immediately, jobs run in background
-    🔴 PRIORITÉ HAUTE - L'API a la priorité sur le CRON
+    ⚡ Async - returns immediately, jobs run on the refresh workers
+    🔴 PRIORITÉ HAUTE - jobs INTERACTIVE, pris avant les refresh planifiés
 
     Use case: Nouvel utilisateur qui vient de se connecter via OAuth
-    et ne veut pas attendre le cron (2h max).
+    et ne veut pas attendre le prochain refresh planifié.
+
+    📬 Tous les comptes sont enfilés d'un coup (jobs durables): les workers
+    les démarrent au fil des slots libres. Petits comptes d'abord (durée
+    estimée d'après refresh_runs): le dashboard se remplit vite.
 
     Returns:
         {
             "status": "processing",
             "accounts_total": 60,
-            "jobs_launched": 10,
-            "jobs_queued_for_later": 50,
-            "estimated_time_minutes": 15
+            "jobs_queued": 58,
+            "jobs_already_running": 2,
+            "jobs_launched": 58,
+            "accounts_queued_for_cron": 0,
+            "available_slots": 8,
+            "estimated_time_minutes": 15,
+            "jobs": [{"account_id", "job_id", "status", "queue_position", "eta_seconds"}]
         }
-    """
-    # 1. Vérifier les slots disponibles (nettoie aussi les zombies)
-    can_proceed, available_slots, message = can_api_proceed(db)
 
-    if not can_proceed:
-        # Système saturé - rare, mais possible
-        return {
-            "status": "system_busy",
-            "message": message,
-            "retry_in_minutes": 5
-        }
+    queue_position: rang dans la file globale (null si déjà en cours),
+    eta_seconds: fin estimée du refresh du compte.
 
-    # 2. Récupérer tous les ad accounts du tenant
+    Compatibilité (clients de l'ancienne réponse): jobs_launched = jobs créés
+    par cet appel, accounts_queued_for_cron = 0 (plus rien n'est laissé au
+    cron), available_slots = slots API libres. Système saturé: status
+    "system_busy" + retry_in_minutes, mais les jobs sont quand même enfilés
+    (un nouvel appel est idempotent).
+    """
+    # 1. Récupérer tous les ad accounts du tenant
     accounts = db.execute(
         select(models.AdAccount).where(
             models.AdAccount.tenant_id == current_tenant_id
@@ -308,77 +339,78 @@ async def refresh_tenant_accounts(
         return {
             "status": "no_accounts",
             "accounts_total": 0,
+            "jobs_queued": 0,
             "jobs_launched": 0,
             "estimated_time_minutes": 0
         }
 
-    # 3. Créer et lancer les jobs (limité par available_slots)
-    jobs_launched = []
+    # 2. Enfiler un job par compte (idempotent), plus petits comptes d'abord:
+    #    à priorité égale, la file est FIFO (created_at)
+    jobs_queued = []
     jobs_already_running = []
-    slots_used = 0
-
-    for account in accounts:
-        # Check idempotence - skip if already running
-        existing = db.execute(
-            select(RefreshJob).where(
-                RefreshJob.tenant_id == current_tenant_id,
-                RefreshJob.ad_account_id == account.id,
-                RefreshJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])
-            )
-        ).scalar_one_or_none()
-
-        if existing:
-            jobs_already_running.append({
-                "account_id": account.fb_account_id,
-                "job_id": str(existing.id)
-            })
+    accounts_circuit_open = []
+    open_circuits = load_open_circuits(db)
+    seconds_by_account = estimate_account_seconds(db, accounts)
+    tenant_jobs = []
+
+    for account in sorted(accounts, key=lambda acc: seconds_by_account[acc.id]):
+        # Circuit ouvert (accès Meta perdu) → pas de job voué à l'échec
+        if is_blocked(open_circuits, current_tenant_id, account.fb_account_id):
+            accounts_circuit_open.append(account.fb_account_id)
             continue
 
-        # Vérifier si on a encore des slots
-        if slots_used >= available_slots:
-            # Plus de slots - les comptes restants seront traités par le cron
-            break
-
-        # Create new job
-        job = RefreshJob(
-            tenant_id=current_tenant_id,
-            ad_account_id=account.id,
-            status=JobStatus.QUEUED
+        job, created = enqueue_job(
+            db, current_tenant_id, account.id,
+            priority=JOB_PRIORITY_INTERACTIVE, source="api"
         )
-        db.add(job)
-        db.commit()
-        db.refresh(job)
-
-        # Launch in background
-        background_tasks.add_task(
-            _run_refresh_job,
-            job.id,
-            account.fb_account_id,
-            current_tenant_id
-        )
-        jobs_launched.append({
-            "account_id": account.fb_account_id,
-            "job_id": str(job.id)
-        })
-        slots_used += 1
+        (jobs_queued if created else jobs_already_running).append(job.id)
+        # Valeurs lues maintenant: les commits suivants expirent l'objet
+        tenant_jobs.append((account.fb_account_id, account.id, job.id, job.status.value))
+
+    # 3. Position et ETA: simulation de la file interactive (tous tenants) sur les slots globaux
+    queued = queued_jobs_in_order(db, min_priority=JOB_PRIORITY_INTERACTIVE)
+    others = [job.ad_account_id for job in queued if job.ad_account_id not in seconds_by_account]
+    if others:
+        seconds_by_account.update(estimate_account_seconds(
+            db, db.execute(select(models.AdAccount).where(models.AdAccount.id.in_(others))).scalars().all()
+        ))
+    estimates = estimate_queue(
+        queued, seconds_by_account, slots=MAX_GLOBAL_WORKERS,
+        running=get_running_job_count(db), default_seconds=DEFAULT_TAIL_SECONDS
+    )
 
-    # Comptes non traités (seront pris par le cron)
-    accounts_remaining = len(accounts) - len(jobs_launched) - len(jobs_already_running)
+    jobs = []
+    for fb_account_id, account_id, job_id, job_status in tenant_jobs:
+        position, eta_seconds = estimates.get(job_id, (None, None))
+        if eta_seconds is None:
+            # Déjà RUNNING: fin estimée ~ durée du compte (au plus)
+            eta_seconds = int(round(seconds_by_account[account_id]))
+        jobs.append({
+            "account_id": fb_account_id,
+            "job_id": str(job_id),
+            "status": job_status,
+            "queue_position": position,
+            "eta_seconds": eta_seconds
+        })
 
-    # Estimation: ~30s par compte avec 10 workers parallèles
-    estimated_minutes = max(5, (len(jobs_launched) * 30) // 60)
+    estimated_seconds = max((job["eta_seconds"] for job in jobs), default=0)
 
-    return {
+    # 4. Champs de l'ancienne réponse (clients existants)
+    can_proceed, available_slots, busy_message = can_api_proceed(db)
+    response = {
         "status": "processing",
         "accounts_total": len(accounts),
-        "jobs_launched": len(jobs_launched),
+        "jobs_queued": len(jobs_queued),
         "jobs_already_running": len(jobs_already_running),
-        "accounts_queued_for_cron": accounts_remaining,
+        "jobs_launched": len(jobs_queued),
+        "accounts_queued_for_cron": 0,
+        "accounts_circuit_open": len(accounts_circuit_open),
         "available_slots": available_slots,
-        "estimated_time_minutes": estimated_minutes,
-        "message": f"{len(jobs_launched)} comptes en cours de traitement" + (
-            f", {accounts_remaining} seront traités par le cron" if accounts_remaining > 0 else ""
-        )
+        "estimated_time_minutes": -(-estimated_seconds // 60),
+        "jobs": jobs,
+        "message": f"{len(jobs_queued)} comptes en file de traitement"
     }
-
-
+    if not can_proceed:
+        # Jobs enfilés malgré tout: ils démarreront dès qu'un slot se libère
+        response.update(status="system_busy", message=busy_message, retry_in_minutes=5)
+    return response
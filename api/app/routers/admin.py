@@ -0,0 +1,54 @@
+"""
+Router admin: télémétrie des refresh (table refresh_runs)
+
+Protégé par le header X-Admin-Key (settings.ADMIN_API_KEY). Sans clé
+configurée, les routes répondent 404.
+"""
+import hmac
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..config import settings
+from ..services import refresh_telemetry
+
+router = APIRouter()
+
+
+def require_admin_key(x_admin_key: str = Header(default="")) -> None:
+    """Vérifie X-Admin-Key (comparaison à temps constant)"""
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not hmac.compare_digest(x_admin_key.encode(), settings.ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+
+@router.get("/refresh-runs/accounts", dependencies=[Depends(require_admin_key)])
+async def refresh_runs_by_account(
+    days: int = Query(7, ge=1, le=refresh_telemetry.REFRESH_RUN_RETENTION_DAYS),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Comptes les plus coûteux (temps cumulé, appels Graph, octets écrits)"""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    return {
+        "since": since.isoformat(),
+        "accounts": refresh_telemetry.account_aggregates(db, since, limit=limit)
+    }
+
+
+@router.get("/refresh-runs/cycles", dependencies=[Depends(require_admin_key)])
+async def refresh_runs_by_cycle(
+    days: int = Query(7, ge=1, le=refresh_telemetry.REFRESH_RUN_RETENTION_DAYS),
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Durée et volume des derniers cycles (cron, heures de worker)"""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    return {
+        "since": since.isoformat(),
+        "cycles": refresh_telemetry.cycle_aggregates(db, since, limit=limit)
+    }
@@ -20,6 +20,7 @@ from pydantic import BaseModel
 from ..database import get_db
 from ..config import settings
 from ..services.meta_client import meta_client, MetaAPIError
+from ..services.circuit_breaker import reset_tenant_circuits
 from ..utils.jwt import create_access_token
 from .. import models
 
@@ -250,6 +251,8 @@ async def facebook_callback(
                 },
             )
             db.execute(stmt)
+            # Nouveau token → les circuits ouverts (token révoqué, permissions) repartent de zéro
+            reset_tenant_circuits(db, tenant.id)
 
             # 5d. Upsert ad accounts (ON CONFLICT DO UPDATE on tenant_id + fb_account_id)
             for account in ad_accounts:
@@ -591,6 +594,8 @@ async def sync_facebook_token(
                 },
             )
             db.execute(stmt)
+            # Nouveau token → les circuits ouverts (token révoqué, permissions) repartent de zéro
+            reset_tenant_circuits(db, tenant.id)
 
             # 6d. Upsert ad accounts
             for account in ad_accounts:
@@ -5,6 +5,7 @@ Router pour servir les données optimisées (proxy vers R2/S3)
    les requêtes R2 (80 comptes × 3 fichiers = 240 requêtes en ~2s au lieu de 20s)
 """
 import asyncio
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, Tuple, Optional
 from uuid import UUID
 from hashlib import md5
@@ -34,6 +35,9 @@ router = APIRouter()
 # Fernet pour déchiffrer les tokens
 fernet = Fernet(settings.TOKEN_ENCRYPTION_KEY.encode())
 
+# Granularité du suivi de consultation (ad_accounts.last_viewed_at)
+VIEW_TRACKING_MINUTES = 15
+
 
 async def get_current_tenant(db: Session = Depends(get_db)) -> models.Tenant:
     """Mock - TODO: implémenter avec JWT"""
@@ -83,6 +87,12 @@ async def get_file(
             detail=f"Ad account {act_id} not found for your workspace"
         )
 
+    # 2b. Tracer l'activité (priorité de refresh), max 1 écriture / VIEW_TRACKING_MINUTES
+    now = datetime.now(timezone.utc)
+    if not ad_account.last_viewed_at or now - ad_account.last_viewed_at > timedelta(minutes=VIEW_TRACKING_MINUTES):
+        ad_account.last_viewed_at = now
+        db.commit()
+
     # 3. Construire la clé de stockage
     storage_key = f"tenants/{current_tenant_id}/accounts/{act_id}/data/optimized/{filename}"
 
@@ -426,7 +436,7 @@ async def refresh_demographics(
 
     🔒 Protected endpoint - requires valid JWT
     🏢 Tenant-isolated - only refreshes authenticated tenant's accounts
-    ⏱️ Fetches demographics for all periods (3, 7, 14, 30, 90 days)
+    ⏱️ One daily age/gender fetch (recent days), all periods (3, 7, 14, 30, 90 days) derived from the cube
 
     Args:
         act_id: Ad account ID (e.g., "act_123456")
@@ -436,7 +446,8 @@ async def refresh_demographics(
             "status": "success",
             "ad_account_id": str,
             "periods_fetched": [3, 7, 14, 30, 90],
-            "files_written": ["3d.json", "7d.json", ...],
+            "days_fetched": 4,
+            "files_written": ["cube_daily.json", "3d.json", "7d.json", ...],
             "refreshed_at": str (ISO)
         }
     """
@@ -0,0 +1,235 @@
+"""
+Circuit breaker des erreurs d'accès Meta (par token et par ad account)
+
+Un token révoqué ou un compte sans permission échoue à chaque refresh, et
+chaque échec coûtait un slot worker, du budget rate limit et les retries du
+cron. Le circuit s'ouvre sur les erreurs d'accès:
+
+- code 190 (token invalide/expiré/révoqué)  → circuit du TOKEN (tout le tenant)
+- codes 200, 10, ou HTTP 403 (permission)   → circuit du COMPTE (tenant + act)
+
+Ouvert: échec immédiat (CircuitOpenError) jusqu'à next_probe_at.
+Puis half-open: un seul refresh "sonde" passe. Succès → fermé, échec d'accès
+→ rouvert avec un backoff plus long (CIRCUIT_BACKOFF_MINUTES).
+
+L'état est en base (graph_circuits): partagé entre le cron, le scheduler et l'API.
+Une reconnexion OAuth réinitialise les circuits du tenant.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Set
+from uuid import UUID
+
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..models.graph_circuit import CircuitState
+from .meta_client import MetaAPIError
+
+CIRCUIT_TOKEN_CODES = {190}             # Token invalide / expiré / révoqué
+CIRCUIT_ACCOUNT_CODES = {200, 10}       # Permission manquante sur le compte
+CIRCUIT_ACCOUNT_STATUS_CODES = {403}
+CIRCUIT_BACKOFF_MINUTES = (30, 120, 360, 1440)  # Délai avant sonde, selon le nombre d'ouvertures
+CIRCUIT_PROBE_TIMEOUT_MINUTES = 30      # Sonde half-open sans résultat → une autre peut partir
+
+
+class CircuitOpenError(Exception):
+    """Refresh refusé sans appel Meta: circuit ouvert (token ou compte)"""
+
+    def __init__(self, key: str, next_probe_at: Optional[datetime], last_error: Optional[str] = None):
+        probe = next_probe_at.isoformat() if next_probe_at else "en cours"
+        super().__init__(f"Circuit open for {key} (next probe: {probe}): {last_error or 'access error'}")
+        self.key = key
+        self.next_probe_at = next_probe_at
+
+
+def token_key(tenant_id: UUID) -> str:
+    return f"token:{tenant_id}"
+
+
+def account_key(tenant_id: UUID, fb_account_id: str) -> str:
+    return f"account:{tenant_id}:{fb_account_id}"
+
+
+def _meta_error(error: Optional[BaseException]) -> Optional[MetaAPIError]:
+    """Remonte la chaîne __cause__ (RefreshError from MetaAPIError)"""
+    while error is not None and not isinstance(error, MetaAPIError):
+        error = error.__cause__
+    return error
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    """Les drivers sans timezone (SQLite) renvoient des datetimes naïfs: UTC"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """"token", "account" ou None (erreur sans rapport avec l'accès)"""
+    error = _meta_error(error)
+    if error is None:
+        return None
+    if error.code in CIRCUIT_TOKEN_CODES:
+        return "token"
+    if error.code in CIRCUIT_ACCOUNT_CODES or error.status_code in CIRCUIT_ACCOUNT_STATUS_CODES:
+        return "account"
+    return None
+
+
+def _is_blocking(circuit: models.GraphCircuit, now: datetime) -> bool:
+    if circuit.state == CircuitState.OPEN:
+        return circuit.next_probe_at is None or _aware(circuit.next_probe_at) > now
+    if circuit.state == CircuitState.HALF_OPEN:
+        return (
+            circuit.probe_started_at is not None
+            and _aware(circuit.probe_started_at) > now - timedelta(minutes=CIRCUIT_PROBE_TIMEOUT_MINUTES)
+        )
+    return False
+
+
+def load_open_circuits(db: Session, now: Optional[datetime] = None) -> Set[str]:
+    """
+    Clés des circuits qui bloquent actuellement (ouverts, ou sonde en cours)
+
+    Utilisé par le scheduler pour ne pas planifier de refresh voué à l'échec.
+    """
+    now = now or datetime.now(timezone.utc)
+    circuits = db.execute(
+        select(models.GraphCircuit).where(models.GraphCircuit.state != CircuitState.CLOSED)
+    ).scalars().all()
+    return {circuit.key for circuit in circuits if _is_blocking(circuit, now)}
+
+
+def is_blocked(open_circuits: Set[str], tenant_id: UUID, fb_account_id: str) -> bool:
+    """True si le token du tenant ou le compte a un circuit bloquant (voir load_open_circuits)"""
+    return token_key(tenant_id) in open_circuits or account_key(tenant_id, fb_account_id) in open_circuits
+
+
+def acquire(db: Session, tenant_id: UUID, fb_account_id: str, now: Optional[datetime] = None) -> None:
+    """
+    Autorise (ou non) un refresh du compte avec le token du tenant
+
+    Un circuit ouvert dont la sonde est due passe en half-open: l'appelant
+    est la sonde (un seul process gagne, via UPDATE conditionnel).
+
+    Raises:
+        CircuitOpenError: Si le circuit du token ou du compte bloque
+    """
+    now = now or datetime.now(timezone.utc)
+    for key in (token_key(tenant_id), account_key(tenant_id, fb_account_id)):
+        circuit = db.execute(
+            select(models.GraphCircuit).where(models.GraphCircuit.key == key)
+        ).scalar_one_or_none()
+        if circuit is None or circuit.state == CircuitState.CLOSED:
+            continue
+        if _is_blocking(circuit, now):
+            raise CircuitOpenError(key, circuit.next_probe_at, circuit.last_error)
+
+        # Sonde due (ou sonde précédente perdue): la prendre atomiquement
+        previous_probe = circuit.probe_started_at
+        claimed = db.execute(
+            update(models.GraphCircuit)
+            .where(
+                models.GraphCircuit.id == circuit.id,
+                models.GraphCircuit.state == circuit.state,
+                (models.GraphCircuit.probe_started_at == previous_probe) if previous_probe
+                else models.GraphCircuit.probe_started_at.is_(None),
+            )
+            .values(state=CircuitState.HALF_OPEN, probe_started_at=now)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            db.refresh(circuit)
+            raise CircuitOpenError(key, circuit.next_probe_at, circuit.last_error)
+        print(f"   🔌 Circuit {key}: half-open, refresh sonde")
+
+
+def _get_or_create(db: Session, key: str, tenant_id: UUID, fb_account_id: Optional[str]) -> models.GraphCircuit:
+    circuit = db.execute(
+        select(models.GraphCircuit).where(models.GraphCircuit.key == key)
+    ).scalar_one_or_none()
+    if circuit is not None:
+        return circuit
+    circuit = models.GraphCircuit(
+        key=key, tenant_id=tenant_id, fb_account_id=fb_account_id,
+        state=CircuitState.CLOSED, failures=0
+    )
+    db.add(circuit)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Créé en même temps par un autre process
+        db.rollback()
+        circuit = db.execute(
+            select(models.GraphCircuit).where(models.GraphCircuit.key == key)
+        ).scalar_one()
+    return circuit
+
+
+def record_failure(
+    db: Session,
+    tenant_id: UUID,
+    fb_account_id: str,
+    error: BaseException,
+    now: Optional[datetime] = None
+) -> Optional[models.GraphCircuit]:
+    """
+    Enregistre l'échec d'un refresh
+
+    - erreur d'accès → ouvre (ou rouvre) le circuit du token ou du compte
+    - autre erreur pendant une sonde → libère la sonde (l'accès n'est pas en cause)
+
+    Returns:
+        Le circuit ouvert, ou None
+    """
+    now = now or datetime.now(timezone.utc)
+    scope = classify_error(error)
+
+    if scope is None:
+        db.execute(
+            update(models.GraphCircuit)
+            .where(
+                models.GraphCircuit.key.in_([token_key(tenant_id), account_key(tenant_id, fb_account_id)]),
+                models.GraphCircuit.state == CircuitState.HALF_OPEN,
+            )
+            .values(probe_started_at=None)
+        )
+        db.commit()
+        return None
+
+    key = token_key(tenant_id) if scope == "token" else account_key(tenant_id, fb_account_id)
+    circuit = _get_or_create(db, key, tenant_id, None if scope == "token" else fb_account_id)
+
+    if circuit.state != CircuitState.OPEN:
+        # Nouvelle ouverture (fermé → ouvert, ou sonde ratée) → backoff suivant
+        circuit.failures += 1
+        circuit.opened_at = now
+        backoff = CIRCUIT_BACKOFF_MINUTES[min(circuit.failures, len(CIRCUIT_BACKOFF_MINUTES)) - 1]
+        circuit.next_probe_at = now + timedelta(minutes=backoff)
+        print(f"   🔌 Circuit {key}: ouvert ({circuit.failures}x), prochaine sonde dans {backoff}min")
+    circuit.state = CircuitState.OPEN
+    circuit.probe_started_at = None
+    meta_error = _meta_error(error)
+    circuit.last_error_code = meta_error.code if meta_error is not None else None
+    circuit.last_error = str(error)[:500]
+    db.commit()
+    return circuit
+
+
+def record_success(db: Session, tenant_id: UUID, fb_account_id: str) -> None:
+    """Ferme les circuits du token et du compte après un refresh réussi (commit par l'appelant)"""
+    db.execute(
+        update(models.GraphCircuit)
+        .where(
+            models.GraphCircuit.key.in_([token_key(tenant_id), account_key(tenant_id, fb_account_id)]),
+            models.GraphCircuit.state != CircuitState.CLOSED,
+        )
+        .values(state=CircuitState.CLOSED, failures=0, next_probe_at=None, probe_started_at=None)
+    )
+
+
+def reset_tenant_circuits(db: Session, tenant_id: UUID) -> None:
+    """Oublie les circuits du tenant (nouveau token OAuth) - commit par l'appelant"""
+    db.execute(delete(models.GraphCircuit).where(models.GraphCircuit.tenant_id == tenant_id))
@@ -0,0 +1,160 @@
+"""
+Cache persistant des creatives par ad account (format, media_url, status)
+
+Évite de re-fetcher les creatives de TOUTES les ads à chaque refresh:
+le format et le media d'une ad ne changent quasiment jamais après création.
+
+Une ad est re-fetchée seulement si:
+- elle est nouvelle (absente du cache)
+- son entrée a dépassé CREATIVE_CACHE_TTL_HOURS
+- son effective_status est transitoire (PENDING_REVIEW, IN_PROCESS, ...)
+- son effective_status semble avoir changé: non-ACTIVE qui diffuse le dernier
+  jour, ou ACTIVE qui diffusait au refresh précédent et ne diffuse plus
+  (une ad ACTIVE qui n'a jamais diffusé n'est pas re-fetchée à chaque refresh)
+
+Stocké dans R2 à côté du baseline: .../data/creatives_cache.json
+"""
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Set
+from uuid import UUID
+
+from ..services import storage
+
+CREATIVE_CACHE_VERSION = 1
+CREATIVE_CACHE_TTL_HOURS = 24  # Re-fetch de sécurité 1x/jour (au lieu de 12x)
+CREATIVE_CACHE_PRUNE_DAYS = 90  # Oublier les ads non vues depuis 90j (= BASELINE_DAYS)
+
+# Statuts en cours d'évolution côté Meta → toujours re-fetcher
+TRANSITIONAL_STATUSES = {
+    "UNKNOWN",
+    "PENDING_REVIEW",
+    "IN_PROCESS",
+    "WITH_ISSUES",
+    "PENDING_BILLING_INFO",
+    "PREAPPROVED",
+}
+
+
+def _cache_key(tenant_id: UUID, ad_account_id: str) -> str:
+    return f"tenants/{tenant_id}/accounts/{ad_account_id}/data/creatives_cache.json"
+
+
+def _parse_ts(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime.min.replace(tzinfo=timezone.utc)
+
+
+def load_creative_cache(tenant_id: UUID, ad_account_id: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Charge le cache creatives depuis le storage.
+
+    Returns:
+        Dict ad_id -> entrée (vide si inexistant/invalide)
+    """
+    try:
+        data = json.loads(storage.get_object(_cache_key(tenant_id, ad_account_id)).decode("utf-8"))
+    except storage.StorageError:
+        return {}
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        print(f"⚠️ Creative cache corrompu: {e}, ignoré")
+        return {}
+
+    if data.get("version") != CREATIVE_CACHE_VERSION:
+        return {}
+    return data.get("entries", {})
+
+
+def save_creative_cache(tenant_id: UUID, ad_account_id: str, entries: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Sauvegarde le cache creatives (après purge des ads non vues depuis longtemps).
+
+    Raises:
+        StorageError: Si l'écriture échoue
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=CREATIVE_CACHE_PRUNE_DAYS)
+    kept = {
+        ad_id: entry for ad_id, entry in entries.items()
+        if _parse_ts(entry.get("seen_at", "")) >= cutoff
+    }
+    payload = {"version": CREATIVE_CACHE_VERSION, "entries": kept}
+    storage.put_object(
+        _cache_key(tenant_id, ad_account_id),
+        json.dumps(payload, separators=(',', ':')).encode("utf-8")
+    )
+
+
+def _delivery_on_latest_day(ads: List[Dict[str, Any]]) -> Set[str]:
+    """Retourne les ad_ids ayant des impressions le dernier jour présent dans les insights."""
+    latest_day = max((ad.get("date_start", "") for ad in ads), default="")
+    if not latest_day:
+        return set()
+
+    delivering = set()
+    for ad in ads:
+        if ad.get("date_start") == latest_day:
+            try:
+                if int(ad.get("impressions", 0) or 0) > 0:
+                    delivering.add(ad["ad_id"])
+            except (TypeError, ValueError, KeyError):
+                continue
+    return delivering
+
+
+def mark_seen(
+    ads: List[Dict[str, Any]],
+    cache: Dict[str, Dict[str, Any]],
+    now: datetime
+) -> None:
+    """Met à jour seen_at et la diffusion du dernier jour des entrées présentes dans les insights."""
+    delivering = _delivery_on_latest_day(ads)
+    now_iso = now.isoformat()
+    for ad_id in {ad["ad_id"] for ad in ads if "ad_id" in ad}:
+        entry = cache.get(ad_id)
+        if entry is not None:
+            entry["seen_at"] = now_iso
+            entry["delivering"] = ad_id in delivering
+
+
+def select_ad_ids_to_fetch(
+    ads: List[Dict[str, Any]],
+    cache: Dict[str, Dict[str, Any]],
+    now: datetime
+) -> List[str]:
+    """
+    Sélectionne les ad_ids dont les creatives doivent être (re)fetchées.
+
+    Args:
+        ads: Insights daily (doivent contenir 'ad_id')
+        cache: Cache actuel (ad_id -> entrée)
+        now: Timestamp courant (UTC)
+
+    Returns:
+        Liste des ad_ids à fetcher via l'API Batch
+    """
+    ad_ids = {ad["ad_id"] for ad in ads if "ad_id" in ad}
+    delivering = _delivery_on_latest_day(ads)
+    ttl_cutoff = now - timedelta(hours=CREATIVE_CACHE_TTL_HOURS)
+
+    to_fetch = []
+    for ad_id in ad_ids:
+        entry = cache.get(ad_id)
+        if entry is None:
+            to_fetch.append(ad_id)
+            continue
+
+        status = entry.get("effective_status", "UNKNOWN")
+        if _parse_ts(entry.get("fetched_at", "")) < ttl_cutoff:
+            to_fetch.append(ad_id)
+        elif status in TRANSITIONAL_STATUSES:
+            to_fetch.append(ad_id)
+        elif status != "ACTIVE" and ad_id in delivering:
+            # Non-ACTIVE qui diffuse → probablement réactivée
+            to_fetch.append(ad_id)
+        elif status == "ACTIVE" and entry.get("delivering") and ad_id not in delivering:
+            # Diffusait au refresh précédent, plus maintenant → probablement mise en pause
+            to_fetch.append(ad_id)
+
+    return to_fetch
@@ -4,9 +4,16 @@ Adapté de scripts/production/fetch_demographics.py pour le SaaS
 
 Fetch les insights avec breakdowns age/gender, agrège par segment,
 calcule les métriques (CTR, CPA, ROAS) et stocke dans R2.
+
+📦 Cube journalier (demographics/cube_daily.json): jour × âge × genre
+Avant: 5 appels par refresh, un par période (le 90j ré-agrège 3 mois à chaque fois).
+Maintenant: UN appel time_increment=1 sur les derniers jours seulement
+(DEMOGRAPHICS_BACKFILL_DAYS de marge pour les corrections Meta), fusionné dans
+le cube; les 5 fichiers {N}d.json sont dérivés localement du cube.
+Cube absent ou trop vieux → un seul appel sur DEMOGRAPHICS_CUBE_DAYS jours.
 """
 import json
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from typing import Dict, Any, List, Optional, Tuple
 from uuid import UUID
 from collections import defaultdict
@@ -25,6 +32,13 @@ fernet = Fernet(settings.TOKEN_ENCRYPTION_KEY.encode())
 
 # Périodes à fetcher (correspondent aux boutons de l'UI)
 DEMOGRAPHICS_PERIODS = [3, 7, 14, 30, 90]
+DEMOGRAPHICS_CUBE_DAYS = max(DEMOGRAPHICS_PERIODS)  # Jours gardés dans le cube
+DEMOGRAPHICS_BACKFILL_DAYS = 3  # Jours refetchés à chaque refresh (corrections d'attribution Meta)
+DEMOGRAPHICS_MAX_TAIL_DAYS = 30  # Cube plus vieux → refetch complet
+DEMOGRAPHICS_CUBE_FILE = "cube_daily.json"
+DEMOGRAPHICS_CUBE_VERSION = 1
+# Colonnes d'une row du cube (liste compacte plutôt qu'un dict par row)
+CUBE_COLUMNS = ["age", "gender", "impressions", "clicks", "spend", "purchases", "purchase_value"]
 
 
 class DemographicsError(Exception):
@@ -78,9 +92,23 @@ def _extract_purchase_data(actions: List[Dict], action_values: List[Dict]) -> Tu
     return purchases, purchase_value
 
 
-def _aggregate_segments(raw_results: List[Dict]) -> List[Dict]:
+def _extract_metrics(row: Dict) -> Dict:
+    """Row Graph (age, gender, actions...) → métriques du cube"""
+    purchases, purchase_value = _extract_purchase_data(row.get('actions', []), row.get('action_values', []))
+    return {
+        'age': row.get('age', 'unknown'),
+        'gender': row.get('gender', 'unknown'),
+        'impressions': int(row.get('impressions', 0)),
+        'clicks': int(row.get('clicks', 0)),
+        'spend': float(row.get('spend', 0)),
+        'purchases': purchases,
+        'purchase_value': purchase_value
+    }
+
+
+def _aggregate_segments(metric_rows: List[Dict]) -> List[Dict]:
     """
-    Agrège les résultats par segment (age, gender).
+    Agrège les rows (voir _extract_metrics) par segment (age, gender).
     Retourne une liste de segments avec métriques calculées.
     """
     segments_map = defaultdict(lambda: {
@@ -91,23 +119,10 @@ def _aggregate_segments(raw_results: List[Dict]) -> List[Dict]:
         'purchase_value': 0.0
     })
 
-    for row in raw_results:
-        age = row.get('age', 'unknown')
-        gender = row.get('gender', 'unknown')
-        key = (age, gender)
-
-        # Agréger les métriques de base
-        segments_map[key]['impressions'] += int(row.get('impressions', 0))
-        segments_map[key]['clicks'] += int(row.get('clicks', 0))
-        segments_map[key]['spend'] += float(row.get('spend', 0))
-
-        # Extraire purchases et purchase_value
-        actions = row.get('actions', [])
-        action_values = row.get('action_values', [])
-        purchases, purchase_value = _extract_purchase_data(actions, action_values)
-
-        segments_map[key]['purchases'] += purchases
-        segments_map[key]['purchase_value'] += purchase_value
+    for row in metric_rows:
+        key = (row['age'], row['gender'])
+        for metric in segments_map[key]:
+            segments_map[key][metric] += row[metric]
 
     # Convertir en liste et calculer les métriques dérivées
     segments = []
@@ -133,6 +148,85 @@ def _aggregate_segments(raw_results: List[Dict]) -> List[Dict]:
     return segments
 
 
+def _load_cube(base_path: str) -> Optional[Dict[str, Any]]:
+    """Cube journalier existant, ou None (absent, illisible, autre version)"""
+    try:
+        cube = json.loads(storage.get_object(f"{base_path}/{DEMOGRAPHICS_CUBE_FILE}").decode("utf-8"))
+    except (storage.StorageError, json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if cube.get("version") != DEMOGRAPHICS_CUBE_VERSION or cube.get("columns") != CUBE_COLUMNS:
+        return None
+    return cube
+
+
+def _cube_fetch_range(cube: Optional[Dict[str, Any]], reference_date: date) -> Tuple[date, bool]:
+    """
+    Premier jour à fetcher (jusqu'à reference_date inclus)
+
+    Returns:
+        (since, full): full=True si le cube est (re)construit sur DEMOGRAPHICS_CUBE_DAYS
+    """
+    full_since = reference_date - timedelta(days=DEMOGRAPHICS_CUBE_DAYS - 1)
+    try:
+        cube_reference = date.fromisoformat(cube["reference_date"]) if cube else None
+    except (KeyError, TypeError, ValueError):
+        cube_reference = None
+    if cube_reference is None or cube_reference > reference_date:
+        return full_since, True
+
+    # Jours manquants depuis le dernier refresh + marge de correction Meta
+    tail_days = (reference_date - cube_reference).days + DEMOGRAPHICS_BACKFILL_DAYS
+    if tail_days > DEMOGRAPHICS_MAX_TAIL_DAYS:
+        return full_since, True
+    return max(full_since, reference_date - timedelta(days=tail_days - 1)), False
+
+
+def _merge_cube(
+    cube: Optional[Dict[str, Any]],
+    raw_results: List[Dict],
+    since: date,
+    reference_date: date,
+    ad_account_id: str
+) -> Dict[str, Any]:
+    """
+    Remplace les jours [since, reference_date] du cube par les rows fetchées
+    (time_increment=1) et oublie les jours au-delà de DEMOGRAPHICS_CUBE_DAYS.
+    """
+    days = dict(cube.get("days", {})) if cube else {}
+    day = since
+    while day <= reference_date:
+        days.pop(day.isoformat(), None)
+        day += timedelta(days=1)
+
+    for row in raw_results:
+        metrics = _extract_metrics(row)
+        days.setdefault(row.get('date_start', reference_date.isoformat()), []).append([
+            metrics['age'], metrics['gender'], metrics['impressions'], metrics['clicks'],
+            round(metrics['spend'], 2), round(metrics['purchases'], 2), round(metrics['purchase_value'], 2)
+        ])
+
+    oldest = (reference_date - timedelta(days=DEMOGRAPHICS_CUBE_DAYS - 1)).isoformat()
+    return {
+        "version": DEMOGRAPHICS_CUBE_VERSION,
+        "account_id": ad_account_id,
+        "reference_date": reference_date.isoformat(),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "columns": CUBE_COLUMNS,
+        "days": {d: rows for d, rows in sorted(days.items()) if oldest <= d <= reference_date.isoformat()}
+    }
+
+
+def _cube_period_rows(cube: Dict[str, Any], period_days: int, reference_date: date) -> List[Dict]:
+    """Rows du cube sur les `period_days` derniers jours, au format _extract_metrics"""
+    since = (reference_date - timedelta(days=period_days - 1)).isoformat()
+    until = reference_date.isoformat()
+    return [
+        dict(zip(CUBE_COLUMNS, row))
+        for day, rows in cube["days"].items() if since <= day <= until
+        for row in rows
+    ]
+
+
 def _calculate_totals(segments: List[Dict]) -> Dict:
     """Calcule les totaux à partir des segments"""
     totals = {
@@ -155,21 +249,27 @@ def _calculate_totals(segments: List[Dict]) -> Dict:
 async def refresh_demographics_for_account(
     ad_account_id: str,
     tenant_id: UUID,
-    db: Session
+    db: Session,
+    mirror_tenant_ids: Optional[List[UUID]] = None
 ) -> Dict[str, Any]:
     """
     Refresh les données démographiques d'un ad account pour toutes les périodes.
 
+    Un appel Meta (jours récents du cube), puis les périodes sont dérivées du cube.
+
     Args:
         ad_account_id: ID du compte (ex: "act_123456")
         tenant_id: ID du tenant (pour isolation)
         db: Session SQLAlchemy
+        mirror_tenant_ids: Autres tenants ayant connecté le même compte
+            (les fichiers écrits leur sont copiés, sans nouveau fetch)
 
     Returns:
         {
             "status": "success",
             "ad_account_id": str,
-            "periods_fetched": List[int],
+            "periods_fetched": List[int],   # Périodes dérivées du cube
+            "days_fetched": int,            # Jours demandés à Meta (un seul appel)
             "files_written": List[str],
             "refreshed_at": str (ISO)
         }
@@ -209,32 +309,46 @@ async def refresh_demographics_for_account(
     today = datetime.now(timezone.utc).date()
     reference_date = today - timedelta(days=1)
 
-    # 5. Fetch pour chaque période
+    # 5. Un seul fetch journalier: les jours manquants du cube (+ marge), ou tout le cube
     files_written = []
     periods_fetched = []
     base_path = f"tenants/{tenant_id}/accounts/{ad_account_id}/demographics"
+    cube = _load_cube(base_path)
+    since, full = _cube_fetch_range(cube, reference_date)
+    days_fetched = (reference_date - since).days + 1
 
-    for period_days in DEMOGRAPHICS_PERIODS:
-        since_date = (reference_date - timedelta(days=period_days - 1)).isoformat()
-        until_date = reference_date.isoformat()
+    try:
+        print(f"  📊 Fetching demographics for {ad_account.name} "
+              f"({days_fetched}d daily{', full cube' if full else ''})...")
+        raw_results = await meta_client.get_demographics(
+            ad_account_id=ad_account_id,
+            access_token=access_token,
+            since_date=since.isoformat(),
+            until_date=reference_date.isoformat(),
+            time_increment=1
+        )
+    except MetaAPIError as e:
+        # Cube et fichiers précédents conservés: le prochain refresh réessaie
+        print(f"    ❌ Demographics API error - {e}")
+        raw_results = None
+
+    if raw_results is not None:
+        cube = _merge_cube(None if full else cube, raw_results, since, reference_date, ad_account_id)
+        storage.put_object(
+            f"{base_path}/{DEMOGRAPHICS_CUBE_FILE}",
+            json.dumps(cube, separators=(',', ':')).encode("utf-8")
+        )
+        files_written.append(DEMOGRAPHICS_CUBE_FILE)
 
-        try:
-            print(f"  📊 Fetching demographics for {ad_account.name} ({period_days}d)...")
-
-            # Fetch les données brutes
-            raw_results = await meta_client.get_demographics(
-                ad_account_id=ad_account_id,
-                access_token=access_token,
-                since_date=since_date,
-                until_date=until_date
-            )
+        # 6. Les 5 périodes dérivées du cube (aucun appel Meta)
+        for period_days in DEMOGRAPHICS_PERIODS:
+            since_date = (reference_date - timedelta(days=period_days - 1)).isoformat()
+            until_date = reference_date.isoformat()
 
-            if not raw_results:
+            segments = _aggregate_segments(_cube_period_rows(cube, period_days, reference_date))
+            if not segments:
                 print(f"    ⚠️ No data for {period_days}d")
                 continue
-
-            # Agréger par segment
-            segments = _aggregate_segments(raw_results)
             totals = _calculate_totals(segments)
 
             # Construire le résultat
@@ -245,7 +359,7 @@ async def refresh_demographics_for_account(
                     "period": f"{period_days}d",
                     "date_range": f"{since_date}..{until_date}",
                     "generated_at": datetime.now(timezone.utc).isoformat(),
-                    "source": "insights(level=account, breakdowns=[age,gender])"
+                    "source": f"{DEMOGRAPHICS_CUBE_FILE} (insights level=account, breakdowns=[age,gender], time_increment=1)"
                 },
                 "segments": segments,
                 "totals": totals
@@ -262,17 +376,20 @@ async def refresh_demographics_for_account(
             periods_fetched.append(period_days)
             print(f"    ✅ {period_days}d: {len(segments)} segments, ${totals['spend']:,.2f} spend")
 
-        except MetaAPIError as e:
-            print(f"    ❌ {period_days}d: API error - {e}")
-            # Continue avec les autres périodes
-        except Exception as e:
-            print(f"    ❌ {period_days}d: Error - {e}")
-            # Continue avec les autres périodes
+    # Comptes partagés: copier vers les autres tenants
+    for mirror_tenant_id in mirror_tenant_ids or []:
+        mirror_path = f"tenants/{mirror_tenant_id}/accounts/{ad_account_id}/demographics"
+        try:
+            for filename in files_written:
+                storage.copy_object(f"{base_path}/{filename}", f"{mirror_path}/{filename}")
+        except storage.StorageError as e:
+            print(f"    ⚠️ Mirror demographics → tenant {mirror_tenant_id} failed: {e}")
 
     return {
         "status": "success",
         "ad_account_id": ad_account_id,
         "periods_fetched": periods_fetched,
+        "days_fetched": days_fetched if raw_results is not None else 0,
         "files_written": files_written,
         "refreshed_at": datetime.now(timezone.utc).isoformat()
     }
@@ -0,0 +1,251 @@
+"""
+Spool disque des refresh en cours (reprise sur erreur)
+
+Quand sync_account_data échoue à la page 150/200, le retry du cron (et le
+cycle suivant) repartait de la page 1. Le spool garde sur disque local:
+
+- les pages d'insights déjà reçues + le dernier curseur `paging.next`
+  (sans access_token) → le fetch reprend au curseur
+- des marqueurs d'étape: fetched → enriched → transformed
+  → une étape terminée n'est pas refaite
+
+Un spool n'est valable que pour la même fenêtre (mode, since, until) et
+pendant SPOOL_MAX_AGE_HOURS. Il est supprimé après un refresh réussi.
+
+Layout: {INSIGHTS_SPOOL_DIR}/{tenant_id}/{act_id}/
+    window.json                   (mode, since, until, created_at)
+    pages_{since}_{until}/state.json + page_00001.json ...
+    stage_fetched.json / stage_enriched.json / stage_transformed.json
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+from uuid import UUID
+
+from ..config import settings
+
+SPOOL_VERSION = 1
+SPOOL_MAX_AGE_HOURS = 6                       # Au-delà, les données Meta ont pu bouger → refetch
+SPOOL_MAX_ACCOUNT_BYTES = 512 * 1024 * 1024   # Au-delà, on arrête de spooler ce compte (fetch en RAM seulement)
+SPOOL_MAX_TOTAL_BYTES = 4 * 1024 * 1024 * 1024  # Budget disque total, les spools les plus vieux sautent d'abord
+SPOOL_STAGES = ("fetched", "enriched", "transformed")
+
+
+def _strip_token(url: str) -> str:
+    """Retire access_token d'une URL de pagination (jamais de token sur disque)"""
+    parsed = urlparse(url)
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if k != "access_token"]
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+def _write_json_atomic(path: Path, data: Any) -> int:
+    """Écrit via fichier temporaire + os.replace (jamais de fichier à moitié écrit)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path.stat().st_size
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+class PageCheckpoint:
+    """
+    Checkpoint de pagination d'une fenêtre d'insights
+
+    Utilisé par MetaClient._paginate: resume() au début, save_page() après
+    chaque page, mark_complete() à la fin.
+    """
+
+    def __init__(self, spool: "InsightsSpool", directory: Path):
+        self.spool = spool
+        self.directory = directory
+        self.enabled = True
+
+    def _state(self) -> Dict[str, Any]:
+        try:
+            return json.loads((self.directory / "state.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"pages": 0, "cursor": None, "complete": False}
+
+    def resume(self) -> Tuple[List[Dict[str, Any]], Optional[str], bool]:
+        """
+        Returns:
+            (rows déjà reçues, curseur suivant sans token, fetch terminé)
+        """
+        state = self._state()
+        rows: List[Dict[str, Any]] = []
+        try:
+            for page in range(1, state["pages"] + 1):
+                rows.extend(json.loads((self.directory / f"page_{page:05d}.json").read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            # Page manquante/corrompue → repartir de zéro
+            self.reset()
+            return [], None, False
+        return rows, state["cursor"], state["complete"]
+
+    def save_page(self, rows: List[Dict[str, Any]], next_url: Optional[str]) -> None:
+        if not self.enabled:
+            return
+        state = self._state()
+        page = state["pages"] + 1
+        try:
+            written = _write_json_atomic(self.directory / f"page_{page:05d}.json", rows)
+            if not self.spool.reserve(written):
+                print(f"   ⚠️ Spool {self.spool.ad_account_id}: limite disque atteinte, checkpoint désactivé")
+                self.enabled = False
+                self.reset()
+                return
+            _write_json_atomic(self.directory / "state.json", {
+                "pages": page,
+                "cursor": _strip_token(next_url) if next_url else None,
+                "complete": next_url is None,
+            })
+        except OSError as e:
+            # Disque plein / read-only: le fetch continue sans checkpoint
+            print(f"   ⚠️ Spool {self.spool.ad_account_id}: écriture impossible ({e}), checkpoint désactivé")
+            self.enabled = False
+
+    def mark_complete(self) -> None:
+        if not self.enabled:
+            return
+        state = self._state()
+        state.update({"cursor": None, "complete": True})
+        try:
+            _write_json_atomic(self.directory / "state.json", state)
+        except OSError:
+            pass
+
+    def reset(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class InsightsSpool:
+    """
+    Spool d'un refresh (tenant, ad account, fenêtre)
+
+    Args:
+        tenant_id: Tenant dont le token fait le fetch
+        ad_account_id: ex "act_123"
+        mode / since_date / until_date: Fenêtre du refresh. Un spool existant
+            pour une autre fenêtre (ou trop vieux) est supprimé.
+        root: Racine du spool (défaut: settings.INSIGHTS_SPOOL_DIR)
+    """
+
+    def __init__(
+        self,
+        tenant_id: UUID,
+        ad_account_id: str,
+        mode: str,
+        since_date: str,
+        until_date: str,
+        root: Optional[str] = None
+    ):
+        self.ad_account_id = ad_account_id
+        self.directory = Path(root or settings.INSIGHTS_SPOOL_DIR) / str(tenant_id) / ad_account_id
+        self.window = {"version": SPOOL_VERSION, "mode": mode, "since": since_date, "until": until_date}
+        self._bytes = 0
+        self.resumed = False
+        self._open()
+
+    def _open(self) -> None:
+        try:
+            existing = json.loads((self.directory / "window.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            existing = None
+
+        if existing is not None:
+            age_hours = (time.time() - existing.get("created_at", 0)) / 3600
+            same_window = all(existing.get(k) == v for k, v in self.window.items())
+            if same_window and age_hours <= SPOOL_MAX_AGE_HOURS:
+                self.resumed = True
+                self._bytes = _dir_size(self.directory)
+                return
+            self.clear()
+
+        try:
+            _write_json_atomic(self.directory / "window.json", {**self.window, "created_at": time.time()})
+        except OSError as e:
+            print(f"   ⚠️ Spool {self.ad_account_id} indisponible: {e}")
+
+    def reserve(self, size: int) -> bool:
+        """Comptabilise `size` octets écrits; False si la limite par compte est dépassée"""
+        self._bytes += size
+        return self._bytes <= SPOOL_MAX_ACCOUNT_BYTES
+
+    def checkpoint(self, since_date: str, until_date: str) -> PageCheckpoint:
+        """Checkpoint de pagination d'une (sous-)fenêtre, ex: un shard BASELINE"""
+        return PageCheckpoint(self, self.directory / f"pages_{since_date}_{until_date}")
+
+    def load_stage(self, stage: str) -> Optional[Any]:
+        """Données d'une étape terminée, ou None"""
+        try:
+            return json.loads((self.directory / f"stage_{stage}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def save_stage(self, stage: str, data: Any) -> None:
+        """Marque une étape terminée (avec ses données). Les pages brutes ne sont plus utiles après fetched."""
+        if stage not in SPOOL_STAGES:
+            raise ValueError(f"Unknown spool stage: {stage}")
+        try:
+            written = _write_json_atomic(self.directory / f"stage_{stage}.json", data)
+        except OSError as e:
+            print(f"   ⚠️ Spool {self.ad_account_id}: étape {stage} non sauvegardée ({e})")
+            return
+        if not self.reserve(written):
+            (self.directory / f"stage_{stage}.json").unlink(missing_ok=True)
+            return
+        if stage == "fetched":
+            for pages_dir in self.directory.glob("pages_*"):
+                shutil.rmtree(pages_dir, ignore_errors=True)
+
+    def clear(self) -> None:
+        """Supprime le spool (refresh réussi ou fenêtre obsolète)"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self._bytes = 0
+
+
+def cleanup_spool(root: Optional[str] = None) -> int:
+    """
+    Nettoyage global (début de cycle cron): spools trop vieux, puis budget disque total
+
+    Returns:
+        Nombre de spools supprimés
+    """
+    base = Path(root or settings.INSIGHTS_SPOOL_DIR)
+    if not base.exists():
+        return 0
+
+    spools = []
+    for window_file in base.glob("*/*/window.json"):
+        try:
+            created_at = json.loads(window_file.read_text(encoding="utf-8")).get("created_at", 0)
+        except (OSError, ValueError):
+            created_at = 0
+        spools.append((created_at, window_file.parent))
+
+    removed = 0
+    now = time.time()
+    total = 0
+    for created_at, directory in sorted(spools, reverse=True):  # Plus récents d'abord
+        size = _dir_size(directory)
+        if (now - created_at) / 3600 > SPOOL_MAX_AGE_HOURS or total + size > SPOOL_MAX_TOTAL_BYTES:
+            shutil.rmtree(directory, ignore_errors=True)
+            removed += 1
+        else:
+            total += size
+    return removed
@@ -0,0 +1,407 @@
+"""
+📬 File de jobs de refresh en PostgreSQL (table refresh_jobs)
+
+Avant: l'API lançait les refresh dans son propre process (BackgroundTasks)
+et le cron tournait seul derrière un lock fcntl (un seul hôte possible).
+
+Maintenant la table refresh_jobs EST la file:
+- Producteurs: l'API (priorité INTERACTIVE, un user attend) et le scheduler
+  des workers (priorité SCHEDULED, comptes dont next_refresh_at est dépassé)
+- Consommateurs: N process refresh_worker.py (un ou plusieurs containers)
+  qui réclament les jobs via SELECT ... FOR UPDATE SKIP LOCKED: deux workers
+  ne prennent jamais le même job, sans lock applicatif
+- Bail (lease) court + heartbeat: un job RUNNING appartient à son process
+  tant que celui-ci renouvelle lease_expires_at (LeaseHeartbeat, toutes les
+  JOB_HEARTBEAT_SECONDS). Process mort → plus de heartbeat → le bail expire
+  en JOB_LEASE_SECONDS → le slot est libéré et le job repasse QUEUED
+  (MAX_JOB_ATTEMPTS max). Remplace l'ancien timeout zombie de 45 minutes.
+- Chaque claim reçoit un lease_token: renouvellement, remise en file et fin
+  du job exigent ce token. Un worker dont le bail a expiré (process gelé,
+  DB injoignable) ne peut plus toucher un job repris ailleurs; son heartbeat
+  constate la perte et annule le refresh en cours.
+- Un seul job actif par compte (index unique partiel): enqueue idempotent
+"""
+import heapq
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, update, or_, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.refresh_job import RefreshJob, JobStatus
+
+JOB_PRIORITY_INTERACTIVE = 100  # Demandé depuis le dashboard (user devant l'écran)
+JOB_PRIORITY_SCHEDULED = 0      # Échéance du scheduler (next_refresh_at)
+JOB_LEASE_SECONDS = 60          # Sans heartbeat depuis 60s = process mort
+JOB_HEARTBEAT_SECONDS = 15      # Renouvellement des bails (4 heartbeats ratés avant expiration)
+MAX_JOB_ATTEMPTS = 3            # Bails expirés avant abandon (ERROR)
+
+ACTIVE_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+def find_active_job(db: Session, ad_account_id: UUID) -> Optional[RefreshJob]:
+    """Job QUEUED ou RUNNING du compte (au plus un, voir uq_refresh_jobs_active_account)"""
+    return db.execute(
+        select(RefreshJob).where(
+            RefreshJob.ad_account_id == ad_account_id,
+            RefreshJob.status.in_(ACTIVE_STATUSES)
+        )
+    ).scalars().first()
+
+
+def enqueue_job(
+    db: Session,
+    tenant_id: UUID,
+    ad_account_id: UUID,
+    priority: int = JOB_PRIORITY_SCHEDULED,
+    source: str = "scheduler"
+) -> Tuple[RefreshJob, bool]:
+    """
+    Ajoute un job QUEUED pour le compte (idempotent)
+
+    Si un job est déjà actif, il est réutilisé. Un job encore en file est
+    remonté à la priorité demandée (clic user sur un compte planifié).
+
+    Returns:
+        (job, created)
+    """
+    existing = find_active_job(db, ad_account_id)
+    if existing is None:
+        job = RefreshJob(
+            tenant_id=tenant_id,
+            ad_account_id=ad_account_id,
+            status=JobStatus.QUEUED,
+            priority=priority,
+            source=source,
+            created_at=datetime.now(timezone.utc)  # Ordre FIFO à la microseconde (claim)
+        )
+        db.add(job)
+        try:
+            db.commit()
+            db.refresh(job)
+            return job, True
+        except IntegrityError:
+            # Enfilé au même moment par un autre process
+            db.rollback()
+            existing = find_active_job(db, ad_account_id)
+            if existing is None:
+                raise
+
+    if existing.status == JobStatus.QUEUED and existing.priority < priority:
+        existing.priority = priority
+        existing.source = source
+        db.commit()
+    return existing, False
+
+
+def start_job(db: Session, tenant_id: UUID, ad_account_id: UUID, source: str = "cron") -> Optional[RefreshJob]:
+    """
+    Crée un job directement RUNNING, hors file (cron_refresh.py exécuté à la main)
+
+    Le bail doit ensuite être entretenu par un LeaseHeartbeat, comme pour claim_jobs.
+
+    Returns:
+        Le job, ou None si le compte a déjà un job actif
+    """
+    if find_active_job(db, ad_account_id) is not None:
+        return None
+    now = datetime.now(timezone.utc)
+    job = RefreshJob(
+        tenant_id=tenant_id,
+        ad_account_id=ad_account_id,
+        status=JobStatus.RUNNING,
+        source=source,
+        started_at=now,
+        lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS),
+        lease_token=uuid.uuid4(),
+        attempts=1
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    db.refresh(job)
+    return job
+
+
+def claim_jobs(db: Session, limit: int, now: Optional[datetime] = None) -> List[RefreshJob]:
+    """
+    Réclame jusqu'à `limit` jobs QUEUED (priorité décroissante, puis plus anciens)
+
+    FOR UPDATE SKIP LOCKED: les lignes verrouillées par un autre worker sont
+    sautées au lieu d'attendre. Les jobs passent RUNNING avec un bail et un
+    lease_token propre à ce claim.
+    """
+    if limit <= 0:
+        return []
+    now = now or datetime.now(timezone.utc)
+    jobs = db.execute(
+        select(RefreshJob)
+        .where(RefreshJob.status == JobStatus.QUEUED)
+        .order_by(RefreshJob.priority.desc(), RefreshJob.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    for job in jobs:
+        job.status = JobStatus.RUNNING
+        job.started_at = now
+        job.lease_expires_at = now + timedelta(seconds=JOB_LEASE_SECONDS)
+        job.lease_token = uuid.uuid4()
+        job.attempts = (job.attempts or 0) + 1
+    db.commit()
+    return jobs
+
+
+def queued_jobs_in_order(
+    db: Session,
+    min_priority: int = JOB_PRIORITY_SCHEDULED,
+    limit: Optional[int] = None
+) -> List[RefreshJob]:
+    """Jobs QUEUED de priorité >= min_priority, dans l'ordre où claim_jobs les prendra (sans verrou)"""
+    return db.execute(
+        select(RefreshJob)
+        .where(RefreshJob.status == JobStatus.QUEUED, RefreshJob.priority >= min_priority)
+        .order_by(RefreshJob.priority.desc(), RefreshJob.created_at)
+        .limit(limit)
+    ).scalars().all()
+
+
+def estimate_queue(
+    queued: Sequence[RefreshJob],
+    seconds_by_account: Dict[UUID, float],
+    slots: int,
+    running: int = 0,
+    default_seconds: float = 30.0
+) -> Dict[UUID, Tuple[int, int]]:
+    """
+    Position et ETA de chaque job de la file (simulation de `slots` workers)
+
+    Chaque job démarre dès qu'un slot se libère, dans l'ordre de claim.
+    Les jobs RUNNING occupent `running` slots pendant ~default_seconds/2
+    (reste inconnu).
+
+    Returns:
+        job_id -> (position dans la file, secondes avant la fin du job)
+    """
+    slots = max(1, slots)
+    free_at = [default_seconds / 2] * min(running, slots) + [0.0] * max(0, slots - running)
+    heapq.heapify(free_at)
+    estimates = {}
+    for position, job in enumerate(queued, start=1):
+        start = heapq.heappop(free_at)
+        finish = start + seconds_by_account.get(job.ad_account_id, default_seconds)
+        heapq.heappush(free_at, finish)
+        estimates[job.id] = (position, int(round(finish)))
+    return estimates
+
+
+def _held_by(leases: Mapping[UUID, UUID]):
+    """Jobs RUNNING encore détenus par ces claims (job_id -> lease_token)"""
+    return (
+        RefreshJob.status == JobStatus.RUNNING,
+        tuple_(RefreshJob.id, RefreshJob.lease_token).in_(list(leases.items())),
+    )
+
+
+def release_jobs(db: Session, leases: Mapping[UUID, UUID]) -> int:
+    """Rend à la file des jobs réclamés mais pas démarrés (job_id -> lease_token)"""
+    if not leases:
+        return 0
+    result = db.execute(
+        update(RefreshJob)
+        .where(*_held_by(leases))
+        .values(
+            status=JobStatus.QUEUED,
+            started_at=None,
+            lease_expires_at=None,
+            lease_token=None,
+            attempts=RefreshJob.attempts - 1
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def renew_leases(db: Session, leases: Mapping[UUID, UUID], now: Optional[datetime] = None) -> Set[UUID]:
+    """
+    Heartbeat: prolonge le bail des jobs RUNNING détenus par ce process
+
+    Args:
+        leases: job_id -> lease_token du claim
+
+    Returns:
+        Jobs dont le bail est renouvelé (un job absent = bail perdu: repris
+        par requeue_expired_jobs, éventuellement réclamé par un autre worker)
+    """
+    if not leases:
+        return set()
+    now = now or datetime.now(timezone.utc)
+    renewed = db.execute(
+        update(RefreshJob)
+        .where(*_held_by(leases))
+        .values(lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS))
+        .returning(RefreshJob.id)
+    ).scalars().all()
+    db.commit()
+    return set(renewed)
+
+
+def finish_job(db: Session, job_id: UUID, lease_token: UUID, error: Optional[str] = None) -> bool:
+    """
+    Termine un job (OK, ou ERROR si `error`) - commit par l'appelant
+
+    Returns:
+        False si le bail a été perdu (job repris ailleurs: laissé intact)
+    """
+    result = db.execute(
+        update(RefreshJob)
+        .where(*_held_by({job_id: lease_token}))
+        .values(
+            status=JobStatus.ERROR if error else JobStatus.OK,
+            error=error[:1000] if error else None,
+            finished_at=datetime.now(timezone.utc),
+            lease_expires_at=None,
+            lease_token=None
+        )
+    )
+    return result.rowcount == 1
+
+
+def requeue_expired_jobs(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Jobs RUNNING dont le bail a expiré (worker tué, container redéployé)
+
+    → QUEUED pour un autre worker, ou ERROR après MAX_JOB_ATTEMPTS tentatives.
+    Les jobs RUNNING sans bail (créés avant les heartbeats) sont traités comme expirés.
+
+    Returns:
+        Nombre de jobs repris
+    """
+    now = now or datetime.now(timezone.utc)
+    expired = (
+        RefreshJob.status == JobStatus.RUNNING,
+        or_(RefreshJob.lease_expires_at.is_(None), RefreshJob.lease_expires_at < now),
+    )
+    abandoned = db.execute(
+        update(RefreshJob)
+        .where(*expired, RefreshJob.attempts >= MAX_JOB_ATTEMPTS)
+        .values(
+            status=JobStatus.ERROR,
+            error=f"Lease expired {MAX_JOB_ATTEMPTS} times - abandoned",
+            finished_at=now,
+            lease_expires_at=None,
+            lease_token=None
+        )
+    ).rowcount
+    requeued = db.execute(
+        update(RefreshJob)
+        .where(*expired)
+        .values(status=JobStatus.QUEUED, started_at=None, lease_expires_at=None, lease_token=None)
+    ).rowcount
+    db.commit()
+
+    if requeued or abandoned:
+        print(f"⏰ Bail expiré: {requeued} job(s) remis en file, {abandoned} abandonné(s)")
+    return requeued + abandoned
+
+
+class LeaseHeartbeat:
+    """
+    💓 Renouvelle les bails des jobs détenus par ce process (thread dédié)
+
+    Un thread plutôt qu'une tâche asyncio: une étape CPU longue (transform
+    d'un gros compte) bloque la boucle d'événements, pas le heartbeat. Une
+    seule requête UPDATE par tick pour tous les jobs détenus.
+
+    Bail perdu: le job n'est plus détenu et son callback on_lost est appelé
+    (depuis le thread du heartbeat: il doit être thread-safe, ex.
+    loop.call_soon_threadsafe(task.cancel)).
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], interval: float = JOB_HEARTBEAT_SECONDS):
+        self._session_factory = session_factory
+        self._interval = interval
+        self._held: Dict[UUID, UUID] = {}
+        self._on_lost: Dict[UUID, Callable[[], None]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.lost_leases = 0
+
+    def hold(self, job_id: UUID, lease_token: UUID, on_lost: Optional[Callable[[], None]] = None) -> None:
+        with self._lock:
+            self._held[job_id] = lease_token
+            if on_lost is not None:
+                self._on_lost[job_id] = on_lost
+            else:
+                self._on_lost.pop(job_id, None)
+
+    def release(self, *job_ids: UUID) -> None:
+        with self._lock:
+            for job_id in job_ids:
+                self._held.pop(job_id, None)
+                self._on_lost.pop(job_id, None)
+
+    @property
+    def held(self) -> Dict[UUID, UUID]:
+        with self._lock:
+            return dict(self._held)
+
+    def beat(self) -> int:
+        """Un renouvellement (appelé par le thread, ou directement en test)"""
+        leases = self.held
+        if not leases:
+            return 0
+        db = self._session_factory()
+        try:
+            renewed = renew_leases(db, leases)
+        finally:
+            db.close()
+
+        callbacks = []
+        with self._lock:
+            # Jobs terminés pendant le tick: plus détenus (ou re-détenus par un autre claim), pas un bail perdu
+            lost = [
+                job_id for job_id, token in leases.items()
+                if job_id not in renewed and self._held.get(job_id) == token
+            ]
+            for job_id in lost:
+                del self._held[job_id]
+                callback = self._on_lost.pop(job_id, None)
+                if callback is not None:
+                    callbacks.append(callback)
+        if lost:
+            self.lost_leases += len(lost)
+            print(f"💔 {len(lost)} bail(s) perdu(s) (job repris par un autre worker), refresh annulé(s)")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ Lease lost callback error: {type(e).__name__}: {str(e)[:200]}")
+        return len(renewed)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                self.beat()
+            except Exception as e:
+                # DB indisponible: on réessaie au tick suivant (bail valable JOB_LEASE_SECONDS)
+                print(f"⚠️ Heartbeat error: {type(e).__name__}: {str(e)[:200]}")
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self._interval)
+            self._thread = None
@@ -8,35 +8,235 @@ Gestion des rate limits avec backoff exponentiel
 - Dynamic pause based on Meta's usage percentages
 """
 import asyncio
+import copy
+import hashlib
 import json
 import random
 import logging
-from typing import Any, Dict, Optional, Tuple
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
 import httpx
 from ..config import settings
+from .creative_cache import mark_seen, select_ad_ids_to_fetch
+from ..utils import run_metrics
+from . import refresh_progress
 
 logger = logging.getLogger(__name__)
 
+# Fields matching production pipeline (fetch_with_smart_limits.py:271)
+INSIGHTS_FIELDS = (
+    "ad_id,ad_name,campaign_name,campaign_id,adset_name,adset_id,"
+    "impressions,spend,clicks,unique_outbound_clicks,reach,frequency,"
+    "cpm,ctr,actions,action_values,conversions,conversion_values,created_time"
+)
+
+# Client HTTP partagé
+# Timeouts explicites pour éviter les blocages
+# Read timeout élevé (30s) pour gros comptes comme Mandala (2000+ ads)
+DEFAULT_TIMEOUT = httpx.Timeout(
+    connect=5.0,  # 5s max pour établir la connexion
+    read=30.0,    # 30s max pour lire la réponse (Meta API peut être lent pour gros datasets)
+    write=5.0,    # 5s max pour écrire la requête
+    pool=30.0     # Pool partagé: attendre une connexion libre plutôt qu'en ouvrir une nouvelle
+)
+CREATIVES_BATCH_TIMEOUT = httpx.Timeout(60.0, pool=60.0)
+HTTP_MAX_CONNECTIONS = 50            # Connexions simultanées max vers Graph (tout le process)
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20  # Connexions gardées ouvertes entre deux requêtes
+HTTP_KEEPALIVE_EXPIRY = 30.0         # Secondes avant fermeture d'une connexion idle
+
+# Single-flight + cache TTL des appels metadata (debug_token, /me, adaccounts, campaigns)
+METADATA_CACHE_TTL_SECONDS = 60      # Couvre un login complet (callback OAuth → sync → 1er refresh)
+METADATA_CACHE_MAX_ENTRIES = 1000    # Borne mémoire (purge des entrées expirées au-delà)
+
+# API Batch Graph (insights des petits comptes)
+GRAPH_BATCH_MAX_REQUESTS = 50        # Limite Meta: 50 requêtes par POST batch
+
+# Taille de page des insights synchrones, apprise par ad account
+INSIGHTS_PAGE_SIZE_DEFAULT = 500          # Compte jamais vu
+INSIGHTS_PAGE_SIZE_MIN = 50               # En dessous: bascule en rapport asynchrone
+INSIGHTS_PAGE_SIZE_MAX = 1000
+PAGE_FAST_SECONDS = 3.0                   # Page pleine plus rapide → pages plus grandes
+PAGE_SLOW_SECONDS = 15.0                  # Page plus lente → pages plus petites (avant le read timeout)
+PAGE_MAX_BYTES = 8 * 1024 * 1024          # Payload plus gros → pages plus petites (pic mémoire du JSON)
+PAGE_SIZE_GROWTH = 1.5
+PAGE_SIZE_SHRINK = 0.5
+
+# Rapports asynchrones (gros comptes)
+ASYNC_REPORT_POLL_INITIAL_DELAY = 2.0  # Premier poll après 2s
+ASYNC_REPORT_POLL_MAX_DELAY = 30.0     # Backoff plafonné à 30s
+ASYNC_REPORT_TIMEOUT_SECONDS = 900     # 15 min max par rapport
+ASYNC_REPORT_MAX_PAGES = 1000          # Pas de timeout de lecture côté résultat: on peut aller plus loin
+
+# Throttling proactif (par ad account et par app)
+APP_THROTTLE_KEY = "app"                 # Clé de l'état de throttle au niveau app
+THROTTLE_PACE_START_PERCENT = 75         # Usage à partir duquel on espace les appels
+THROTTLE_MAX_INTERVAL_SECONDS = 20.0     # Espacement max entre 2 appels d'une même clé (~100%)
+THROTTLE_BLOCKED_DEFAULT_SECONDS = 60    # Bloqué sans estimation Meta (429 / usage >= 100%)
+THROTTLE_TREND_WINDOW_SECONDS = 300      # Fenêtre pour détecter un usage en hausse
+USAGE_HALF_LIFE_SECONDS = 300            # Demi-vie de l'usage mesuré (global_usage)
+# Codes Graph de throttling (4 = app, les autres = compte / BUC)
+APP_THROTTLE_CODES = {4}
+ACCOUNT_THROTTLE_CODES = {17, 32, 613, 80000, 80003, 80004, 80014}
+# Le code 1 seul est l'erreur transitoire générique de Meta: seul le message
+# identifie une requête trop lourde (à réduire plutôt qu'à réessayer telle quelle)
+REDUCE_DATA_MESSAGE = "reduce the amount of data"
+
 
 class MetaAPIError(Exception):
-    """Erreur lors d'un appel Meta API"""
-    pass
+    """
+    Erreur lors d'un appel Meta API
+
+    Attributes:
+        status_code: Code HTTP de la dernière réponse (None si erreur réseau)
+        code: Code d'erreur Graph (`error.code`), ex: 1, 17, 190
+        error_subcode: Sous-code Graph (`error.error_subcode`)
+        timed_out: La dernière tentative a expiré (read timeout)
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        code: Optional[int] = None,
+        error_subcode: Optional[int] = None,
+        timed_out: bool = False,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.error_subcode = error_subcode
+        self.timed_out = timed_out
+
+    @property
+    def is_reduce_data_error(self) -> bool:
+        """Meta demande de réduire le volume ("Please reduce the amount of data...")"""
+        return _is_reduce_data_message(str(self))
+
+
+def next_page_size(current: int, rows: int, seconds: float, payload_bytes: int) -> int:
+    """
+    Taille de la page suivante d'après la page reçue
+
+    - page lente ou trop lourde → PAGE_SIZE_SHRINK
+    - page pleine, rapide et légère → PAGE_SIZE_GROWTH
+    - sinon (dont dernière page incomplète: pas d'information) → inchangée
+    """
+    if seconds > PAGE_SLOW_SECONDS or payload_bytes > PAGE_MAX_BYTES:
+        size = int(current * PAGE_SIZE_SHRINK)
+    elif rows >= current and seconds < PAGE_FAST_SECONDS and payload_bytes < PAGE_MAX_BYTES / 2:
+        size = int(current * PAGE_SIZE_GROWTH)
+    else:
+        size = current
+    return max(INSIGHTS_PAGE_SIZE_MIN, min(INSIGHTS_PAGE_SIZE_MAX, size))
+
+
+def _with_limit(url: str, limit: int) -> str:
+    """Remplace le param `limit` d'une URL de pagination (le curseur `after` reste valide)"""
+    parsed = urlparse(url)
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if k != "limit"]
+    query.append(("limit", str(limit)))
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+def _is_reduce_data_message(message: Optional[str]) -> bool:
+    """Erreur "Please reduce the amount of data..." (même règle pour le retry et MetaAPIError)"""
+    return REDUCE_DATA_MESSAGE in (message or "").lower()
+
+
+def _parse_graph_error(response: httpx.Response) -> Dict[str, Any]:
+    """Extrait le bloc `error` d'une réponse Graph (vide si absent/non-JSON)"""
+    try:
+        error = response.json().get("error", {})
+        return error if isinstance(error, dict) else {}
+    except (ValueError, AttributeError):
+        return {}
 
 
 class AsyncRateLimitMonitor:
     """
     Moniteur de rate limit asynchrone pour Meta API
 
-    Parse les headers X-Business-Use-Case-Usage et X-Ad-Account-Usage
-    pour throttler AVANT de recevoir des 429.
+    Parse les headers X-Business-Use-Case-Usage, X-Ad-Account-Usage, X-App-Usage
+    et X-FB-Ads-Insights-Throttle pour throttler AVANT de recevoir des 429.
+
+    L'état de throttle est tenu PAR CLÉ (un ad account, ou l'app via APP_THROTTLE_KEY):
+    un compte saturé ne ralentit que ses propres requêtes. Aucun lock n'est tenu
+    pendant les pauses.
 
     Adapté de scripts/utils/rate_limit_manager.py pour async.
     """
 
     def __init__(self):
         self.usage_by_account: Dict[str, Dict] = {}
-        self.global_usage: float = 0.0
-        self._lock = asyncio.Lock()
+        # Clé (act_xxx / "app") -> {"usage_percent", "samples", "resume_at", "next_slot", "pace_interval"}
+        self._throttle: Dict[str, Dict[str, Any]] = {}
+        self.throttle_sleep_seconds: float = 0.0  # Cumul des pauses (télémétrie)
+        self.throttle_events: int = 0  # Nombre de 429 / erreurs de throttling reçus
+
+    @property
+    def global_usage(self) -> float:
+        """
+        Usage max (comptes + app), décroissant avec l'âge de la dernière mesure
+
+        Une mesure haute d'il y a 10 min ne compte plus que pour 1/4
+        (demi-vie USAGE_HALF_LIFE_SECONDS): la concurrence remonte quand Meta se calme.
+        """
+        now = time.monotonic()
+        usage = 0.0
+        for state in self._throttle.values():
+            if state["samples"]:
+                measured_at, value = state["samples"][-1]
+                usage = max(usage, value * 0.5 ** ((now - measured_at) / USAGE_HALF_LIFE_SECONDS))
+        return usage
+
+    def _throttle_state(self, key: str) -> Dict[str, Any]:
+        state = self._throttle.get(key)
+        if state is None:
+            state = {
+                "usage_percent": 0.0,
+                "samples": deque(),
+                "resume_at": 0.0,       # time.monotonic() avant lequel aucune requête ne part
+                "next_slot": 0.0,       # Prochain créneau libre quand les appels sont espacés
+                "pace_interval": 0.0,   # Espacement entre 2 appels (0 = pas de pacing)
+            }
+            self._throttle[key] = state
+        return state
+
+    def _update_throttle(self, key: str, usage_percent: float, regain_seconds: float = 0.0) -> Dict[str, Any]:
+        """
+        Met à jour l'état d'une clé à partir d'une mesure d'usage
+
+        - estimated_time_to_regain_access > 0 → bloqué jusqu'à cette échéance
+        - usage >= 100% sans estimation → bloqué THROTTLE_BLOCKED_DEFAULT_SECONDS
+        - usage >= THROTTLE_PACE_START_PERCENT → appels espacés, d'autant plus
+          que l'usage est haut, et doublé si l'usage monte (tendance sur 5 min)
+        """
+        now = time.monotonic()
+        state = self._throttle_state(key)
+        samples = state["samples"]
+        samples.append((now, usage_percent))
+        while samples and now - samples[0][0] > THROTTLE_TREND_WINDOW_SECONDS:
+            samples.popleft()
+        state["usage_percent"] = usage_percent
+
+        if regain_seconds > 0:
+            state["resume_at"] = max(state["resume_at"], now + regain_seconds)
+        elif usage_percent >= 100:
+            state["resume_at"] = max(state["resume_at"], now + THROTTLE_BLOCKED_DEFAULT_SECONDS)
+
+        if usage_percent >= THROTTLE_PACE_START_PERCENT:
+            ratio = min(1.0, (usage_percent - THROTTLE_PACE_START_PERCENT) / (100 - THROTTLE_PACE_START_PERCENT))
+            interval = THROTTLE_MAX_INTERVAL_SECONDS * max(ratio, 0.05) ** 2
+            if samples[-1][1] > samples[0][1]:
+                interval *= 2  # Usage en hausse → freiner plus tôt
+            state["pace_interval"] = min(interval, THROTTLE_MAX_INTERVAL_SECONDS)
+        else:
+            state["pace_interval"] = 0.0
+
+        return state
 
     def parse_headers(self, headers: httpx.Headers, account_id: str = "global") -> Dict:
         """
@@ -44,7 +244,8 @@ class AsyncRateLimitMonitor:
 
         Returns:
             {
-                'usage_percent': float (0-100),
+                'usage_percent': float (0-100, niveau compte),
+                'app_usage_percent': float (0-100, niveau app),
                 'should_pause': bool,
                 'pause_seconds': int,
                 'details': dict
@@ -52,17 +253,20 @@ class AsyncRateLimitMonitor:
         """
         usage_info = {
             'usage_percent': 0.0,
+            'app_usage_percent': 0.0,
             'should_pause': False,
             'pause_seconds': 0,
             'details': {}
         }
+        regain_seconds = 0.0
+        has_app_usage = False
 
         # X-Business-Use-Case-Usage (le plus détaillé)
         buc_header = headers.get('x-business-use-case-usage', '')
         if buc_header:
             try:
                 buc_data = json.loads(buc_header)
-                for acc_key, usages in buc_data.items():
+                for usages in buc_data.values():
                     for usage in usages:
                         call_count = usage.get('call_count', 0)
                         total_time = usage.get('total_time', 0)
@@ -73,8 +277,8 @@ class AsyncRateLimitMonitor:
                         usage_info['usage_percent'] = max(usage_info['usage_percent'], max_usage)
 
                         if estimated_time > 0:
-                            usage_info['pause_seconds'] = int(estimated_time * 60)
-                            usage_info['should_pause'] = True
+                            # Meta donne l'estimation en minutes
+                            regain_seconds = max(regain_seconds, estimated_time * 60)
 
                         usage_info['details'][usage.get('type', 'unknown')] = {
                             'calls': call_count, 'time': total_time, 'cpu': total_cputime
@@ -88,8 +292,20 @@ class AsyncRateLimitMonitor:
             try:
                 usage_data = json.loads(acc_header)
                 usage_info['usage_percent'] = usage_data.get('acc_id_util_pct', 0)
-                if 'reset_time_duration' in usage_data:
-                    usage_info['pause_seconds'] = usage_data['reset_time_duration']
+                if usage_data.get('reset_time_duration', 0) > 0 and usage_info['usage_percent'] >= 100:
+                    regain_seconds = max(regain_seconds, usage_data['reset_time_duration'])
+            except (json.JSONDecodeError, Exception):
+                pass
+
+        # X-App-Usage (quota de l'app, partagé par tous les comptes)
+        app_header = headers.get('x-app-usage', '')
+        if app_header:
+            try:
+                app_data = json.loads(app_header)
+                usage_info['app_usage_percent'] = max(
+                    app_data.get('call_count', 0), app_data.get('total_time', 0), app_data.get('total_cputime', 0)
+                )
+                has_app_usage = True
             except (json.JSONDecodeError, Exception):
                 pass
 
@@ -100,57 +316,99 @@ class AsyncRateLimitMonitor:
                 throttle_data = json.loads(throttle_header)
                 app_usage = throttle_data.get('app_id_util_pct', 0)
                 acc_usage = throttle_data.get('acc_id_util_pct', 0)
-                usage_info['usage_percent'] = max(usage_info['usage_percent'], app_usage, acc_usage)
+                usage_info['usage_percent'] = max(usage_info['usage_percent'], acc_usage)
+                usage_info['app_usage_percent'] = max(usage_info['app_usage_percent'], app_usage)
+                has_app_usage = True
             except (json.JSONDecodeError, Exception):
                 pass
 
-        # Décision de pause proactive (seuils Gemini/Meta recommandés)
-        if usage_info['usage_percent'] >= 80 and not usage_info['should_pause']:
-            usage_info['should_pause'] = True
-            if usage_info['usage_percent'] >= 90:
-                usage_info['pause_seconds'] = 120  # 2 min si > 90%
-            else:
-                usage_info['pause_seconds'] = 60   # 1 min si > 80%
+        # Pacing par compte / par app (au lieu d'une pause fixe de 60/120s)
+        state = self._update_throttle(account_id, usage_info['usage_percent'], regain_seconds)
+        if has_app_usage:
+            self._update_throttle(APP_THROTTLE_KEY, usage_info['app_usage_percent'])
+
+        wait = max(state["resume_at"] - time.monotonic(), state["pace_interval"])
+        usage_info['should_pause'] = wait > 0
+        usage_info['pause_seconds'] = int(wait)
 
         # Store for tracking
         self.usage_by_account[account_id] = usage_info
-        self.global_usage = max(self.global_usage, usage_info['usage_percent'])
 
         return usage_info
 
+    def note_rate_limited(self, account_id: str = "global", app_level: bool = False) -> None:
+        """
+        Enregistre un 429 / erreur de throttling Graph (codes 4, 17, 613, 80000+)
+
+        Si les headers n'ont pas déjà donné d'échéance, la clé concernée
+        (compte, ou app pour le code 4) est bloquée THROTTLE_BLOCKED_DEFAULT_SECONDS.
+        """
+        key = APP_THROTTLE_KEY if app_level else account_id
+        state = self._throttle_state(key)
+        self.throttle_events += 1
+        state["resume_at"] = max(state["resume_at"], time.monotonic() + THROTTLE_BLOCKED_DEFAULT_SECONDS)
+
+    def is_throttled(self, account_id: str) -> bool:
+        """True si les requêtes de ce compte sont actuellement retardées (bloqué ou espacé)"""
+        state = self._throttle.get(account_id)
+        return bool(state) and (state["resume_at"] > time.monotonic() or state["pace_interval"] > 0)
+
+    def get_throttle_delay(self, account_id: str = "global") -> float:
+        """
+        Réserve le prochain créneau pour ce compte et retourne l'attente (secondes)
+
+        Combine l'état du compte et celui de l'app. Synchrone (pas d'await):
+        deux requêtes concurrentes du même compte obtiennent deux créneaux distincts.
+        """
+        now = time.monotonic()
+        start_at = now
+        for key in (account_id, APP_THROTTLE_KEY):
+            state = self._throttle.get(key)
+            if state is None:
+                continue
+            start_at = max(start_at, state["resume_at"])
+            if state["pace_interval"] > 0:
+                start_at = max(start_at, state["next_slot"])
+                state["next_slot"] = start_at + state["pace_interval"]
+        return start_at - now
+
     async def check_and_throttle(self, account_id: str = "global") -> bool:
         """
-        Vérifie si on doit throttler et applique le délai si nécessaire.
+        Vérifie si on doit throttler ce compte et applique le délai si nécessaire.
+
+        Seules les requêtes du compte saturé (ou toutes si c'est l'app) attendent;
+        les autres comptes continuent en parallèle.
 
         Returns:
             True si on a dû attendre, False sinon
         """
-        async with self._lock:
-            usage = self.usage_by_account.get(account_id, {})
-            if usage.get('should_pause', False):
-                pause_time = usage.get('pause_seconds', 60)
-                # Ajouter jitter ±10%
-                jitter = random.uniform(0.9, 1.1)
-                actual_pause = int(pause_time * jitter)
-
-                logger.warning(f"⏸️ Rate limit proactif: pause {actual_pause}s "
-                             f"(usage: {usage.get('usage_percent', 0):.0f}%)")
-                await asyncio.sleep(actual_pause)
-
-                # Reset après pause
-                usage['should_pause'] = False
-                return True
+        delay = self.get_throttle_delay(account_id)
+        if delay <= 0:
             return False
 
+        if delay >= 5:
+            # Jitter +0-10% pour ne pas relancer toutes les requêtes du compte au même instant
+            delay *= random.uniform(1.0, 1.1)
+            usage = self.usage_by_account.get(account_id, {})
+            logger.warning(f"⏸️ Rate limit proactif {account_id}: pause {delay:.0f}s "
+                           f"(usage compte: {usage.get('usage_percent', 0):.0f}%, "
+                           f"app: {usage.get('app_usage_percent', 0):.0f}%)")
+
+        self.throttle_sleep_seconds += delay
+        run_metrics.record("throttle_sleep_ms", delay * 1000)
+        await asyncio.sleep(delay)
+        return True
+
     def get_recommended_concurrency(self) -> int:
         """
-        Retourne le nombre recommandé de requêtes parallèles basé sur l'usage.
+        Retourne le nombre recommandé de requêtes parallèles basé sur l'usage (décroissant).
         """
-        if self.global_usage >= 80:
+        usage = self.global_usage
+        if usage >= 80:
             return 2   # Très conservateur
-        elif self.global_usage >= 60:
+        elif usage >= 60:
             return 3   # Modéré
-        elif self.global_usage >= 40:
+        elif usage >= 40:
             return 5   # Normal
         else:
             return 8   # Agressif (usage faible)
@@ -185,9 +443,152 @@ class MetaClient:
         self.app_id = settings.META_APP_ID
         self.app_secret = settings.META_APP_SECRET
         self.api_version = settings.META_API_VERSION
-        self.base_url = f"https://graph.facebook.com/{self.api_version}"
+        self.base_url = f"{settings.META_GRAPH_URL}/{self.api_version}"
         # Rate limit monitor (shared across all requests)
         self.rate_monitor = AsyncRateLimitMonitor()
+        # Client HTTP partagé (pool de connexions keep-alive), créé à la demande
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.http_stats = {"requests": 0, "in_flight": 0, "peak_in_flight": 0, "clients_created": 0}
+        # Single-flight (appels identiques en cours) + cache TTL des metadata
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._metadata_cache: Dict[str, Tuple[float, Any]] = {}
+        self.cache_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+        # Taille de page insights apprise par ad account (persistée par le refresher)
+        self._page_sizes: Dict[str, int] = {}
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """
+        Retourne le client HTTP partagé du process (un par event loop)
+
+        Un seul pool de connexions vers graph.facebook.com: chaque page d'insights
+        et chaque batch de creatives réutilise une connexion TLS déjà ouverte.
+        """
+        loop = asyncio.get_running_loop()
+        if self._http_client is None or self._http_client.is_closed or self._http_loop is not loop:
+            http2 = settings.META_HTTP2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning("META_HTTP2=true mais le paquet 'h2' est absent, fallback HTTP/1.1")
+                    http2 = False
+
+            self._http_client = httpx.AsyncClient(
+                timeout=DEFAULT_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                ),
+                http2=http2,
+            )
+            self._http_loop = loop
+            self.http_stats["clients_created"] += 1
+        return self._http_client
+
+    async def _send(self, request_coro) -> httpx.Response:
+        """Exécute une requête en comptabilisant l'usage du pool"""
+        self.http_stats["requests"] += 1
+        self.http_stats["in_flight"] += 1
+        self.http_stats["peak_in_flight"] = max(
+            self.http_stats["peak_in_flight"], self.http_stats["in_flight"]
+        )
+        try:
+            return await request_coro
+        finally:
+            self.http_stats["in_flight"] -= 1
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        Métriques du pool HTTP (requêtes, in-flight, connexions ouvertes/idle)
+        """
+        stats = dict(self.http_stats)
+        stats["open_connections"] = 0
+        stats["idle_connections"] = 0
+        try:
+            # httpx n'expose pas le pool publiquement: lecture best-effort via httpcore
+            connections = self._http_client._transport._pool.connections if self._http_client else []
+            stats["open_connections"] = len(connections)
+            stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+        except AttributeError:
+            pass
+        return stats
+
+    @staticmethod
+    def _call_key(url: str, params: Dict[str, Any]) -> str:
+        """
+        Clé d'un appel Graph: URL + params triés, hashés (aucun token en clair en mémoire de cache)
+        """
+        raw = json.dumps([url, sorted((k, str(v)) for k, v in params.items())])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def _single_flight(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[Any]],
+        ttl_seconds: float = 0
+    ) -> Any:
+        """
+        Exécute `call` une seule fois pour tous les appelants concurrents de même clé
+
+        - Un appel identique déjà en cours est partagé (compté dans "coalesced")
+        - Si ttl_seconds > 0, le résultat est réutilisé pendant ttl_seconds ("hits")
+        - Les erreurs ne sont jamais mises en cache
+        Chaque appelant reçoit sa propre copie du résultat (les routers le modifient).
+        """
+        now = time.monotonic()
+        cached = self._metadata_cache.get(key)
+        if cached and cached[0] > now:
+            self.cache_stats["hits"] += 1
+            return copy.deepcopy(cached[1])
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.cache_stats["coalesced"] += 1
+        else:
+            self.cache_stats["misses"] += 1
+            task = asyncio.ensure_future(call())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # shield: l'annulation d'un appelant (client HTTP parti) n'annule pas les autres
+        result = await asyncio.shield(task)
+
+        # Entrée absente ou expirée: remplacée (les appelants coalescés réécrivent la même valeur)
+        cached = self._metadata_cache.get(key)
+        if ttl_seconds > 0 and (cached is None or cached[0] <= time.monotonic()):
+            if len(self._metadata_cache) >= METADATA_CACHE_MAX_ENTRIES:
+                self._metadata_cache = {
+                    k: v for k, v in self._metadata_cache.items() if v[0] > now
+                }
+                if len(self._metadata_cache) >= METADATA_CACHE_MAX_ENTRIES:
+                    self._metadata_cache.clear()
+            self._metadata_cache[key] = (time.monotonic() + ttl_seconds, result)
+        return copy.deepcopy(result)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Métriques single-flight / cache metadata (hits, misses, coalesced, entrées)"""
+        return {**self.cache_stats, "entries": len(self._metadata_cache), "in_flight": len(self._inflight)}
+
+    def invalidate_metadata_cache(self) -> None:
+        """Vide le cache metadata (ex: après révocation d'un token)"""
+        self._metadata_cache.clear()
+
+    def get_page_size(self, account_id: str) -> int:
+        """Taille de page insights apprise pour ce compte (INSIGHTS_PAGE_SIZE_DEFAULT sinon)"""
+        return self._page_sizes.get(account_id, INSIGHTS_PAGE_SIZE_DEFAULT)
+
+    def set_page_size(self, account_id: str, size: int) -> None:
+        """Initialise la taille de page d'un compte (valeur persistée d'un run précédent)"""
+        self._page_sizes[account_id] = max(INSIGHTS_PAGE_SIZE_MIN, min(INSIGHTS_PAGE_SIZE_MAX, int(size)))
+
+    async def aclose(self) -> None:
+        """Ferme le client HTTP partagé (shutdown API / fin du cron)"""
+        if self._http_client is not None and not self._http_client.is_closed:
+            await self._http_client.aclose()
+        self._http_client = None
+        self._http_loop = None
 
     # DISABLED: appsecret_proof causes 400 errors with production tokens
     # Meta docs say it's optional for user access tokens
@@ -208,72 +609,113 @@ class MetaClient:
         url: str,
         params: Optional[Dict[str, Any]] = None,
         json_data: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
         attempts: int = 4,
         base_delay: float = 0.4,
         account_id: str = "global",
+        retry_timeouts: bool = True,
+        stats: Optional[Dict[str, Any]] = None,
+        timeout: Optional[httpx.Timeout] = None,
     ) -> Dict[str, Any]:
         """
         Effectue une requête HTTP avec retry intelligent
 
+        Réessayés (backoff): 5xx, erreurs réseau, 429 et codes de throttling Graph.
+        Levés tout de suite: autres 4xx (auth, permission...) et "reduce the amount of data".
+
         Args:
             method: GET, POST, etc.
             url: URL complète
             params: Query parameters
             json_data: JSON body (pour POST)
+            data: Body form-encoded (pour POST, ex: API Batch)
             attempts: Nombre max de tentatives
             base_delay: Délai de base pour backoff (secondes)
             account_id: ID du compte pour tracking rate limits
+            retry_timeouts: False → un read timeout est levé tout de suite
+                (l'appelant réessaie avec une requête plus légère)
+            stats: Si fourni, rempli avec "seconds" et "bytes" de la réponse réussie
+            timeout: Timeout propre à cette requête (défaut: celui du client partagé)
 
         Returns:
             Response JSON
 
         Raises:
-            MetaAPIError: En cas d'erreur après tous les retries
-        """
-        # Timeouts explicites pour éviter les blocages
-        # Read timeout élevé (30s) pour gros comptes comme Mandala (2000+ ads)
-        timeout = httpx.Timeout(
-            connect=5.0,  # 5s max pour établir la connexion
-            read=30.0,    # 30s max pour lire la réponse (Meta API peut être lent pour gros datasets)
-            write=5.0,    # 5s max pour écrire la requête
-            pool=5.0      # 5s max pour obtenir une connexion du pool
-        )
+            MetaAPIError: Erreur définitive, ou après tous les retries
+        """
+        client = self._get_http_client()
+        request_options = {"timeout": timeout} if timeout is not None else {}
 
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            for attempt in range(1, attempts + 1):
-                try:
-                    # ⚡ Check proactive rate limit AVANT la requête
-                    await self.rate_monitor.check_and_throttle(account_id)
-
-                    # Effectuer la requête
-                    if method.upper() == "GET":
-                        response = await client.get(url, params=params)
-                    elif method.upper() == "POST":
-                        response = await client.post(url, params=params, json=json_data)
-                    else:
-                        raise ValueError(f"Method {method} not supported")
-
-                    # ⚡ Parse rate limit headers APRÈS chaque réponse
-                    self.rate_monitor.parse_headers(response.headers, account_id)
-
-                    # Gestion des erreurs HTTP
-                    # Stop retry sur 4xx (sauf 429 rate limit)
-                    if 400 <= response.status_code < 500 and response.status_code != 429:
-                        response.raise_for_status()
-                        return response.json()
-
-                    # 5xx ou 429 → retry
-                    response.raise_for_status()
-                    return response.json()
-
-                except (httpx.HTTPStatusError, httpx.ConnectError, httpx.ReadTimeout) as e:
-                    # Dernière tentative → raise
-                    if attempt == attempts:
-                        raise MetaAPIError(f"Meta API error after {attempts} attempts: {e}")
-
-                    # Backoff exponentiel + jitter
-                    delay = base_delay * (2 ** (attempt - 1)) + random.random() * 0.2
-                    await asyncio.sleep(delay)
+        for attempt in range(1, attempts + 1):
+            try:
+                # ⚡ Check proactive rate limit AVANT la requête
+                await self.rate_monitor.check_and_throttle(account_id)
+
+                # Effectuer la requête (client partagé: keep-alive, pas de handshake TLS)
+                run_metrics.record("graph_calls")
+                started = time.monotonic()
+                if method.upper() == "GET":
+                    response = await self._send(client.get(url, params=params, **request_options))
+                elif method.upper() == "POST":
+                    response = await self._send(
+                        client.post(url, params=params, json=json_data, data=data, **request_options)
+                    )
+                else:
+                    raise ValueError(f"Method {method} not supported")
+
+                # ⚡ Parse rate limit headers APRÈS chaque réponse
+                self.rate_monitor.parse_headers(response.headers, account_id)
+
+                # Gestion des erreurs HTTP: 5xx et throttling → retry,
+                # autres 4xx → MetaAPIError immédiate (voir plus bas)
+                response.raise_for_status()
+                if stats is not None:
+                    stats["seconds"] = time.monotonic() - started
+                    stats["bytes"] = len(response.content)
+                return response.json()
+
+            except (httpx.HTTPStatusError, httpx.ConnectError, httpx.ReadTimeout, httpx.PoolTimeout) as e:
+                # "Reduce the amount of data" → inutile de réessayer la même requête
+                # (un code 1 sans ce message est une erreur transitoire: retry)
+                graph_error = _parse_graph_error(e.response) if isinstance(e, httpx.HTTPStatusError) else {}
+                graph_code = graph_error.get("code")
+                reduce_data = _is_reduce_data_message(graph_error.get("message"))
+
+                # Throttling Meta → bloquer uniquement le compte concerné (ou l'app pour le code 4)
+                throttled = isinstance(e, httpx.HTTPStatusError) and (
+                    e.response.status_code == 429
+                    or graph_code in APP_THROTTLE_CODES
+                    or graph_code in ACCOUNT_THROTTLE_CODES
+                )
+                if throttled:
+                    self.rate_monitor.note_rate_limited(
+                        account_id, app_level=graph_code in APP_THROTTLE_CODES
+                    )
+
+                # 4xx hors throttling (token invalide 190, permission 10/200, 403...):
+                # réessayer ne change rien, le circuit breaker doit le voir tout de suite
+                client_error = (
+                    isinstance(e, httpx.HTTPStatusError)
+                    and 400 <= e.response.status_code < 500
+                    and not throttled
+                )
+                timed_out = isinstance(e, httpx.ReadTimeout)
+
+                # Dernière tentative ou erreur définitive → raise
+                if attempt == attempts or reduce_data or client_error or (timed_out and not retry_timeouts):
+                    if isinstance(e, httpx.HTTPStatusError):
+                        raise MetaAPIError(
+                            f"Meta API error after {attempt} attempts: {e} "
+                            f"({graph_error.get('message', '')})",
+                            status_code=e.response.status_code,
+                            code=graph_code,
+                            error_subcode=graph_error.get("error_subcode"),
+                        )
+                    raise MetaAPIError(f"Meta API error after {attempt} attempts: {e}", timed_out=timed_out)
+
+                # Backoff exponentiel + jitter
+                delay = base_delay * (2 ** (attempt - 1)) + random.random() * 0.2
+                await asyncio.sleep(delay)
 
         raise MetaAPIError("Unexpected error in retry loop")
 
@@ -370,14 +812,15 @@ class MetaClient:
         """
         app_token = f"{self.app_id}|{self.app_secret}"
         debug_url = f"{self.base_url}/debug_token"
+        params = {
+            "input_token": access_token,
+            "access_token": app_token,
+        }
 
-        response = await self._request_with_retry(
-            "GET",
-            debug_url,
-            params={
-                "input_token": access_token,
-                "access_token": app_token,
-            }
+        response = await self._single_flight(
+            self._call_key(debug_url, params),
+            lambda: self._request_with_retry("GET", debug_url, params=params),
+            ttl_seconds=METADATA_CACHE_TTL_SECONDS,
         )
         return response["data"]
 
@@ -390,14 +833,15 @@ class MetaClient:
             fields: Champs à récupérer (séparés par virgules)
         """
         me_url = f"{self.base_url}/me"
+        params = {
+            "access_token": access_token,
+            "fields": fields,
+        }
 
-        return await self._request_with_retry(
-            "GET",
-            me_url,
-            params={
-                "access_token": access_token,
-                "fields": fields,
-            }
+        return await self._single_flight(
+            self._call_key(me_url, params),
+            lambda: self._request_with_retry("GET", me_url, params=params),
+            ttl_seconds=METADATA_CACHE_TTL_SECONDS,
         )
 
     async def get_ad_accounts(
@@ -419,7 +863,6 @@ class MetaClient:
         """
         accounts_url = f"{self.base_url}/me/adaccounts"
 
-        all_accounts = []
         params = {
             "access_token": access_token,
             "fields": fields,
@@ -427,25 +870,12 @@ class MetaClient:
         }
 
         # Paginate through all results
-        next_url = accounts_url
-        page_count = 0
-        max_pages = 50  # Safety limit (50 pages * 100 comptes = 5000 max)
-
-        while next_url and page_count < max_pages:
-            response = await self._request_with_retry("GET", next_url, params=params)
-
-            if "data" in response:
-                all_accounts.extend(response["data"])
-
-            # Check for next page
-            if "paging" in response and "next" in response["paging"]:
-                next_url = response["paging"]["next"]
-                params = {}  # Next URL contient déjà les params
-                page_count += 1
-            else:
-                break
-
-        return all_accounts
+        # Safety limit (50 pages * 100 comptes = 5000 max)
+        return await self._single_flight(
+            self._call_key(accounts_url, params),
+            lambda: self._paginate(accounts_url, params, max_pages=50),
+            ttl_seconds=METADATA_CACHE_TTL_SECONDS,
+        )
 
     async def get_campaigns(
         self,
@@ -467,26 +897,126 @@ class MetaClient:
             List of campaigns with selected fields
         """
         campaigns_url = f"{self.base_url}/{ad_account_id}/campaigns"
+        params = {
+            "access_token": access_token,
+            "fields": fields,
+            "limit": limit,
+        }
 
-        response = await self._request_with_retry(
-            "GET",
-            campaigns_url,
-            params={
-                "access_token": access_token,
-                "fields": fields,
-                "limit": limit,
-            }
+        response = await self._single_flight(
+            self._call_key(campaigns_url, params),
+            lambda: self._request_with_retry(
+                "GET", campaigns_url, params=params, account_id=ad_account_id
+            ),
+            ttl_seconds=METADATA_CACHE_TTL_SECONDS,
         )
 
         return response.get("data", [])
 
+    async def _paginate(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        account_id: str = "global",
+        max_pages: int = 200,
+        checkpoint: Optional[Any] = None,
+        adaptive_limit: bool = False
+    ) -> list[Dict[str, Any]]:
+        """
+        Suit les curseurs `paging.next` et concatène les `data`
+
+        Args:
+            url: URL de la première page
+            params: Query params de la première page (la next URL les contient déjà)
+            account_id: ID du compte pour tracking rate limits
+            max_pages: Safety limit
+            checkpoint: PageCheckpoint (insights_spool) - chaque page est spoolée
+                sur disque et un fetch interrompu reprend au dernier curseur
+            adaptive_limit: Taille de page apprise pour account_id (get_page_size).
+                Elle grossit après des pages rapides, rétrécit après des pages lentes
+                ou lourdes; un timeout / "reduce the amount of data" rejoue le même
+                curseur avec une page plus petite.
+        """
+        all_rows = []
+        next_url = url
+        page_count = 0
+        access_token = (params or {}).get("access_token")
+
+        if checkpoint is not None:
+            all_rows, cursor, complete = checkpoint.resume()
+            if complete:
+                return all_rows
+            if cursor:
+                # Le curseur est stocké sans token: le remettre
+                separator = "&" if "?" in cursor else "?"
+                next_url = f"{cursor}{separator}{urlencode({'access_token': access_token})}" if access_token else cursor
+                params = None
+                print(f"   ♻️ {account_id}: reprise au curseur ({len(all_rows)} rows déjà spoolées)")
+
+        while next_url and page_count < max_pages:
+            limit = None
+            if adaptive_limit:
+                limit = self.get_page_size(account_id)
+                if params is not None:
+                    params = {**params, "limit": limit}
+                else:
+                    next_url = _with_limit(next_url, limit)
+
+            # ⚡ Pass account_id for rate limit tracking
+            stats: Dict[str, Any] = {}
+            try:
+                response = await self._request_with_retry(
+                    "GET", next_url, params=params, account_id=account_id,
+                    # Timeout: rejouer tout de suite avec une page plus petite (retry classique au minimum)
+                    retry_timeouts=not adaptive_limit or limit <= INSIGHTS_PAGE_SIZE_MIN,
+                    stats=stats
+                )
+            except MetaAPIError as e:
+                if not adaptive_limit or limit <= INSIGHTS_PAGE_SIZE_MIN:
+                    raise
+                if not (e.is_reduce_data_error or e.timed_out):
+                    raise
+                self._page_sizes[account_id] = max(INSIGHTS_PAGE_SIZE_MIN, int(limit * PAGE_SIZE_SHRINK))
+                reason = "timeout" if e.timed_out else "reduce data"
+                print(f"   📉 {account_id}: page de {limit} rows refusée ({reason}), "
+                      f"même curseur à {self._page_sizes[account_id]}")
+                continue
+
+            page_rows = response.get("data", [])
+            all_rows.extend(page_rows)
+            run_metrics.record("graph_pages")
+            run_metrics.record("graph_rows", len(page_rows))
+            refresh_progress.report_pages()
+
+            if adaptive_limit:
+                self._page_sizes[account_id] = next_page_size(
+                    limit, len(page_rows), stats.get("seconds", 0.0), stats.get("bytes", 0)
+                )
+
+            # Check for next page
+            if "paging" in response and "next" in response["paging"]:
+                next_url = response["paging"]["next"]
+                params = None  # Next URL contains all params ({} écraserait sa query string)
+                page_count += 1
+            else:
+                next_url = None
+
+            if checkpoint is not None:
+                checkpoint.save_page(page_rows, next_url)
+
+        if checkpoint is not None:
+            checkpoint.mark_complete()
+        return all_rows
+
     async def get_insights_daily(
         self,
         ad_account_id: str,
         access_token: str,
         since_date: str,
         until_date: str,
-        limit: int = 1000  # Optimized: 1000 instead of 500 reduces pagination calls significantly
+        limit: Optional[int] = None,
+        use_async_report: bool = False,
+        checkpoint: Optional[Any] = None
     ) -> list[Dict[str, Any]]:
         """
         Récupère les insights daily (time_increment=1) pour un ad account
@@ -498,7 +1028,13 @@ class MetaClient:
             access_token: Token de l'utilisateur
             since_date: Date de début (YYYY-MM-DD)
             until_date: Date de fin (YYYY-MM-DD)
-            limit: Nombre max de rows par page (max 500)
+            limit: Nombre de rows par page. None → taille apprise pour ce compte,
+                ajustée page après page (voir _paginate, adaptive_limit)
+            use_async_report: Utiliser un job de rapport asynchrone (gros comptes).
+                En mode synchrone, une erreur "reduce the amount of data" bascule
+                automatiquement en mode asynchrone.
+            checkpoint: PageCheckpoint pour reprendre un fetch synchrone interrompu
+                (le mode asynchrone n'est pas spoolé)
 
         Returns:
             List of daily ad insights with fields:
@@ -511,58 +1047,196 @@ class MetaClient:
         """
         insights_url = f"{self.base_url}/{ad_account_id}/insights"
 
-        # Fields matching production pipeline (fetch_with_smart_limits.py:271)
-        fields = (
-            "ad_id,ad_name,campaign_name,campaign_id,adset_name,adset_id,"
-            "impressions,spend,clicks,unique_outbound_clicks,reach,frequency,"
-            "cpm,ctr,actions,action_values,conversions,conversion_values,created_time"
-        )
-
-        all_insights = []
         params = {
             "access_token": access_token,
+            **self._insights_params(since_date, until_date),
+        }
+
+        if use_async_report:
+            return await self._get_insights_async(
+                ad_account_id, access_token, params, limit or self.get_page_size(ad_account_id)
+            )
+
+        try:
+            return await self._paginate(
+                insights_url, {**params, "limit": limit or self.get_page_size(ad_account_id)},
+                account_id=ad_account_id, max_pages=200,
+                checkpoint=checkpoint, adaptive_limit=limit is None
+            )
+        except MetaAPIError as e:
+            if not e.is_reduce_data_error:
+                raise
+            if checkpoint is not None:
+                checkpoint.reset()
+            print(f"   ⚠️ {ad_account_id}: Meta demande moins de données, bascule en rapport asynchrone")
+            return await self._get_insights_async(
+                ad_account_id, access_token, params, limit or self.get_page_size(ad_account_id)
+            )
+
+    @staticmethod
+    def _insights_params(since_date: str, until_date: str) -> Dict[str, str]:
+        """Params des insights daily niveau ad (sans token ni limit)"""
+        return {
             "level": "ad",
             "time_range": json.dumps({"since": since_date, "until": until_date}),
             "time_increment": "1",  # ← CRITICAL: daily data
-            "fields": fields,
-            "limit": limit,
+            "fields": INSIGHTS_FIELDS,
             "action_report_time": "conversion",  # Align with Ads Manager
             "use_unified_attribution_setting": "true"  # Best practice
         }
 
-        # Paginate through all results
-        next_url = insights_url
-        page_count = 0
-        max_pages = 200  # Safety limit
+    async def get_insights_daily_batch(
+        self,
+        windows: Dict[str, Tuple[str, str]],
+        access_token: str,
+        limit: int = 500
+    ) -> Dict[str, list]:
+        """
+        Insights daily de plusieurs petits comptes via l'API Batch Graph
 
-        while next_url and page_count < max_pages:
-            # ⚡ Pass account_id for rate limit tracking
-            response = await self._request_with_retry(
-                "GET", next_url, params=params, account_id=ad_account_id
-            )
+        Jusqu'à GRAPH_BATCH_MAX_REQUESTS comptes par POST au lieu d'une chaîne
+        HTTP par compte. Seules les réponses paginées déclenchent des appels
+        supplémentaires (pages suivantes du compte concerné).
 
-            if "data" in response:
-                all_insights.extend(response["data"])
+        Args:
+            windows: ad_account_id -> (since_date, until_date)
+            access_token: Token de l'utilisateur (le même pour tous les comptes)
+            limit: Rows par page
 
-            # Check for next page
-            if "paging" in response and "next" in response["paging"]:
-                next_url = response["paging"]["next"]
-                params = {}  # Next URL contains all params
-                page_count += 1
-            else:
-                break
+        Returns:
+            ad_account_id -> rows, uniquement pour les comptes récupérés avec succès.
+            Les comptes absents (erreur, compte throttlé) sont à fetcher individuellement.
+        """
+        results: Dict[str, list] = {}
+        # Un compte déjà ralenti ne doit pas retarder tout le batch
+        eligible = [act for act in windows if not self.rate_monitor.is_throttled(act)]
+
+        for i in range(0, len(eligible), GRAPH_BATCH_MAX_REQUESTS):
+            chunk = eligible[i:i + GRAPH_BATCH_MAX_REQUESTS]
+            batch = [
+                {
+                    "method": "GET",
+                    "relative_url": f"{act}/insights?" + urlencode(
+                        {**self._insights_params(*windows[act]), "limit": limit}
+                    ),
+                }
+                for act in chunk
+            ]
+
+            try:
+                responses = await self._request_with_retry(
+                    "POST",
+                    self.base_url,
+                    data={"access_token": access_token, "batch": json.dumps(batch)},
+                )
+            except MetaAPIError as e:
+                logger.warning(f"Batch insights échoué ({len(chunk)} comptes): {e}")
+                continue
+
+            follow_ups = []
+            for act, item in zip(chunk, responses or []):
+                # item None = requête du batch non exécutée (timeout côté Meta)
+                if not item or item.get("code") != 200:
+                    continue
+                item_headers = httpx.Headers({h["name"]: h["value"] for h in item.get("headers") or []})
+                self.rate_monitor.parse_headers(item_headers, act)
 
-        return all_insights
+                try:
+                    body = json.loads(item["body"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                rows = body.get("data", [])
+                next_url = body.get("paging", {}).get("next")
+                if next_url:
+                    follow_ups.append((act, rows, next_url))
+                else:
+                    results[act] = rows
+
+            async def _follow(act: str, first_rows: list, next_url: str) -> None:
+                if "access_token=" not in next_url:
+                    separator = "&" if "?" in next_url else "?"
+                    next_url = f"{next_url}{separator}{urlencode({'access_token': access_token})}"
+                try:
+                    results[act] = first_rows + await self._paginate(next_url, None, account_id=act)
+                except MetaAPIError as e:
+                    logger.warning(f"Pages suivantes {act} échouées, fetch individuel: {e}")
+
+            await asyncio.gather(*[_follow(*follow_up) for follow_up in follow_ups])
+
+        return results
+
+    async def _get_insights_async(
+        self,
+        ad_account_id: str,
+        access_token: str,
+        params: Dict[str, Any],
+        limit: int
+    ) -> list[Dict[str, Any]]:
+        """
+        Insights via un job de rapport asynchrone (POST /insights → report_run_id)
+
+        1. POST du job avec les mêmes paramètres que la version synchrone
+        2. Poll de `async_status` avec backoff (asyncio.sleep, ne bloque pas la loop)
+        3. Pagination du résultat sur /{report_run_id}/insights
+
+        Raises:
+            MetaAPIError: Job échoué/annulé côté Meta ou timeout de polling
+        """
+        run = await self._request_with_retry(
+            "POST", f"{self.base_url}/{ad_account_id}/insights",
+            params=params, account_id=ad_account_id
+        )
+        report_run_id = run.get("report_run_id")
+        if not report_run_id:
+            raise MetaAPIError(f"No report_run_id returned for {ad_account_id}: {run}")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + ASYNC_REPORT_TIMEOUT_SECONDS
+        delay = ASYNC_REPORT_POLL_INITIAL_DELAY
+
+        while True:
+            status = await self._request_with_retry(
+                "GET", f"{self.base_url}/{report_run_id}",
+                params={
+                    "access_token": access_token,
+                    "fields": "async_status,async_percent_completion",
+                },
+                account_id=ad_account_id
+            )
+            async_status = status.get("async_status", "")
+
+            if async_status == "Job Completed":
+                break
+            if async_status in ("Job Failed", "Job Skipped"):
+                raise MetaAPIError(f"Async report {report_run_id} for {ad_account_id}: {async_status}")
+            if loop.time() + delay > deadline:
+                raise MetaAPIError(
+                    f"Async report {report_run_id} for {ad_account_id} not completed after "
+                    f"{ASYNC_REPORT_TIMEOUT_SECONDS}s ({status.get('async_percent_completion', 0)}%)"
+                )
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.5, ASYNC_REPORT_POLL_MAX_DELAY)
+
+        return await self._paginate(
+            f"{self.base_url}/{report_run_id}/insights",
+            {"access_token": access_token, "limit": limit},
+            account_id=ad_account_id,
+            max_pages=ASYNC_REPORT_MAX_PAGES
+        )
 
     async def fetch_creatives_batch(
         self,
         ad_ids: list[str],
-        access_token: str
+        access_token: str,
+        account_id: str = "global"
     ) -> Dict[str, dict]:
         """
         Récupère les creatives (format, media_url) pour un batch de max 50 ads
 
-        Utilise l'API Batch de Meta pour optimiser les appels
+        Utilise l'API Batch de Meta pour optimiser les appels. Passe par
+        _request_with_retry comme les autres appels: throttle du compte,
+        headers de rate limit (BUC) et compteur graph_calls.
         """
         if not ad_ids or len(ad_ids) == 0:
             return {}
@@ -579,22 +1253,18 @@ class MetaClient:
             })
 
         try:
-            params = {
-                "access_token": access_token,
-                "batch": json.dumps(batch_requests)
-            }
-
-            async with httpx.AsyncClient(timeout=httpx.Timeout(60.0)) as client:
-                response = await client.post(self.base_url, data=params)
-
-            if response.status_code != 200:
-                return {}
+            batch_responses = await self._request_with_retry(
+                "POST",
+                self.base_url,
+                data={"access_token": access_token, "batch": json.dumps(batch_requests)},
+                account_id=account_id,
+                timeout=CREATIVES_BATCH_TIMEOUT,
+            )
 
             results = {}
-            batch_responses = response.json()
-
-            for i, resp in enumerate(batch_responses):
-                if resp.get("code") == 200:
+            for i, resp in enumerate(batch_responses or []):
+                # resp None = requête du batch non exécutée (timeout côté Meta)
+                if resp and resp.get("code") == 200:
                     ad_data = json.loads(resp["body"])
                     ad_id = ad_ids[i]
 
@@ -641,6 +1311,7 @@ class MetaClient:
         access_token: str,
         since_date: str,
         until_date: str,
+        time_increment: Optional[int] = None,
     ) -> list[Dict[str, Any]]:
         """
         Récupère les insights avec breakdowns age/gender pour un ad account
@@ -650,6 +1321,8 @@ class MetaClient:
             access_token: Token de l'utilisateur
             since_date: Date de début (YYYY-MM-DD)
             until_date: Date de fin (YYYY-MM-DD)
+            time_increment: 1 = une row par jour et par segment (date_start),
+                None = agrégé sur toute la période
 
         Returns:
             List of insights with age/gender breakdowns:
@@ -669,34 +1342,17 @@ class MetaClient:
             "action_report_time": "conversion",
             "use_unified_attribution_setting": "true"
         }
+        if time_increment:
+            params["time_increment"] = str(time_increment)
 
-        all_results = []
-        next_url = insights_url
-        page_count = 0
-        max_pages = 50  # Safety limit
-
-        while next_url and page_count < max_pages:
-            response = await self._request_with_retry(
-                "GET", next_url, params=params, account_id=ad_account_id
-            )
-
-            if "data" in response:
-                all_results.extend(response["data"])
-
-            # Check for next page
-            if "paging" in response and "next" in response["paging"]:
-                next_url = response["paging"]["next"]
-                params = {}  # Next URL contains all params
-                page_count += 1
-            else:
-                break
-
-        return all_results
+        return await self._paginate(insights_url, params, account_id=ad_account_id, max_pages=50)
 
     async def enrich_ads_with_creatives(
         self,
         ads: list[Dict[str, Any]],
-        access_token: str
+        access_token: str,
+        creative_cache: Optional[Dict[str, Dict[str, Any]]] = None,
+        account_id: str = "global"
     ) -> list[Dict[str, Any]]:
         """
         Enrichit les ads avec leurs creatives (format, media_url, status)
@@ -706,6 +1362,10 @@ class MetaClient:
         Args:
             ads: Liste des ads à enrichir (doit contenir 'ad_id')
             access_token: Token Meta
+            creative_cache: Cache persistant ad_id -> creative (modifié en place).
+                Si fourni, seules les ads nouvelles/expirées/au statut changeant
+                sont re-fetchées (voir services/creative_cache.py)
+            account_id: Compte des ads (throttle et rate limits par compte)
 
         Returns:
             Liste des ads enrichies avec format, media_url, status
@@ -713,8 +1373,15 @@ class MetaClient:
         if not ads:
             return ads
 
-        # Extraire les unique ad_ids
-        ad_ids = list(set(ad['ad_id'] for ad in ads if 'ad_id' in ad))
+        now = datetime.now(timezone.utc)
+
+        # Extraire les unique ad_ids (seulement ceux à rafraîchir si cache fourni)
+        if creative_cache is not None:
+            ad_ids = select_ad_ids_to_fetch(ads, creative_cache, now)
+            print(f"   🗃️ Creative cache: {len(ad_ids)} à fetcher, "
+                  f"{len(set(ad['ad_id'] for ad in ads if 'ad_id' in ad)) - len(ad_ids)} depuis le cache")
+        else:
+            ad_ids = list(set(ad['ad_id'] for ad in ads if 'ad_id' in ad))
 
         # Grouper en batchs de 50
         batches = [ad_ids[i:i+50] for i in range(0, len(ad_ids), 50)]
@@ -725,13 +1392,25 @@ class MetaClient:
         # Process by chunks of 25 batches at a time
         for chunk_start in range(0, len(batches), 25):
             chunk = batches[chunk_start:chunk_start+25]
-            tasks = [self.fetch_creatives_batch(batch, access_token) for batch in chunk]
+            tasks = [self.fetch_creatives_batch(batch, access_token, account_id) for batch in chunk]
             results = await asyncio.gather(*tasks, return_exceptions=True)
 
             for result in results:
                 if isinstance(result, dict):
                     creative_data.update(result)
 
+        # Mettre à jour le cache, puis enrichir depuis le cache
+        # (une ad dont le re-fetch a échoué garde sa dernière valeur connue)
+        if creative_cache is not None:
+            now_iso = now.isoformat()
+            for ad_id, creative in creative_data.items():
+                creative_cache[ad_id] = {**creative, "fetched_at": now_iso}
+            mark_seen(ads, creative_cache, now)
+            creative_data = {
+                ad_id: {k: v for k, v in entry.items() if k not in ("fetched_at", "seen_at", "delivering")}
+                for ad_id, entry in creative_cache.items()
+            }
+
         # Enrichir les ads avec les données creative
         enriched_count = 0
         for ad in ads:
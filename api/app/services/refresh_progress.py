@@ -0,0 +1,249 @@
+"""
+📡 Progression des refresh en direct (SSE, voir routers/accounts.py)
+
+Les refresh tournent dans les workers (refresh_worker.py), les clients sont
+connectés à l'API: les événements passent par PostgreSQL LISTEN/NOTIFY.
+
+- Côté worker: refresh_single_account lie le job courant (bind), le
+  refresher et meta_client publient étape, pages et rows (report / report_pages).
+  Les compteurs viennent de run_metrics (mêmes chiffres que refresh_runs).
+- Côté API: UN listener par process (connexion psycopg dédiée, LISTEN) qui
+  redistribue aux abonnés SSE via un broker en mémoire (filtre tenant / job).
+
+Sans PostgreSQL (dev SQLite, tests), publish() livre directement au broker
+du process. Avec PostgreSQL, le NOTIFY est synchrone (connexion du pool):
+depuis la boucle asyncio du worker, il part sur un thread dédié pour ne
+pas bloquer les autres refresh.
+"""
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import text
+
+from ..utils import run_metrics
+
+PROGRESS_CHANNEL = "refresh_progress"
+PROGRESS_MIN_INTERVAL_SECONDS = 1.0   # Événements "pages" max 1/s par job (NOTIFY reste léger)
+SUBSCRIBER_QUEUE_SIZE = 100           # Client SSE lent: les plus vieux événements sont perdus
+LISTENER_RETRY_SECONDS = 5
+
+# Avancement affiché par étape (le nombre de pages d'un fetch n'est pas connu d'avance)
+STAGE_PERCENT = {
+    "queued": 0,
+    "started": 5,
+    "fetch": 10,
+    "enrich": 60,
+    "transform": 75,
+    "write": 85,
+    "demographics": 95,
+    "done": 100,
+}
+
+# Un seul thread: les NOTIFY partent dans l'ordre de publication (fetch avant done)
+_notify_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refresh-progress")
+
+_current_job: ContextVar[Optional[Dict[str, Any]]] = ContextVar("refresh_progress_job", default=None)
+
+
+def bind(job_id: UUID, tenant_id: UUID, fb_account_id: str) -> Token:
+    """Associe le refresh en cours à un job (reset via unbind)"""
+    return _current_job.set({
+        "job_id": str(job_id),
+        "tenant_id": str(tenant_id),
+        "account_id": fb_account_id,
+        "stage": None,
+        "last_sent": 0.0,
+    })
+
+
+def unbind(token: Token) -> None:
+    _current_job.reset(token)
+
+
+def report(stage: str, **fields: Any) -> None:
+    """Publie une étape du refresh en cours (sans job lié: ne fait rien)"""
+    job = _current_job.get()
+    if job is None:
+        return
+    job["stage"] = stage
+    _send(job, fields)
+
+
+def report_pages() -> None:
+    """Nouvelle page Graph reçue: publie pages/rows, au plus une fois par seconde"""
+    job = _current_job.get()
+    if job is None or time.monotonic() - job["last_sent"] < PROGRESS_MIN_INTERVAL_SECONDS:
+        return
+    _send(job, {})
+
+
+def report_finished(job_id: UUID, tenant_id: UUID, fb_account_id: str, error: Optional[str] = None) -> None:
+    """Fin du job (aussi pour les jobs terminés sans refresh: circuit ouvert, compte désactivé...)"""
+    job = {"job_id": str(job_id), "tenant_id": str(tenant_id), "account_id": fb_account_id, "stage": "done"}
+    _send(job, {"status": "error" if error else "ok", "error": error[:200] if error else None})
+
+
+def _send(job: Dict[str, Any], fields: Dict[str, Any]) -> None:
+    job["last_sent"] = time.monotonic()
+    metrics = run_metrics.current() or {}
+    event = {
+        "job_id": job["job_id"],
+        "tenant_id": job["tenant_id"],
+        "account_id": job["account_id"],
+        "stage": job["stage"],
+        "percent": STAGE_PERCENT.get(job["stage"], 0),
+        "pages": int(metrics.get("graph_pages", 0)),
+        # Pendant le fetch: rows des pages reçues; ensuite: rows du compte (après shards/spool)
+        "rows": int(metrics.get("rows_fetched") or metrics.get("graph_rows", 0)),
+        "at": datetime.now(timezone.utc).isoformat(),
+        **fields,
+    }
+    publish(event)
+
+
+def publish(event: Dict[str, Any]) -> None:
+    """
+    NOTIFY (PostgreSQL) ou livraison locale; une erreur n'interrompt jamais le refresh
+
+    Appelé depuis la boucle asyncio: le NOTIFY est envoyé en arrière-plan
+    (fire-and-forget), publish() ne bloque jamais la boucle.
+    """
+    from ..database import engine
+
+    if engine.dialect.name != "postgresql":
+        broker.dispatch(event)
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _notify(event)  # Hors boucle (thread, script): appel direct
+        return
+    loop.run_in_executor(_notify_executor, _notify, event)
+
+
+def _notify(event: Dict[str, Any]) -> None:
+    from ..database import engine
+
+    try:
+        with engine.connect() as conn:
+            conn.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": PROGRESS_CHANNEL, "payload": json.dumps(event, separators=(",", ":"))}
+            )
+            conn.commit()
+    except Exception as e:
+        print(f"⚠️ Progress event dropped: {type(e).__name__}: {str(e)[:100]}")
+
+
+def job_snapshot(job: Any, fb_account_id: str) -> Dict[str, Any]:
+    """État d'un RefreshJob au format des événements (premier message du flux SSE)"""
+    status = job.status.value
+    stage = {"queued": "queued", "running": "started"}.get(status, "done")
+    event = {
+        "job_id": str(job.id),
+        "tenant_id": str(job.tenant_id),
+        "account_id": fb_account_id,
+        "stage": stage,
+        "percent": STAGE_PERCENT[stage],
+        "at": datetime.now(timezone.utc).isoformat(),
+    }
+    if stage == "done":
+        event.update(status=status, error=job.error[:200] if job.error else None)
+    return event
+
+
+class Subscription:
+    """Abonnement d'un client SSE (tenant entier, ou un seul job)"""
+
+    def __init__(self, tenant_id: str, job_id: Optional[str] = None):
+        self.tenant_id = tenant_id
+        self.job_id = job_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if event.get("tenant_id") != self.tenant_id:
+            return False
+        return self.job_id is None or event.get("job_id") == self.job_id
+
+    def push(self, event: Dict[str, Any]) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class ProgressBroker:
+    """
+    Fan-out en mémoire des événements vers les clients SSE du process
+
+    Le listener LISTEN démarre au premier abonné (process API uniquement).
+    """
+
+    def __init__(self):
+        self._subscriptions: List[Subscription] = []
+        self._listener: Optional[asyncio.Task] = None
+
+    def subscribe(self, tenant_id: UUID, job_id: Optional[UUID] = None) -> Subscription:
+        subscription = Subscription(str(tenant_id), str(job_id) if job_id else None)
+        self._subscriptions.append(subscription)
+        self._ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def dispatch(self, event: Dict[str, Any]) -> None:
+        for subscription in self._subscriptions:
+            if subscription.matches(event):
+                subscription.push(event)
+
+    def _ensure_listener(self) -> None:
+        from ..database import engine
+
+        if engine.dialect.name != "postgresql":
+            return
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self) -> None:
+        """LISTEN sur une connexion dédiée (hors pool), reconnexion si elle tombe"""
+        import psycopg
+        from ..database import database_url
+
+        conninfo = database_url.replace("postgresql+psycopg://", "postgresql://", 1)
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {PROGRESS_CHANNEL}")
+                    async for notify in conn.notifies():
+                        try:
+                            self.dispatch(json.loads(notify.payload))
+                        except ValueError:
+                            continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Progress listener error: {type(e).__name__}: {str(e)[:100]}")
+            await asyncio.sleep(LISTENER_RETRY_SECONDS)
+
+    async def aclose(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+broker = ProgressBroker()
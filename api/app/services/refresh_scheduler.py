@@ -0,0 +1,159 @@
+"""
+Scheduler de priorité pour les refresh CRON
+
+Au lieu de tout rafraîchir toutes les 2h, chaque compte reçoit un score:
+- staleness : heures depuis le dernier refresh (jamais refresh = prioritaire)
+- spend     : dépense des 7 derniers jours (summary_v1.json)
+- ads actives : nombre d'ads ACTIVE (manifest.json)
+- activité user : dashboard consulté récemment (ad_accounts.last_viewed_at)
+
+Les comptes "idle" (0 spend sur 7j et 0 ad active, pas consultés) passent
+à une cadence quotidienne. Les autres gardent la cadence de 2h.
+Les comptes dont le circuit (token ou compte) est ouvert ne sont pas planifiés.
+Le cron traite les scores les plus élevés d'abord, dans la limite du budget du cycle.
+
+Après chaque refresh, ad_accounts.next_refresh_at = maintenant + cadence (± jitter):
+le worker continu (refresh_worker.py) prend les comptes au fil de leur échéance
+au lieu de tout rafraîchir en une rafale toutes les 2h.
+"""
+import asyncio
+import json
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+from uuid import UUID
+
+from ..services import storage
+from ..services.circuit_breaker import is_blocked
+from .. import models
+
+ACTIVE_CADENCE_HOURS = 2     # Comptes actifs: à chaque cycle cron
+IDLE_CADENCE_HOURS = 24      # Comptes sans activité: 1x/jour
+DUE_SLACK_MINUTES = 15       # Tolérance (le cycle cron ne tombe pas pile à 2h)
+RECENT_VIEW_HOURS = 24       # Dashboard consulté récemment = compte "suivi"
+CYCLE_BUDGET_SECONDS = 100 * 60  # Ne plus lancer de refresh après 100min (cycle de 2h)
+NEVER_REFRESHED_SCORE = 1e9  # Nouveaux comptes en premier
+NEXT_REFRESH_JITTER = 0.1    # ±10% de la cadence: les échéances se répartissent dans le temps
+ERROR_RETRY_MINUTES = 30     # Échec (ou circuit ouvert): nouvelle tentative plus tard, pas en boucle
+
+
+def load_account_signals(tenant_id: UUID, fb_account_id: str) -> Dict[str, Any]:
+    """
+    Lit spend 7j (summary_v1) et ads actives (manifest) depuis le storage.
+    Fichiers absents/invalides → signaux à 0.
+
+    Returns:
+        {"spend_7d": float (devise du compte), "active_ads": int, "ads_count": int}
+    """
+    base_path = f"tenants/{tenant_id}/accounts/{fb_account_id}/data/optimized"
+    signals = {"spend_7d": 0.0, "active_ads": 0, "ads_count": 0}
+
+    try:
+        summary = json.loads(storage.get_object(f"{base_path}/summary_v1.json").decode("utf-8"))
+        signals["spend_7d"] = summary.get("totals", {}).get("7d", {}).get("spend_cents", 0) / 100
+    except (storage.StorageError, ValueError, AttributeError):
+        pass
+
+    try:
+        manifest = json.loads(storage.get_object(f"{base_path}/manifest.json").decode("utf-8"))
+        signals["active_ads"] = int(manifest.get("active_ads", 0))
+        signals["ads_count"] = int(manifest.get("ads_count", 0))
+    except (storage.StorageError, ValueError, AttributeError):
+        pass
+
+    return signals
+
+
+def _recently_viewed(account: models.AdAccount, now: datetime) -> bool:
+    last_viewed = getattr(account, "last_viewed_at", None)
+    return bool(last_viewed and now - last_viewed < timedelta(hours=RECENT_VIEW_HOURS))
+
+
+def score_account(account: models.AdAccount, signals: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """
+    Calcule le score de priorité et la cadence d'un compte.
+
+    score = staleness_h × (1 + log10(1 + spend_7d)) × (1 + min(active_ads, 50)/50) × (2 si consulté)
+
+    Returns:
+        {"account": AdAccount, "score": float, "cadence_hours": int, "due": bool, "signals": dict}
+    """
+    viewed = _recently_viewed(account, now)
+    spend_7d = max(signals.get("spend_7d", 0.0), 0.0)
+    active_ads = signals.get("active_ads", 0)
+    idle = spend_7d == 0 and active_ads == 0 and not viewed
+    cadence_hours = IDLE_CADENCE_HOURS if idle else ACTIVE_CADENCE_HOURS
+
+    if account.last_refresh_at is None:
+        return {
+            "account": account, "score": NEVER_REFRESHED_SCORE,
+            "cadence_hours": cadence_hours, "due": True, "signals": signals,
+        }
+
+    staleness_hours = max(0.0, (now - account.last_refresh_at).total_seconds() / 3600)
+    next_refresh_at = getattr(account, "next_refresh_at", None)
+    if next_refresh_at is not None:
+        # Échéance fixée au dernier refresh (cadence + jitter, ou retry après erreur)
+        due = next_refresh_at <= now
+    else:
+        due = staleness_hours >= cadence_hours - DUE_SLACK_MINUTES / 60
+
+    score = (
+        staleness_hours
+        * (1 + math.log10(1 + spend_7d))
+        * (1 + min(active_ads, 50) / 50)
+        * (2 if viewed else 1)
+    )
+    return {"account": account, "score": score, "cadence_hours": cadence_hours, "due": due, "signals": signals}
+
+
+def next_refresh_time(cadence_hours: float, now: datetime) -> datetime:
+    """Prochaine échéance d'un compte: now + cadence ± NEXT_REFRESH_JITTER"""
+    jitter = random.uniform(-NEXT_REFRESH_JITTER, NEXT_REFRESH_JITTER)
+    return now + timedelta(hours=cadence_hours * (1 + jitter))
+
+
+def schedule_after_refresh(account: models.AdAccount, now: Optional[datetime] = None) -> datetime:
+    """
+    Échéance après un refresh réussi, d'après les signaux FRAIS du compte
+    (spend / ads actives viennent d'être réécrits)
+    """
+    now = now or datetime.now(timezone.utc)
+    signals = load_account_signals(account.tenant_id, account.fb_account_id)
+    return next_refresh_time(score_account(account, signals, now)["cadence_hours"], now)
+
+
+def schedule_after_error(now: Optional[datetime] = None) -> datetime:
+    """Échéance après un échec: ERROR_RETRY_MINUTES (le cycle suivant réessaiera)"""
+    now = now or datetime.now(timezone.utc)
+    return now + timedelta(minutes=ERROR_RETRY_MINUTES)
+
+
+async def plan_refresh_order(
+    accounts: List[models.AdAccount],
+    now: Optional[datetime] = None,
+    open_circuits: Optional[Set[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Score les comptes et retourne ceux à rafraîchir, score décroissant.
+
+    Les lectures storage (2 petits fichiers par compte) sont faites en parallèle.
+    open_circuits: clés des circuits bloquants (circuit_breaker.load_open_circuits),
+    ces comptes sont exclus jusqu'à leur sonde.
+
+    Returns:
+        Liste de {"account", "score", "cadence_hours", "due", "signals"} (due=True uniquement)
+    """
+    now = now or datetime.now(timezone.utc)
+    if open_circuits:
+        accounts = [a for a in accounts if not is_blocked(open_circuits, a.tenant_id, a.fb_account_id)]
+    signals = await asyncio.gather(*[
+        asyncio.to_thread(load_account_signals, account.tenant_id, account.fb_account_id)
+        for account in accounts
+    ])
+
+    scheduled = [score_account(account, sig, now) for account, sig in zip(accounts, signals)]
+    due = [s for s in scheduled if s["due"]]
+    due.sort(key=lambda s: s["score"], reverse=True)
+    return due
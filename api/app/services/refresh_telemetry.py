@@ -0,0 +1,199 @@
+"""
+📈 Télémétrie des refresh (table refresh_runs)
+
+Chaque refresh de compte enregistre ses compteurs (voir utils/run_metrics):
+durées par étape (fetch, enrich, transform, write, demographics), appels et
+pages Graph, rows, ads uniques, octets écrits, pic RSS et croissance du RSS
+pendant le refresh, pauses rate limit.
+
+Agrégats pour l'admin (routers/admin.py):
+- par compte: quels comptes dominent le coût (temps, appels Graph)
+- par cycle: durée et volume d'un cycle cron / d'une heure de worker
+
+Estimations de durée par compte (file interactive: ordre "petits d'abord", ETA).
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import select, delete, func, case
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..utils import run_metrics
+
+REFRESH_RUN_RETENTION_DAYS = 30
+
+# Durée supposée d'un compte sans historique (secondes)
+DEFAULT_BASELINE_SECONDS = 120  # Premier sync: 90 jours de données
+DEFAULT_TAIL_SECONDS = 30
+
+# Compteurs de run_metrics → colonnes de refresh_runs
+_METRIC_COLUMNS = (
+    "fetch_ms", "enrich_ms", "transform_ms", "write_ms", "demographics_ms", "throttle_sleep_ms",
+    "graph_calls", "graph_pages", "rows_fetched", "daily_rows", "unique_ads", "bytes_written",
+)
+
+
+def add_run(
+    db: Session,
+    metrics: Dict[str, Any],
+    tenant_id: UUID,
+    fb_account_id: str,
+    started_at: datetime,
+    status: str,
+    job_id: Optional[UUID] = None,
+    cycle_id: Optional[str] = None,
+    source: Optional[str] = None,
+    error: Optional[str] = None
+) -> models.RefreshRun:
+    """Ajoute la ligne de télémétrie d'un refresh (commit par l'appelant, avec le job)"""
+    finished_at = datetime.now(timezone.utc)
+    run = models.RefreshRun(
+        job_id=job_id,
+        tenant_id=tenant_id,
+        fb_account_id=fb_account_id,
+        cycle_id=cycle_id,
+        source=source,
+        status=status,
+        refresh_mode=metrics.get("refresh_mode"),
+        days_fetched=metrics.get("days_fetched"),
+        started_at=started_at,
+        finished_at=finished_at,
+        total_ms=int((finished_at - started_at).total_seconds() * 1000),
+        peak_rss_mb=run_metrics.peak_rss_mb(),
+        memory_mb=run_metrics.rss_growth_mb(metrics),
+        error=error[:1000] if error else None,
+        **{column: int(metrics.get(column, 0)) for column in _METRIC_COLUMNS}
+    )
+    db.add(run)
+    return run
+
+
+def account_aggregates(db: Session, since: datetime, limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Agrégats par compte depuis `since`, triés par temps total décroissant
+
+    Returns:
+        [{"fb_account_id", "runs", "errors", "total_ms", "avg_ms", "max_ms",
+          "graph_calls", "avg_rows", "bytes_written", "throttle_sleep_ms", "max_peak_rss_mb",
+          "avg_memory_mb"}]
+    """
+    R = models.RefreshRun
+    rows = db.execute(
+        select(
+            R.fb_account_id,
+            func.count(R.id).label("runs"),
+            func.sum(case((R.status == "error", 1), else_=0)).label("errors"),
+            func.sum(R.total_ms).label("total_ms"),
+            func.avg(R.total_ms).label("avg_ms"),
+            func.max(R.total_ms).label("max_ms"),
+            func.sum(R.graph_calls).label("graph_calls"),
+            func.avg(R.rows_fetched).label("avg_rows"),
+            func.sum(R.bytes_written).label("bytes_written"),
+            func.sum(R.throttle_sleep_ms).label("throttle_sleep_ms"),
+            func.max(R.peak_rss_mb).label("max_peak_rss_mb"),
+            func.avg(R.memory_mb).label("avg_memory_mb"),
+        )
+        .where(R.started_at >= since)
+        .group_by(R.fb_account_id)
+        .order_by(func.sum(R.total_ms).desc())
+        .limit(limit)
+    ).all()
+    return [_row_dict(row) for row in rows]
+
+
+def cycle_aggregates(db: Session, since: datetime, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Agrégats par cycle (cycle_id) depuis `since`, plus récents d'abord
+
+    wall_ms = premier début → dernière fin (durée réelle du cycle),
+    total_ms = somme des refresh (capacité consommée).
+    """
+    R = models.RefreshRun
+    rows = db.execute(
+        select(
+            R.cycle_id,
+            func.min(R.started_at).label("started_at"),
+            func.max(R.finished_at).label("finished_at"),
+            func.count(R.id).label("runs"),
+            func.sum(case((R.status == "error", 1), else_=0)).label("errors"),
+            func.sum(R.total_ms).label("total_ms"),
+            func.sum(R.graph_calls).label("graph_calls"),
+            func.sum(R.rows_fetched).label("rows_fetched"),
+            func.sum(R.bytes_written).label("bytes_written"),
+            func.sum(R.throttle_sleep_ms).label("throttle_sleep_ms"),
+            func.max(R.peak_rss_mb).label("max_peak_rss_mb"),
+        )
+        .where(R.started_at >= since, R.cycle_id.is_not(None))
+        .group_by(R.cycle_id)
+        .order_by(func.min(R.started_at).desc())
+        .limit(limit)
+    ).all()
+    cycles = []
+    for row in rows:
+        cycle = _row_dict(row)
+        cycle["wall_ms"] = int((row.finished_at - row.started_at).total_seconds() * 1000)
+        cycle["started_at"] = row.started_at.isoformat()
+        cycle["finished_at"] = row.finished_at.isoformat()
+        cycles.append(cycle)
+    return cycles
+
+
+def _row_dict(row) -> Dict[str, Any]:
+    """Row SQL → dict JSON (moyennes arrondies, Decimal → int)"""
+    result = {}
+    for key, value in row._mapping.items():
+        if isinstance(value, datetime) or value is None or isinstance(value, str):
+            result[key] = value
+        else:
+            result[key] = int(round(float(value)))
+    return result
+
+
+def estimate_account_seconds(db: Session, accounts: Sequence[models.AdAccount]) -> Dict[UUID, float]:
+    """
+    Durée estimée du prochain refresh de chaque compte (secondes)
+
+    Moyenne des refresh réussis du compte (tous tenants: un compte partagé
+    coûte pareil) dans le mode attendu: BASELINE si jamais rafraîchi, sinon
+    TAIL. À défaut, moyenne tous modes, puis DEFAULT_*_SECONDS.
+
+    Returns:
+        ad_account.id -> secondes
+    """
+    R = models.RefreshRun
+    fb_account_ids = list({account.fb_account_id for account in accounts})
+    averages: Dict[str, Dict[Optional[str], float]] = {}
+    if fb_account_ids:
+        rows = db.execute(
+            select(R.fb_account_id, R.refresh_mode, func.avg(R.total_ms).label("avg_ms"))
+            .where(R.fb_account_id.in_(fb_account_ids), R.status == "ok")
+            .group_by(R.fb_account_id, R.refresh_mode)
+        ).all()
+        for row in rows:
+            averages.setdefault(row.fb_account_id, {})[row.refresh_mode] = float(row.avg_ms) / 1000
+
+    estimates = {}
+    for account in accounts:
+        mode = "BASELINE" if account.last_refresh_at is None else "TAIL"
+        by_mode = averages.get(account.fb_account_id, {})
+        if mode in by_mode:
+            estimates[account.id] = by_mode[mode]
+        elif by_mode:
+            estimates[account.id] = sum(by_mode.values()) / len(by_mode)
+        else:
+            estimates[account.id] = float(DEFAULT_BASELINE_SECONDS if mode == "BASELINE" else DEFAULT_TAIL_SECONDS)
+    return estimates
+
+
+def cleanup_old_runs(db: Session, now: Optional[datetime] = None) -> int:
+    """Supprime la télémétrie de plus de REFRESH_RUN_RETENTION_DAYS jours"""
+    now = now or datetime.now(timezone.utc)
+    result = db.execute(
+        delete(models.RefreshRun).where(
+            models.RefreshRun.started_at < now - timedelta(days=REFRESH_RUN_RETENTION_DAYS)
+        )
+    )
+    db.commit()
+    return result.rowcount
@@ -6,10 +6,12 @@ IMPORTANT: Produces columnar format matching production pipeline
 
 MODE BASELINE vs TAIL (parité avec fetch_with_smart_limits.py):
 - BASELINE (📥 INITIAL SYNC): Premier run → fetch 90 jours complets
-- TAIL (🔄 TAIL REFRESH): Runs suivants → fetch 3 derniers jours, upsert dans baseline
+- TAIL (🔄 TAIL REFRESH): Runs suivants → fetch les jours manquants + 3j de marge, upsert dans baseline
 """
+import asyncio
 import gc
 import json
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, List, Optional, Tuple
 from uuid import UUID
@@ -18,8 +20,13 @@ from sqlalchemy import select
 
 from ..services.meta_client import meta_client, MetaAPIError
 from ..services import storage
+from ..services.creative_cache import load_creative_cache, save_creative_cache
+from ..services.insights_spool import InsightsSpool
+from ..services import circuit_breaker
 from ..services.columnar_transform import transform_to_columnar, validate_columnar_format
 from .. import models
+from ..utils import run_metrics
+from ..services import refresh_progress
 from cryptography.fernet import Fernet
 from ..config import settings
 
@@ -28,7 +35,12 @@ fernet = Fernet(settings.TOKEN_ENCRYPTION_KEY.encode())
 
 # Configuration (parité avec production)
 BASELINE_DAYS = 90  # Historique complet
-TAIL_BACKFILL_DAYS = 3  # Jours à refetch en mode TAIL
+TAIL_BACKFILL_DAYS = 3  # Jours à refetch en mode TAIL (marge de correction Meta)
+TAIL_MAX_DAYS = 30  # Au-delà (baseline trop vieux), on refait un BASELINE complet
+BASELINE_SHARD_DAYS = 15  # Taille des shards de fetch en mode BASELINE (90j = 6 shards)
+MAX_BASELINE_SHARD_CONCURRENCY = 6  # Shards fetchés en parallèle (borné aussi par le rate monitor)
+ASYNC_REPORT_MIN_ROWS = 5000  # Au-delà (estimé), insights via rapport asynchrone Meta
+BATCH_INSIGHTS_MAX_ROWS = 500  # Fenêtre TAIL tenant en une page → insights via l'API Batch (petits comptes)
 
 
 class RefreshError(Exception):
@@ -66,19 +78,45 @@ def _load_existing_baseline(tenant_id: UUID, ad_account_id: str) -> Optional[Dic
         return None
 
 
+def _page_size_key(tenant_id: UUID, ad_account_id: str) -> str:
+    return f"tenants/{tenant_id}/accounts/{ad_account_id}/data/insights_page_size.json"
+
+
+def _load_page_size(tenant_id: UUID, ad_account_id: str) -> Optional[int]:
+    """Taille de page insights apprise lors des runs précédents (None si inconnue)"""
+    try:
+        return int(json.loads(storage.get_object(_page_size_key(tenant_id, ad_account_id)))["page_size"])
+    except (storage.StorageError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _save_page_size(tenant_id: UUID, ad_account_id: str, page_size: int) -> None:
+    """Persiste la taille de page apprise (non bloquant)"""
+    try:
+        storage.put_object(
+            _page_size_key(tenant_id, ad_account_id),
+            json.dumps({"page_size": page_size, "updated_at": datetime.now(timezone.utc).isoformat()}).encode("utf-8")
+        )
+    except storage.StorageError as e:
+        print(f"   ⚠️ Taille de page non sauvegardée: {e}")
+
+
 def _determine_refresh_mode(baseline: Optional[Dict[str, Any]], reference_date: str) -> Tuple[str, int]:
     """
     Détermine le mode de refresh (BASELINE ou TAIL).
 
     - BASELINE (90j) : Première fois, pas de données existantes
-    - TAIL (3j) : Refresh incrémental, upsert dans le baseline existant
+    - TAIL (gap + 3j) : Refresh incrémental, upsert dans le baseline existant.
+      La fenêtre couvre les jours manquants depuis le reference_date du baseline
+      (cron sauté, compte désactivé...) plus TAIL_BACKFILL_DAYS de marge.
+      Au-delà de TAIL_MAX_DAYS, on repart sur un BASELINE complet (fetch par shards).
 
     Args:
         baseline: Le baseline existant ou None
         reference_date: Date de référence (YYYY-MM-DD)
 
     Returns:
-        (mode, days_to_fetch) - ("BASELINE", 90) ou ("TAIL", 3)
+        (mode, days_to_fetch) - ("BASELINE", 90) ou ("TAIL", gap + 3)
     """
     if baseline is None:
         print(f"📥 INITIAL SYNC: No existing data - will fetch {BASELINE_DAYS} days")
@@ -99,14 +137,222 @@ def _determine_refresh_mode(baseline: Optional[Dict[str, Any]], reference_date:
             print(f"📥 INITIAL SYNC: Baseline in future (?) - will fetch {BASELINE_DAYS} days")
             return ("BASELINE", BASELINE_DAYS)
 
-        print(f"🔄 TAIL REFRESH: Updating last {TAIL_BACKFILL_DAYS} days (baseline: {age_days}d old)")
-        return ("TAIL", TAIL_BACKFILL_DAYS)
+        tail_days = age_days + TAIL_BACKFILL_DAYS
+        if tail_days > TAIL_MAX_DAYS:
+            print(f"📥 INITIAL SYNC: Baseline too old ({age_days}d) - will fetch {BASELINE_DAYS} days")
+            return ("BASELINE", BASELINE_DAYS)
+
+        print(f"🔄 TAIL REFRESH: Updating last {tail_days} days (baseline: {age_days}d old)")
+        return ("TAIL", tail_days)
 
     except ValueError as e:
         print(f"📥 INITIAL SYNC: Date parsing error: {e} - will fetch {BASELINE_DAYS} days")
         return ("BASELINE", BASELINE_DAYS)
 
 
+def _estimate_window_rows(
+    baseline: Optional[Dict[str, Any]],
+    days: int,
+    known_daily_rows: Optional[int] = None
+) -> Optional[int]:
+    """
+    Estime le nombre de rows daily d'une fenêtre de `days` jours
+
+    Densité du baseline existant, sinon rows du dernier refresh réussi
+    (AdAccount.daily_rows, ex: baseline supprimé). None si la taille du
+    compte est inconnue (premier BASELINE).
+    """
+    if baseline:
+        metadata = baseline.get('metadata', {})
+        total_rows = metadata.get('total_daily_rows') or len(baseline.get('daily_ads', []))
+    elif known_daily_rows:
+        total_rows = known_daily_rows
+    else:
+        return None
+    return int(total_rows / BASELINE_DAYS * days)
+
+
+def _split_date_shards(since_date: str, until_date: str, shard_days: int) -> List[Tuple[str, str]]:
+    """Découpe [since, until] en fenêtres consécutives de shard_days jours (bornes incluses)"""
+    since_dt = datetime.strptime(since_date, '%Y-%m-%d').date()
+    until_dt = datetime.strptime(until_date, '%Y-%m-%d').date()
+
+    shards = []
+    shard_start = since_dt
+    while shard_start <= until_dt:
+        shard_end = min(shard_start + timedelta(days=shard_days - 1), until_dt)
+        shards.append((shard_start.isoformat(), shard_end.isoformat()))
+        shard_start = shard_end + timedelta(days=1)
+    return shards
+
+
+async def _fetch_insights_sharded(
+    ad_account_id: str,
+    access_token: str,
+    since_date: str,
+    until_date: str,
+    use_async_report: bool = False,
+    spool: Optional[InsightsSpool] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fetch les insights daily par shards de BASELINE_SHARD_DAYS jours, EN PARALLÈLE.
+
+    - Des fenêtres courtes évitent les timeouts et les erreurs
+      "reduce the amount of data" de Meta sur les gros comptes
+    - La concurrence est bornée par le rate monitor (usage Meta actuel)
+    - Les shards sont fusionnés et dédupliqués sur (ad_id, date)
+    - Avec un spool, chaque shard a son checkpoint (reprise au curseur)
+    """
+    shards = _split_date_shards(since_date, until_date, BASELINE_SHARD_DAYS)
+    concurrency = max(1, min(
+        len(shards),
+        MAX_BASELINE_SHARD_CONCURRENCY,
+        meta_client.rate_monitor.get_recommended_concurrency()
+    ))
+    semaphore = asyncio.Semaphore(concurrency)
+    print(f"   🧩 {len(shards)} shards de {BASELINE_SHARD_DAYS}j (max {concurrency} en parallèle)")
+
+    async def _fetch_shard(shard_since: str, shard_until: str) -> List[Dict[str, Any]]:
+        async with semaphore:
+            return await meta_client.get_insights_daily(
+                ad_account_id=ad_account_id,
+                access_token=access_token,
+                since_date=shard_since,
+                until_date=shard_until,
+                use_async_report=use_async_report,
+                checkpoint=spool.checkpoint(shard_since, shard_until) if spool else None
+            )
+
+    # Une erreur sur un shard fait échouer tout le fetch (pas de baseline à trous)
+    shard_results = await asyncio.gather(*[_fetch_shard(s, u) for s, u in shards])
+
+    merged: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for rows in shard_results:
+        for row in rows:
+            key = (row.get('ad_id'), row.get('date_start') or row.get('date'))
+            merged[key] = row
+    return list(merged.values())
+
+
+def tail_window_for(last_refresh_at: Optional[datetime], today=None) -> Optional[Tuple[str, str]]:
+    """
+    Fenêtre TAIL probable d'un compte, déduite de son dernier refresh (sans lire le baseline)
+
+    Même calcul que _determine_refresh_mode (jours manquants + TAIL_BACKFILL_DAYS),
+    avec 1 jour de marge. None si le compte partira en BASELINE.
+    """
+    if last_refresh_at is None:
+        return None
+    today = today or datetime.now(timezone.utc).date()
+    days = (today - last_refresh_at.date()).days + TAIL_BACKFILL_DAYS + 1
+    if days > TAIL_MAX_DAYS:
+        return None
+    return ((today - timedelta(days=days)).isoformat(), (today - timedelta(days=1)).isoformat())
+
+
+async def prefetch_small_accounts_insights(
+    accounts: List[Tuple[str, Optional[datetime], int]],
+    access_token: str
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Pré-charge les insights TAIL des petits comptes d'un tenant via l'API Batch
+
+    Un compte est éligible si sa fenêtre TAIL estimée (ads × jours) tient dans
+    une page (BATCH_INSIGHTS_MAX_ROWS). Les comptes en échec ne sont simplement
+    pas pré-chargés: sync_account_data les fetchera normalement.
+
+    Args:
+        accounts: (fb_account_id, last_refresh_at, ads_count) par compte
+        access_token: Token du tenant
+
+    Returns:
+        fb_account_id -> {"since", "until", "rows"} (à passer à sync_account_data)
+    """
+    windows = {}
+    for ad_account_id, last_refresh_at, ads_count in accounts:
+        window = tail_window_for(last_refresh_at)
+        if window is None:
+            continue
+        days = (datetime.fromisoformat(window[1]) - datetime.fromisoformat(window[0])).days + 1
+        if ads_count * days <= BATCH_INSIGHTS_MAX_ROWS:
+            windows[ad_account_id] = window
+
+    if len(windows) < 2:
+        return {}  # Un seul compte: pas de gain à passer par le batch
+
+    fetched = await meta_client.get_insights_daily_batch(windows, access_token, limit=BATCH_INSIGHTS_MAX_ROWS)
+    print(f"   📦 Batch insights: {len(fetched)}/{len(windows)} petits comptes pré-chargés")
+    return {
+        act: {"since": windows[act][0], "until": windows[act][1], "rows": rows}
+        for act, rows in fetched.items()
+    }
+
+
+async def _fetch_daily_insights(
+    tenant_id: UUID,
+    ad_account_id: str,
+    access_token: str,
+    refresh_mode: str,
+    since_date: str,
+    until_date: str,
+    use_async_report: bool,
+    prefetched_insights: Optional[Dict[str, Any]],
+    spool: InsightsSpool
+) -> List[Dict[str, Any]]:
+    """
+    Fetch les insights daily de la fenêtre (pré-chargés batch, shards BASELINE ou TAIL)
+
+    La taille de page apprise par MetaClient pour ce compte est rechargée
+    avant le fetch et sauvegardée après (si elle a changé).
+
+    Raises:
+        RefreshError: Si erreur Meta API
+    """
+    if (
+        prefetched_insights
+        and prefetched_insights["since"] <= since_date
+        and prefetched_insights["until"] >= until_date
+    ):
+        print("   📦 Insights pré-chargés via batch")
+        return [
+            row for row in prefetched_insights["rows"]
+            if since_date <= row.get("date_start", "") <= until_date
+        ]
+
+    stored_page_size = _load_page_size(tenant_id, ad_account_id)
+    if stored_page_size:
+        meta_client.set_page_size(ad_account_id, stored_page_size)
+    initial_page_size = meta_client.get_page_size(ad_account_id)
+
+    try:
+        if refresh_mode == "BASELINE":
+            rows = await _fetch_insights_sharded(
+                ad_account_id=ad_account_id,
+                access_token=access_token,
+                since_date=since_date,
+                until_date=until_date,
+                use_async_report=use_async_report,
+                spool=spool
+            )
+        else:
+            rows = await meta_client.get_insights_daily(
+                ad_account_id=ad_account_id,
+                access_token=access_token,
+                since_date=since_date,
+                until_date=until_date,
+                use_async_report=use_async_report,
+                checkpoint=spool.checkpoint(since_date, until_date)
+            )
+    except MetaAPIError as e:
+        raise RefreshError(f"Meta API error: {e}") from e
+    finally:
+        # Aussi après une erreur: les réductions de page apprises servent au retry
+        page_size = meta_client.get_page_size(ad_account_id)
+        if page_size != initial_page_size:
+            _save_page_size(tenant_id, ad_account_id, page_size)
+    return rows
+
+
 def _upsert_daily_ads(existing_ads: List[Dict], new_ads: List[Dict], reference_date: str) -> List[Dict]:
     """
     Upsert les nouvelles données dans le baseline existant.
@@ -168,10 +414,57 @@ def _upsert_daily_ads(existing_ads: List[Dict], new_ads: List[Dict], reference_d
     return cleaned_ads
 
 
+def _mirror_account_files(
+    ad_account_id: str,
+    source_tenant_id: UUID,
+    mirror_tenant_ids: List[UUID],
+    relative_keys: List[str],
+    db: Session,
+    refreshed_at: datetime
+) -> List[str]:
+    """
+    Copie les fichiers d'un compte partagé vers les préfixes des autres tenants.
+
+    Un même fb_account_id peut être connecté par plusieurs tenants (agence + client):
+    les données Meta sont identiques, on fetch/transforme une seule fois et on copie.
+
+    Returns:
+        Liste des tenant_ids (str) mis à jour
+    """
+    source_base = f"tenants/{source_tenant_id}/accounts/{ad_account_id}/data"
+    mirrored = []
+
+    for mirror_tenant_id in mirror_tenant_ids:
+        mirror_account = db.execute(
+            select(models.AdAccount).where(
+                models.AdAccount.fb_account_id == ad_account_id,
+                models.AdAccount.tenant_id == mirror_tenant_id
+            )
+        ).scalar_one_or_none()
+        if not mirror_account:
+            continue
+
+        mirror_base = f"tenants/{mirror_tenant_id}/accounts/{ad_account_id}/data"
+        try:
+            for rel in relative_keys:
+                storage.copy_object(f"{source_base}/{rel}", f"{mirror_base}/{rel}")
+        except storage.StorageError as e:
+            print(f"   ⚠️ Mirror {ad_account_id} → tenant {mirror_tenant_id} failed: {e}")
+            continue
+
+        mirror_account.last_refresh_at = refreshed_at
+        mirrored.append(str(mirror_tenant_id))
+
+    db.commit()
+    return mirrored
+
+
 async def sync_account_data(
     ad_account_id: str,
     tenant_id: UUID,
-    db: Session
+    db: Session,
+    mirror_tenant_ids: Optional[List[UUID]] = None,
+    prefetched_insights: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """
     Synchronise les données d'un ad account et génère les fichiers optimisés
@@ -181,12 +474,17 @@ async def sync_account_data(
 
     MODE BASELINE vs TAIL:
     - BASELINE (📥 INITIAL SYNC): Premier run → fetch 90 jours complets
-    - TAIL (🔄 TAIL REFRESH): Runs suivants → fetch 3 derniers jours, upsert dans baseline
+    - TAIL (🔄 TAIL REFRESH): Runs suivants → fetch jours manquants + 3j, upsert dans baseline
 
     Args:
         ad_account_id: ID du compte (ex: "act_123456")
-        tenant_id: ID du tenant (pour isolation)
+        tenant_id: ID du tenant (pour isolation) - son token est utilisé pour le fetch
         db: Session SQLAlchemy
+        mirror_tenant_ids: Autres tenants ayant connecté le même compte.
+            Les fichiers générés sont copiés dans leurs préfixes (pas de re-fetch).
+        prefetched_insights: {"since", "until", "rows"} déjà récupérés via l'API Batch
+            (voir prefetch_small_accounts_insights). Utilisés seulement s'ils couvrent
+            la fenêtre calculée ici.
 
     Returns:
         {
@@ -194,11 +492,13 @@ async def sync_account_data(
             "ad_account_id": str,
             "ads_fetched": int,
             "files_written": List[str],
+            "mirrored_tenants": List[str],
             "refreshed_at": str (ISO)
         }
 
     Raises:
         RefreshError: Si erreur pendant le refresh
+        CircuitOpenError: Si le token ou le compte a un circuit ouvert (aucun appel Meta)
     """
 
     # 1. Vérifier que l'ad account appartient au tenant
@@ -229,6 +529,9 @@ async def sync_account_data(
     except Exception as e:
         raise RefreshError(f"Failed to decrypt access token: {e}")
 
+    # 3b. Circuit breaker: token révoqué / compte sans permission → échec immédiat
+    circuit_breaker.acquire(db, tenant_id, ad_account_id)
+
     # 4. Calculer la date de référence (hier, pour exclure aujourd'hui)
     today = datetime.now(timezone.utc).date()
     reference_date = (today - timedelta(days=1)).isoformat()  # Yesterday
@@ -240,40 +543,74 @@ async def sync_account_data(
     # Log clair du mode de sync
     mode_emoji = "📥 INITIAL SYNC" if refresh_mode == "BASELINE" else "🔄 TAIL REFRESH"
     print(f"{mode_emoji}: {ad_account_id} ({ad_account.name}) - {days_to_fetch} days")
+    run_metrics.set_value("refresh_mode", refresh_mode)
+    run_metrics.set_value("days_fetched", days_to_fetch)
 
     # 6. Calculer la plage de dates selon le mode
     since_date = (today - timedelta(days=days_to_fetch)).isoformat()
     until_date = reference_date
 
-    # 7. Fetch daily insights depuis Meta API
-    try:
-        daily_insights = await meta_client.get_insights_daily(
-            ad_account_id=ad_account_id,
-            access_token=access_token,
-            since_date=since_date,
-            until_date=until_date,
-            limit=500
-        )
-    except MetaAPIError as e:
-        raise RefreshError(f"Meta API error: {e}")
-
-    # 8. Enrich with creatives (format, media_url, status)
-    # CRITICAL: Parité avec ancien pipeline (fetch_with_smart_limits.py)
-    try:
-        print(f"🎨 Enriching {len(daily_insights)} insights with creatives...")
-        if daily_insights:
-            print(f"   Sample insight keys: {list(daily_insights[0].keys())[:10]}")
-
-        daily_insights = await meta_client.enrich_ads_with_creatives(
-            ads=daily_insights,
-            access_token=access_token
-        )
-        print(f"✅ Enrichment complete")
-    except Exception as e:
-        # Enrichment failure is non-fatal - continue with UNKNOWN formats
-        print(f"⚠️ Enrichment failed: {e}")
-        import traceback
-        traceback.print_exc()
+    # 7. Fetch daily insights depuis Meta API (shards parallèles en mode BASELINE)
+    # Gros comptes connus → rapport asynchrone (évite timeouts et "reduce the amount of data")
+    # Taille inconnue (premier BASELINE): synchrone, la plupart des nouveaux comptes
+    # sont petits; un gros compte bascule en async sur "reduce the amount of data"
+    # (get_insights_daily)
+    estimated_rows = _estimate_window_rows(
+        existing_baseline, min(days_to_fetch, BASELINE_SHARD_DAYS), ad_account.daily_rows
+    )
+    use_async_report = estimated_rows is not None and estimated_rows >= ASYNC_REPORT_MIN_ROWS
+    if use_async_report:
+        print(f"   🧾 Rapport asynchrone (~{estimated_rows} rows estimées)")
+
+    # Spool disque: un refresh interrompu (retry cron, cycle suivant) reprend là où il s'est arrêté
+    spool = InsightsSpool(tenant_id, ad_account_id, refresh_mode, since_date, until_date)
+    daily_insights = spool.load_stage("enriched") if spool.resumed else None
+
+    if daily_insights is not None:
+        print(f"   ♻️ Reprise: {len(daily_insights)} insights déjà enrichis (spool)")
+    else:
+        daily_insights = spool.load_stage("fetched") if spool.resumed else None
+        if daily_insights is not None:
+            print(f"   ♻️ Reprise: {len(daily_insights)} insights déjà fetchés (spool)")
+        else:
+            refresh_progress.report("fetch", refresh_mode=refresh_mode, days=days_to_fetch)
+            try:
+                with run_metrics.stage("fetch"):
+                    daily_insights = await _fetch_daily_insights(
+                        tenant_id, ad_account_id, access_token, refresh_mode, since_date, until_date,
+                        use_async_report, prefetched_insights, spool
+                    )
+            except RefreshError as e:
+                circuit_breaker.record_failure(db, tenant_id, ad_account_id, e)
+                raise
+            spool.save_stage("fetched", daily_insights)
+
+        # 8. Enrich with creatives (format, media_url, status)
+        # CRITICAL: Parité avec ancien pipeline (fetch_with_smart_limits.py)
+        try:
+            print(f"🎨 Enriching {len(daily_insights)} insights with creatives...")
+            if daily_insights:
+                print(f"   Sample insight keys: {list(daily_insights[0].keys())[:10]}")
+
+            refresh_progress.report("enrich")
+            with run_metrics.stage("enrich"):
+                creative_cache = load_creative_cache(tenant_id, ad_account_id)
+                daily_insights = await meta_client.enrich_ads_with_creatives(
+                    ads=daily_insights,
+                    access_token=access_token,
+                    creative_cache=creative_cache,
+                    account_id=ad_account_id
+                )
+                save_creative_cache(tenant_id, ad_account_id, creative_cache)
+            spool.save_stage("enriched", daily_insights)
+            print(f"✅ Enrichment complete")
+        except Exception as e:
+            # Enrichment failure is non-fatal - continue with UNKNOWN formats
+            print(f"⚠️ Enrichment failed: {e}")
+            import traceback
+            traceback.print_exc()
+
+    run_metrics.set_value("rows_fetched", len(daily_insights))
 
     # 9. Enrichir avec account_name et account_id
     for ad in daily_insights:
@@ -290,22 +627,33 @@ async def sync_account_data(
         all_daily_ads = daily_insights
 
     # 11. Transform en format columnar (sur le baseline COMPLET)
-    try:
-        meta_v1, agg_v1, summary_v1 = transform_to_columnar(
-            daily_ads=all_daily_ads,
-            reference_date=reference_date,
-            ad_account_id=ad_account_id,
-            account_name=ad_account.name  # Pass real account name from DB
-        )
-    except Exception as e:
-        raise RefreshError(f"Transform error: {e}")
-
-    # 12. Valider le format
-    validation_errors = validate_columnar_format(meta_v1, agg_v1, summary_v1)
-    if validation_errors:
-        raise RefreshError(f"Validation failed: {'; '.join(validation_errors)}")
+    transformed = spool.load_stage("transformed") if spool.resumed else None
+    if transformed is not None:
+        print("   ♻️ Reprise: fichiers columnar déjà calculés (spool)")
+        meta_v1, agg_v1, summary_v1 = transformed["meta_v1"], transformed["agg_v1"], transformed["summary_v1"]
+    else:
+        refresh_progress.report("transform")
+        try:
+            with run_metrics.stage("transform"):
+                meta_v1, agg_v1, summary_v1 = transform_to_columnar(
+                    daily_ads=all_daily_ads,
+                    reference_date=reference_date,
+                    ad_account_id=ad_account_id,
+                    account_name=ad_account.name  # Pass real account name from DB
+                )
+        except Exception as e:
+            raise RefreshError(f"Transform error: {e}")
+
+        # 12. Valider le format
+        validation_errors = validate_columnar_format(meta_v1, agg_v1, summary_v1)
+        if validation_errors:
+            raise RefreshError(f"Validation failed: {'; '.join(validation_errors)}")
+        spool.save_stage("transformed", {"meta_v1": meta_v1, "agg_v1": agg_v1, "summary_v1": summary_v1})
 
     # 13. Sauvegarder le baseline brut (pour les prochains upserts)
+    write_started = time.monotonic()
+    refresh_progress.report("write")
+    daily_rows_count = len(all_daily_ads)
     base_path = f"tenants/{tenant_id}/accounts/{ad_account_id}/data"
 
     baseline_data = {
@@ -325,10 +673,8 @@ async def sync_account_data(
     files_written = []
 
     try:
-        storage.put_object(
-            f"{base_path}/baseline_daily.json",
-            json.dumps(baseline_data, separators=(',', ':')).encode("utf-8")
-        )
+        # Streaming: évite d'avoir dict + str + bytes du baseline en RAM en même temps
+        storage.put_json_stream(f"{base_path}/baseline_daily.json", baseline_data)
         files_written.append("baseline_daily.json")
     except storage.StorageError as e:
         raise RefreshError(f"Failed to write baseline_daily.json: {e}")
@@ -358,6 +704,7 @@ async def sync_account_data(
     manifest = {
         "version": datetime.now(timezone.utc).isoformat(),
         "ads_count": len(agg_v1.get('ads', [])),
+        "active_ads": sum(1 for ad in meta_v1.get('ads', []) if ad.get('status') == 'ACTIVE'),
         "periods": agg_v1.get('periods', []),
         "refresh_mode": refresh_mode,
         "baseline_days": BASELINE_DAYS,
@@ -378,15 +725,32 @@ async def sync_account_data(
 
     # 🧹 Libérer la RAM: les fichiers sont écrits
     unique_ads_count = len(agg_v1.get('ads', []))
+    run_metrics.set_value("unique_ads", unique_ads_count)
+    run_metrics.set_value("daily_rows", daily_rows_count)
     del meta_v1, agg_v1, summary_v1, manifest
     gc.collect()
 
     # 16. Mettre à jour last_refresh_at
     ad_account.last_refresh_at = datetime.now(timezone.utc)
+    circuit_breaker.record_success(db, tenant_id, ad_account_id)
     db.commit()
 
-    # Note: daily_insights et all_daily_ads ont été supprimés, on utilise les compteurs sauvegardés
-    daily_rows_count = days_to_fetch * 50  # Estimation (valeur exacte non disponible après del)
+    # 🧹 Refresh réussi: le spool n'est plus utile
+    spool.clear()
+
+    # 17. Comptes partagés: copier vers les autres tenants (fetch unique)
+    mirrored_tenants = []
+    if mirror_tenant_ids:
+        relative_keys = ["baseline_daily.json"] + [
+            f"optimized/{name}" for name in files_written if name != "baseline_daily.json"
+        ]
+        if storage.object_exists(f"{base_path}/creatives_cache.json"):
+            relative_keys.append("creatives_cache.json")
+        mirrored_tenants = _mirror_account_files(
+            ad_account_id, tenant_id, mirror_tenant_ids, relative_keys, db, ad_account.last_refresh_at
+        )
+        print(f"   🔁 Copié vers {len(mirrored_tenants)} autre(s) tenant(s)")
+    run_metrics.record("write_ms", (time.monotonic() - write_started) * 1000)
 
     return {
         "status": "success",
@@ -394,7 +758,9 @@ async def sync_account_data(
         "refresh_mode": refresh_mode,
         "days_fetched": days_to_fetch,
         "unique_ads": unique_ads_count,
+        "daily_rows": daily_rows_count,
         "files_written": files_written,
+        "mirrored_tenants": mirrored_tenants,
         "refreshed_at": ad_account.last_refresh_at.isoformat(),
         "date_range": f"{since_date} to {until_date}",
     }
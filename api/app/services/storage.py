@@ -2,11 +2,15 @@
 Storage abstraction layer for optimized data files
 Supports local filesystem and R2/S3
 """
+import json
+import os
+import tempfile
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterator, Optional
 import boto3
 from botocore.exceptions import ClientError
 from ..config import settings
+from ..utils import run_metrics
 
 
 class StorageError(Exception):
@@ -17,6 +21,9 @@ class StorageError(Exception):
 # Lazy-init S3 client (only if R2 mode)
 _s3_client = None
 
+# Streaming writes: taille d'une part multipart (min 5 MiB imposé par S3/R2)
+STREAM_PART_SIZE = 8 * 1024 * 1024
+
 
 def _get_s3_client():
     """Get or create S3 client for R2/S3"""
@@ -147,6 +154,130 @@ def _r2_write(key: str, data: bytes) -> None:
         raise StorageError(f"Failed to write to R2/S3: {e}")
 
 
+def _local_write_stream(key: str, chunks: Iterator[bytes]) -> int:
+    """
+    Stream chunks to a temp file, then atomically rename it to the target path
+
+    Args:
+        key: Path relative to LOCAL_DATA_ROOT
+        chunks: Encoded chunks
+
+    Returns:
+        Number of bytes written
+    """
+    base = Path(settings.LOCAL_DATA_ROOT)
+    file_path = base / key
+
+    # Security: prevent directory traversal
+    try:
+        file_path = file_path.resolve()
+        base = base.resolve()
+        if not str(file_path).startswith(str(base)):
+            raise StorageError("Invalid file path (directory traversal attempt)")
+    except Exception as e:
+        raise StorageError(f"Invalid file path: {e}")
+
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.")
+    written = 0
+    try:
+        with os.fdopen(tmp_fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+        os.replace(tmp_path, file_path)
+    except Exception as e:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise StorageError(f"Failed to write file: {e}")
+
+    return written
+
+
+def _r2_write_stream(key: str, chunks: Iterator[bytes]) -> int:
+    """
+    Stream chunks to R2/S3 via multipart upload (one part buffer in memory)
+
+    Small objects (< STREAM_PART_SIZE) fall back to a single put_object.
+
+    Args:
+        key: Object key in bucket
+        chunks: Encoded chunks
+
+    Returns:
+        Number of bytes written
+
+    Raises:
+        StorageError: If write failed (multipart upload is aborted)
+    """
+    s3 = _get_s3_client()
+    buffer = bytearray()
+    parts = []
+    upload_id = None
+    written = 0
+
+    try:
+        for chunk in chunks:
+            buffer.extend(chunk)
+            written += len(chunk)
+            if len(buffer) >= STREAM_PART_SIZE:
+                if upload_id is None:
+                    upload_id = s3.create_multipart_upload(
+                        Bucket=settings.STORAGE_BUCKET,
+                        Key=key,
+                        ContentType='application/json'
+                    )['UploadId']
+                part_number = len(parts) + 1
+                response = s3.upload_part(
+                    Bucket=settings.STORAGE_BUCKET,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=bytes(buffer)
+                )
+                parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+                buffer.clear()
+
+        if upload_id is None:
+            # Petit objet: un seul PUT suffit
+            s3.put_object(
+                Bucket=settings.STORAGE_BUCKET,
+                Key=key,
+                Body=bytes(buffer),
+                ContentType='application/json'
+            )
+            return written
+
+        if buffer:
+            part_number = len(parts) + 1
+            response = s3.upload_part(
+                Bucket=settings.STORAGE_BUCKET,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=bytes(buffer)
+            )
+            parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+
+        s3.complete_multipart_upload(
+            Bucket=settings.STORAGE_BUCKET,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+        return written
+    except Exception as e:
+        if upload_id is not None:
+            try:
+                s3.abort_multipart_upload(Bucket=settings.STORAGE_BUCKET, Key=key, UploadId=upload_id)
+            except Exception:
+                pass
+        raise StorageError(f"Failed to stream to R2/S3: {e}")
+
+
 def _r2_exists(key: str) -> bool:
     """
     Check if object exists in R2/S3
@@ -209,6 +340,93 @@ def put_object(key: str, data: bytes) -> None:
         _r2_write(key, data)
     else:
         raise StorageError(f"Unknown storage mode: {settings.STORAGE_MODE}")
+    run_metrics.record("bytes_written", len(data))
+
+
+def copy_object(src_key: str, dst_key: str) -> None:
+    """
+    Copy an object within storage (server-side on R2/S3, no download)
+
+    Args:
+        src_key: Source storage key
+        dst_key: Destination storage key
+
+    Raises:
+        StorageError: If source missing or copy failed
+    """
+    if settings.STORAGE_MODE == "local":
+        _local_write(dst_key, _local_read(src_key))
+    elif settings.STORAGE_MODE == "r2":
+        s3 = _get_s3_client()
+        try:
+            s3.copy_object(
+                Bucket=settings.STORAGE_BUCKET,
+                Key=dst_key,
+                CopySource={'Bucket': settings.STORAGE_BUCKET, 'Key': src_key},
+                ContentType='application/json',
+                MetadataDirective='REPLACE'
+            )
+        except Exception as e:
+            raise StorageError(f"Failed to copy in R2/S3: {e}")
+    else:
+        raise StorageError(f"Unknown storage mode: {settings.STORAGE_MODE}")
+
+
+def iter_json_chunks(obj: Any, depth: int = 2) -> Iterator[str]:
+    """
+    Encode obj as compact JSON, chunk by chunk
+
+    Dicts and lists are streamed element by element down to `depth` levels,
+    deeper values are encoded with json.dumps. With depth=2, a baseline
+    ({"metadata": ..., "daily_ads": [...]}) is emitted one daily row at a time.
+
+    Output is identical to json.dumps(obj, separators=(',', ':')).
+    """
+    if depth > 0 and isinstance(obj, dict):
+        yield '{'
+        for i, (k, v) in enumerate(obj.items()):
+            yield (',' if i else '') + json.dumps(str(k)) + ':'
+            yield from iter_json_chunks(v, depth - 1)
+        yield '}'
+    elif depth > 0 and isinstance(obj, (list, tuple)):
+        yield '['
+        for i, item in enumerate(obj):
+            if i:
+                yield ','
+            yield from iter_json_chunks(item, depth - 1)
+        yield ']'
+    else:
+        yield json.dumps(obj, separators=(',', ':'))
+
+
+def put_json_stream(key: str, obj: Any) -> int:
+    """
+    Serialize obj to JSON and stream it to storage
+
+    Unlike put_object(key, json.dumps(obj).encode()), the full JSON string and
+    its bytes never exist in memory: peak usage is one multipart part (R2)
+    or one encoded chunk (local).
+
+    Args:
+        key: Storage key
+        obj: JSON-serializable object
+
+    Returns:
+        Number of bytes written
+
+    Raises:
+        StorageError: If write failed
+    """
+    chunks = (chunk.encode("utf-8") for chunk in iter_json_chunks(obj))
+
+    if settings.STORAGE_MODE == "local":
+        written = _local_write_stream(key, chunks)
+    elif settings.STORAGE_MODE == "r2":
+        written = _r2_write_stream(key, chunks)
+    else:
+        raise StorageError(f"Unknown storage mode: {settings.STORAGE_MODE}")
+    run_metrics.record("bytes_written", written)
+    return written
 
 
 def object_exists(key: str) -> bool:
@@ -0,0 +1,113 @@
+"""
+⚡ Concurrence adaptative (AIMD) pour les refresh CRON
+
+Remplace le Semaphore(MAX_CRON_WORKERS) fixe par un limiteur redimensionnable
+à chaud, piloté par l'usage Meta (headers BUC, décroissant dans le temps):
+
+- Additive increase: +1 worker tant que l'usage reste bas
+- Multiplicative decrease: ÷2 sur 429 / throttling, ou usage BUC élevé
+- Entre les deux: on garde la taille actuelle
+
+Même principe que le contrôle de congestion TCP: on utilise tout le budget
+de rate limit sans le dépasser durablement.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+AIMD_LOW_USAGE_PERCENT = 50      # En dessous: on peut ajouter un worker
+AIMD_HIGH_USAGE_PERCENT = 85     # Au dessus: on divise les workers
+AIMD_INCREASE_STEP = 1           # Workers ajoutés par tick
+AIMD_DECREASE_FACTOR = 0.5       # Facteur appliqué sur throttling
+AIMD_DECREASE_COOLDOWN_SECONDS = 30  # Une seule division par fenêtre (le 429 suivant est souvent le même incident)
+AIMD_TICK_SECONDS = 10           # Période de réévaluation dans le cron
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Semaphore dont la limite peut changer pendant l'exécution
+
+    Utilisable comme asyncio.Semaphore (`async with limiter:`).
+    Baisser la limite n'interrompt pas les tâches en cours: les nouvelles
+    attendent simplement que le nombre de tâches actives repasse sous la limite.
+    """
+
+    def __init__(self, initial: int, min_limit: int = 1, max_limit: Optional[int] = None):
+        self.min_limit = min_limit
+        self.max_limit = max_limit or initial
+        self.limit = max(min_limit, min(initial, self.max_limit))
+        self.in_use = 0
+        self.peak_limit = self.limit
+        self.increases = 0
+        self.decreases = 0
+        self._waiters: deque = deque()
+        self._last_decrease_at = 0.0
+
+    async def acquire(self) -> None:
+        while self.in_use >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise
+        self.in_use += 1
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._wake_waiters()
+
+    async def __aenter__(self) -> "AdaptiveConcurrencyLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+    def _wake_waiters(self) -> None:
+        free = self.limit - self.in_use
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def set_limit(self, limit: int) -> int:
+        """Change la limite (bornée à [min_limit, max_limit]) et réveille les tâches en attente"""
+        self.limit = max(self.min_limit, min(limit, self.max_limit))
+        self.peak_limit = max(self.peak_limit, self.limit)
+        self._wake_waiters()
+        return self.limit
+
+    def set_max_limit(self, max_limit: int) -> int:
+        """Change le plafond (ex: slots globaux libérés/pris par l'API) et y ramène la limite"""
+        self.max_limit = max(self.min_limit, max_limit)
+        return self.set_limit(self.limit)
+
+    def observe(self, usage_percent: float, throttled: bool = False) -> int:
+        """
+        Applique une étape AIMD à partir de l'usage Meta courant
+
+        Args:
+            usage_percent: Usage max comptes/app (0-100), déjà décroissant dans le temps
+            throttled: True si un 429 / erreur de throttling est arrivé depuis le dernier tick
+
+        Returns:
+            Nouvelle limite
+        """
+        now = time.monotonic()
+        if throttled or usage_percent >= AIMD_HIGH_USAGE_PERCENT:
+            if now - self._last_decrease_at >= AIMD_DECREASE_COOLDOWN_SECONDS:
+                self._last_decrease_at = now
+                if self.limit > self.min_limit:
+                    self.decreases += 1
+                return self.set_limit(int(self.limit * AIMD_DECREASE_FACTOR))
+        elif usage_percent < AIMD_LOW_USAGE_PERCENT and self.in_use >= self.limit:
+            # N'augmenter que si la limite est réellement atteinte (sinon inutile)
+            if self.limit < self.max_limit:
+                self.increases += 1
+            return self.set_limit(self.limit + AIMD_INCREASE_STEP)
+        return self.limit
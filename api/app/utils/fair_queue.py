@@ -0,0 +1,113 @@
+"""
+⚖️ File de travail équitable entre tenants (cron refresh)
+
+Avant: le cron traitait les tenants un par un. Un tenant avec un compte lent
+bloquait les autres slots jusqu'à sa fin, et le tenant suivant attendait.
+
+Maintenant: une seule file de comptes à rafraîchir pour TOUS les tenants,
+vidée par un pool fixe de workers.
+- Round-robin entre tenants: un gros tenant (200 comptes) ne peut pas affamer
+  les petits, chacun avance d'un compte à tour de rôle
+- Plafond par tenant: au plus `per_tenant_limit` comptes d'un même tenant en
+  parallèle (même token → même budget rate limit Meta)
+- Dans un tenant, l'ordre d'insertion (score du scheduler) est respecté
+"""
+import asyncio
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class FairWorkQueue:
+    """
+    File multi-tenant, round-robin, avec concurrence plafonnée par tenant
+
+    Usage:
+        queue.put(tenant_id, item)   # producteur
+        queue.close()                # plus rien à ajouter
+        entry = await queue.get()    # worker: (tenant_id, item), None = terminé
+        queue.task_done(tenant_id)   # worker: libère le slot du tenant
+    """
+
+    def __init__(self, per_tenant_limit: int):
+        self.per_tenant_limit = max(1, per_tenant_limit)
+        self._queues: Dict[str, deque] = {}
+        self._order: deque = deque()  # Rotation des tenants (tour de rôle)
+        self._running: Dict[str, int] = {}
+        self._closed = False
+        self._waiters: deque = deque()  # Workers en attente d'un item éligible
+        self.peak_running = 0
+
+    @property
+    def pending(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    def put(self, tenant_id: str, item: Any) -> None:
+        if self._closed:
+            raise RuntimeError("FairWorkQueue is closed")
+        if tenant_id not in self._queues:
+            self._queues[tenant_id] = deque()
+            self._order.append(tenant_id)
+        self._queues[tenant_id].append(item)
+        self._notify()
+
+    def drop_pending(self) -> List[Tuple[str, Any]]:
+        """Vide la file sans toucher aux items en cours (arrêt du worker). Retourne les (tenant_id, item) retirés."""
+        dropped = [(tenant_id, item) for tenant_id, queue in self._queues.items() for item in queue]
+        for queue in self._queues.values():
+            queue.clear()
+        self._notify()
+        return dropped
+
+    def close(self) -> None:
+        """Plus aucun put: les workers s'arrêtent une fois la file vide"""
+        self._closed = True
+        self._notify()
+
+    def _notify(self) -> None:
+        """Réveille les workers en attente (ils réévaluent la file)"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _pop_next(self) -> Optional[Tuple[str, Any]]:
+        """Premier tenant (dans l'ordre de rotation) avec du travail et un slot libre"""
+        for _ in range(len(self._order)):
+            tenant_id = self._order[0]
+            self._order.rotate(-1)
+            queue = self._queues[tenant_id]
+            if queue and self._running.get(tenant_id, 0) < self.per_tenant_limit:
+                self._running[tenant_id] = self._running.get(tenant_id, 0) + 1
+                self.peak_running = max(self.peak_running, self.running)
+                return tenant_id, queue.popleft()
+        return None
+
+    async def get(self) -> Optional[Tuple[str, Any]]:
+        """
+        Prochain (tenant_id, item) éligible, en attendant si besoin
+
+        Returns:
+            None quand la file est fermée et vide (le worker doit s'arrêter)
+        """
+        while True:
+            entry = self._pop_next()
+            if entry is not None:
+                return entry
+            if self._closed and self.pending == 0:
+                return None
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise
+
+    def task_done(self, tenant_id: str) -> None:
+        self._running[tenant_id] -= 1
+        self._notify()
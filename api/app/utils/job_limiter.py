@@ -2,15 +2,21 @@
 🔒 Gestionnaire de limites globales pour les jobs de refresh
 
 Utilise PostgreSQL comme arbitre entre les containers (CRON + API).
-Évite les crashs RAM en limitant le nombre total de workers.
+Plafonne le nombre total de refresh en cours; dans chaque worker, la mémoire
+est gérée par un budget (voir utils/memory_admission).
 
 Architecture:
 - CRON: max 8 workers (laisse 2 slots pour l'API)
 - API: peut utiliser jusqu'à 10 total (2 slots réservés)
-- Zombie cleanup: jobs RUNNING > 45min → ERROR
+- Un slot = un job RUNNING avec un bail vivant (lease_expires_at > now).
+  Les process renouvellent leurs bails toutes les 15s (voir job_queue.LeaseHeartbeat):
+  un container crashé libère ses slots en ~1 minute, sans nettoyage préalable.
+  La remise en file des jobs expirés se fait à part (job_queue.requeue_expired_jobs).
 """
-from datetime import datetime, timedelta, timezone
-from sqlalchemy import select, update, func
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 
 from ..models.refresh_job import RefreshJob, JobStatus
@@ -20,39 +26,7 @@ from ..models.refresh_job import RefreshJob, JobStatus
 MAX_API_WORKERS = 10      # API a la priorité, user attend devant l'écran
 MAX_CRON_WORKERS = 10     # CRON utilise aussi 10 workers (rate monitor protège)
 CRON_SKIP_THRESHOLD = 8   # Si >= 8 jobs running, CRON skip ce cycle
-MAX_GLOBAL_WORKERS = 10   # Limite absolue système
-ZOMBIE_TIMEOUT_MINUTES = 45  # Jobs RUNNING > 45min = morts
-
-
-def cleanup_zombie_jobs(db: Session) -> int:
-    """
-    Nettoie les jobs bloqués en RUNNING depuis trop longtemps.
-
-    Évite le blocage permanent si un worker crash sans mettre à jour le status.
-
-    Returns:
-        Nombre de jobs nettoyés
-    """
-    threshold = datetime.now(timezone.utc) - timedelta(minutes=ZOMBIE_TIMEOUT_MINUTES)
-
-    result = db.execute(
-        update(RefreshJob)
-        .where(
-            RefreshJob.status == JobStatus.RUNNING,
-            RefreshJob.started_at < threshold
-        )
-        .values(
-            status=JobStatus.ERROR,
-            error=f"Timeout après {ZOMBIE_TIMEOUT_MINUTES}min - marqué zombie",
-            finished_at=datetime.now(timezone.utc)
-        )
-    )
-
-    if result.rowcount > 0:
-        db.commit()
-        print(f"🧟 Nettoyé {result.rowcount} job(s) zombie(s)")
-
-    return result.rowcount
+MAX_GLOBAL_WORKERS = 10   # Limite absolue système (la RAM est gérée par utils/memory_admission)
 
 
 def get_active_job_count(db: Session) -> int:
@@ -70,15 +44,18 @@ def get_active_job_count(db: Session) -> int:
     return count or 0
 
 
-def get_running_job_count(db: Session) -> int:
+def get_running_job_count(db: Session, now: Optional[datetime] = None) -> int:
     """
-    Compte uniquement les jobs en cours d'exécution (RUNNING).
+    Compte les slots occupés: jobs RUNNING dont le bail est encore valide.
 
-    Plus précis que get_active_job_count pour mesurer la charge réelle.
+    Un job RUNNING au bail expiré (process mort) ne compte plus, même
+    avant sa remise en file.
     """
+    now = now or datetime.now(timezone.utc)
     count = db.execute(
         select(func.count(RefreshJob.id)).where(
-            RefreshJob.status == JobStatus.RUNNING
+            RefreshJob.status == JobStatus.RUNNING,
+            RefreshJob.lease_expires_at > now
         )
     ).scalar()
 
@@ -87,7 +64,7 @@ def get_running_job_count(db: Session) -> int:
 
 def can_cron_proceed(db: Session) -> tuple[bool, int, str]:
     """
-    Vérifie si le CRON peut lancer des jobs.
+    Vérifie si le CRON peut lancer des jobs (une seule requête).
 
     Le CRON a une priorité BASSE. Si le système est déjà occupé
     (API en train de faire un BASELINE pour un nouvel user),
@@ -96,10 +73,6 @@ def can_cron_proceed(db: Session) -> tuple[bool, int, str]:
     Returns:
         (can_proceed, available_slots, message)
     """
-    # D'abord, nettoyer les zombies
-    cleanup_zombie_jobs(db)
-
-    # Compter les jobs actifs
     running = get_running_job_count(db)
 
     # Si système déjà bien occupé → CRON skip (priorité à l'API)
@@ -112,7 +85,7 @@ def can_cron_proceed(db: Session) -> tuple[bool, int, str]:
 
 def can_api_proceed(db: Session) -> tuple[bool, int, str]:
     """
-    Vérifie si l'API peut lancer des jobs.
+    Vérifie si l'API peut lancer des jobs (une seule requête).
 
     L'API a la PRIORITÉ HAUTE (nouvel utilisateur qui attend).
     Elle peut utiliser jusqu'à MAX_API_WORKERS (10) slots.
@@ -120,10 +93,6 @@ def can_api_proceed(db: Session) -> tuple[bool, int, str]:
     Returns:
         (can_proceed, available_slots, message)
     """
-    # D'abord, nettoyer les zombies
-    cleanup_zombie_jobs(db)
-
-    # Compter les jobs actifs
     running = get_running_job_count(db)
 
     if running >= MAX_API_WORKERS:
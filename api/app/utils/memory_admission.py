@@ -0,0 +1,148 @@
+"""
+🧠 Admission des refresh selon la mémoire (refresh_worker)
+
+Avant: un plafond fixe de workers (MAX_GLOBAL_WORKERS) "pour éviter les
+crashs RAM", alors qu'un compte de 20 ads et un compte de 2000 ads n'ont
+pas du tout le même coût.
+
+Maintenant chaque process worker a un budget (settings.MEMORY_BUDGET_MB,
+RSS total visé) et n'admet un job que si son empreinte estimée tient dans
+ce qui reste:
+- Empreinte d'un compte: EWMA de la croissance du RSS observée pendant ses
+  refresh (ad_accounts.memory_estimate_mb). Jamais mesuré: modèle par rows
+  journalières (JOB_BASE_MB + MB_PER_1K_ROWS), sinon DEFAULT_JOB_MB.
+- Correction par le RSS réel: à chaque tick, RSS mesuré vs somme des
+  empreintes réservées → facteur d'échelle (EWMA, borné) appliqué à toutes
+  les estimations. Sous-estimation → moins d'admissions, et inversement.
+- Un job plus gros que le budget passe seul (rien d'autre réservé): les
+  gros comptes sont sérialisés, les petits tournent à plusieurs.
+
+MAX_GLOBAL_WORKERS reste le plafond absolu (tous workers confondus).
+"""
+from typing import Any, Dict, Optional, Sequence
+
+from .run_metrics import current_rss_mb
+
+JOB_BASE_MB = 60               # Coût fixe d'un refresh (buffers HTTP, transform, JSON)
+MB_PER_1K_ROWS = 4             # Modèle initial: par 1000 rows journalières (ad × jour)
+DEFAULT_JOB_MB = 300           # Compte jamais refresh: taille inconnue, prudence
+MEMORY_EWMA_ALPHA = 0.3        # Poids de la dernière observation d'un compte
+SCALE_EWMA_ALPHA = 0.2         # Poids de la dernière mesure du RSS réel
+SCALE_MIN = 0.5
+SCALE_MAX = 3.0
+MIN_CALIBRATION_MB = 100       # En dessous, le bruit du RSS domine: pas de correction
+
+
+def estimate_account_mb(account: Any) -> int:
+    """Empreinte mémoire brute (avant facteur d'échelle) d'un refresh du compte"""
+    if account.memory_estimate_mb:
+        return account.memory_estimate_mb
+    if account.daily_rows:
+        return JOB_BASE_MB + account.daily_rows * MB_PER_1K_ROWS // 1000
+    return DEFAULT_JOB_MB
+
+
+def update_account_estimate(account: Any, observed_mb: Optional[int], daily_rows: Optional[int]) -> None:
+    """
+    Intègre l'observation d'un refresh réussi (commit par l'appelant)
+
+    observed_mb: croissance du RSS pendant le refresh (run_metrics.rss_growth_mb).
+    Bornée par JOB_BASE_MB: une mémoire déjà réservée par le process et
+    réutilisée ne fait pas croître le RSS, le refresh coûte quand même.
+    """
+    if daily_rows is not None:
+        account.daily_rows = daily_rows
+    if observed_mb is None:
+        return
+    observed_mb = max(observed_mb, JOB_BASE_MB)
+    if account.memory_estimate_mb:
+        observed_mb = MEMORY_EWMA_ALPHA * observed_mb + (1 - MEMORY_EWMA_ALPHA) * account.memory_estimate_mb
+    account.memory_estimate_mb = int(round(observed_mb))
+
+
+class MemoryAdmission:
+    """
+    Budget mémoire d'un process worker (réservations par job)
+
+    try_admit() au claim, release() à la fin du job (ou s'il n'est pas
+    lancé), calibrate() régulièrement avec le RSS réel.
+    """
+
+    def __init__(self, budget_mb: int, idle_rss_mb: Optional[int] = None):
+        self.budget_mb = budget_mb
+        self.idle_rss_mb = idle_rss_mb if idle_rss_mb is not None else current_rss_mb()
+        self.scale = 1.0
+        self.peak_reserved_mb = 0
+        self.deferred = 0
+        self.waiting_job_id: Any = None  # Job en tête de file qui attend de la mémoire
+        self._reserved: Dict[Any, int] = {}
+
+    @property
+    def reserved_mb(self) -> int:
+        """Empreinte des jobs admis, facteur d'échelle inclus"""
+        return int(sum(self._reserved.values()) * self.scale)
+
+    @property
+    def available_mb(self) -> int:
+        return self.budget_mb - self.idle_rss_mb - self.reserved_mb
+
+    def try_admit(self, job_id: Any, estimate_mb: int) -> bool:
+        """Réserve l'empreinte du job si elle tient dans le budget (ou si rien ne tourne)"""
+        if self._reserved and estimate_mb * self.scale > self.available_mb:
+            self.deferred += 1
+            return False
+        self._reserved[job_id] = estimate_mb
+        self.peak_reserved_mb = max(self.peak_reserved_mb, self.reserved_mb)
+        return True
+
+    def admissible_count(self, estimates_mb: Sequence[int]) -> int:
+        """
+        Nombre de jobs (dans l'ordre) qui tiendraient ensemble, sans rien réserver
+
+        Même règle que try_admit: sert à ne réclamer que ce qui sera admis.
+        """
+        reserved = sum(self._reserved.values())
+        count = 0
+        for estimate_mb in estimates_mb:
+            if reserved and estimate_mb * self.scale > self.budget_mb - self.idle_rss_mb - reserved * self.scale:
+                break
+            reserved += estimate_mb
+            count += 1
+        return count
+
+    def wait_for(self, job_id: Any) -> bool:
+        """Note le job en tête qui attend de la mémoire; True la première fois (à logger)"""
+        if job_id == self.waiting_job_id:
+            return False
+        self.waiting_job_id = job_id
+        self.deferred += 1
+        return True
+
+    def release(self, *job_ids: Any) -> None:
+        for job_id in job_ids:
+            self._reserved.pop(job_id, None)
+
+    def calibrate(self, rss_mb: Optional[int] = None) -> float:
+        """
+        Corrige les estimations avec le RSS mesuré
+
+        Rien en cours: le RSS actuel devient la base du process (l'allocateur
+        Python garde de la mémoire après les refresh). Sinon le rapport
+        (RSS - base) / estimations réservées ajuste le facteur d'échelle.
+
+        Returns:
+            Facteur d'échelle courant
+        """
+        rss_mb = current_rss_mb() if rss_mb is None else rss_mb
+        raw_reserved = sum(self._reserved.values())
+        if not raw_reserved:
+            self.idle_rss_mb = rss_mb
+            return self.scale
+        if raw_reserved < MIN_CALIBRATION_MB:
+            return self.scale
+        ratio = max(0, rss_mb - self.idle_rss_mb) / raw_reserved
+        # Baisse lente: un job admis à l'instant n'a pas encore alloué sa mémoire
+        alpha = SCALE_EWMA_ALPHA if ratio > self.scale else SCALE_EWMA_ALPHA / 4
+        scale = alpha * ratio + (1 - alpha) * self.scale
+        self.scale = min(SCALE_MAX, max(SCALE_MIN, scale))
+        return self.scale
@@ -0,0 +1,99 @@
+"""
+📈 Compteurs du refresh en cours (télémétrie, voir services/refresh_telemetry)
+
+Les couches basses (meta_client, storage) incrémentent des compteurs sans
+savoir quel refresh les appelle: le refresh courant est porté par une
+ContextVar. Les tâches asyncio créées pendant le refresh (shards, batches
+creatives) héritent du contexte et comptent dans le même run.
+
+Hors refresh (API, scripts), record() ne fait rien.
+
+RSS: échantillonné au début du run et à la fin de chaque étape (stage):
+rss_growth_mb() ≈ mémoire prise par le refresh (voir utils/memory_admission).
+"""
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+_current_run: ContextVar[Optional[Dict[str, Any]]] = ContextVar("refresh_run_metrics", default=None)
+
+
+def start_run() -> Tuple[Dict[str, Any], Token]:
+    """Démarre la collecte pour le contexte courant (reset via end_run)"""
+    rss = current_rss_mb()
+    metrics: Dict[str, Any] = {"rss_start_mb": rss, "rss_max_mb": rss}
+    return metrics, _current_run.set(metrics)
+
+
+def end_run(token: Token) -> None:
+    _current_run.reset(token)
+
+
+def current() -> Optional[Dict[str, Any]]:
+    """Compteurs du refresh en cours (None hors refresh)"""
+    return _current_run.get()
+
+
+def record(name: str, value: float = 1) -> None:
+    """Ajoute `value` au compteur `name` du refresh en cours"""
+    metrics = _current_run.get()
+    if metrics is not None:
+        metrics[name] = metrics.get(name, 0) + value
+
+
+def set_value(name: str, value: Any) -> None:
+    """Fixe une valeur (ex: unique_ads, refresh_mode) du refresh en cours"""
+    metrics = _current_run.get()
+    if metrics is not None:
+        metrics[name] = value
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Cumule la durée du bloc dans `{name}_ms`"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        record(f"{name}_ms", (time.monotonic() - started) * 1000)
+        sample_rss()
+
+
+def sample_rss() -> None:
+    """Met à jour le max de RSS observé pendant le refresh en cours"""
+    metrics = _current_run.get()
+    if metrics is not None:
+        metrics["rss_max_mb"] = max(metrics.get("rss_max_mb", 0), current_rss_mb())
+
+
+def rss_growth_mb(metrics: Dict[str, Any]) -> Optional[int]:
+    """
+    Croissance du RSS pendant le refresh (max échantillonné - début)
+
+    Process partagé: inclut ce que les refresh parallèles ont alloué entre-temps
+    (surestimation prudente). None si le run n'a pas été échantillonné.
+    """
+    if "rss_start_mb" not in metrics:
+        return None
+    return max(0, int(metrics.get("rss_max_mb", 0) - metrics["rss_start_mb"]))
+
+
+def current_rss_mb() -> int:
+    """RSS actuel du process (Linux: /proc/self/statm; ailleurs: pic ru_maxrss)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return int(resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024))
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> int:
+    """Pic de RSS du PROCESS (partagé entre les refresh parallèles du worker)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KiB, macOS: octets
+    return int(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024)
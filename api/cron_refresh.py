@@ -5,9 +5,10 @@
 Appelé toutes les 2h par le cron Docker sur VPS Vultr
 Refresh les données Meta Ads de tous les tenants actifs
 
-⚡ PARALLÉLISÉ: Utilise asyncio.Semaphore pour limiter la concurrence
+⚡ PARALLÉLISÉ: File globale cross-tenant vidée par un pool de workers (AIMD)
 🔒 FILE LOCK: Empêche deux crons de tourner en parallèle
-🧟 ZOMBIE CLEANUP: Nettoie les jobs bloqués > 45min
+💓 BAILS: Chaque job RUNNING est tenu par un heartbeat (15s); un cron crashé
+   libère ses slots en ~1 minute (plus de timeout zombie de 45min)
 
 Architecture des limites (partagée avec l'API via PostgreSQL):
 - CRON: max 8 workers (laisse 2 slots pour l'API)
@@ -21,24 +22,36 @@ import os
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
 
 # Ajouter le répertoire parent au PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent))
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from app.database import SessionLocal
 from app import models
 from app.models import JobStatus, RefreshJob
-from app.services.refresher import sync_account_data, RefreshError
+from app.services.refresher import sync_account_data, prefetch_small_accounts_insights
 from app.services.demographics_fetcher import refresh_demographics_for_account, DemographicsError
-from app.services.meta_client import meta_client
+from app.services.meta_client import meta_client, MetaAPIError
+from app.services.insights_spool import cleanup_spool
+from app.services.job_queue import LeaseHeartbeat, finish_job, requeue_expired_jobs, start_job
+from app.services import refresh_telemetry, refresh_progress
+from app.services.circuit_breaker import CircuitOpenError, classify_error, is_blocked, load_open_circuits
+from app.services.refresh_scheduler import (
+    plan_refresh_order,
+    schedule_after_error,
+    schedule_after_refresh,
+    CYCLE_BUDGET_SECONDS,
+    IDLE_CADENCE_HOURS,
+)
+from app.utils.adaptive_concurrency import AdaptiveConcurrencyLimiter, AIMD_TICK_SECONDS
+from app.utils.fair_queue import FairWorkQueue
+from app.utils import run_metrics
+from app.utils.memory_admission import update_account_estimate
 from app.utils.job_limiter import (
     MAX_CRON_WORKERS,
-    CRON_SKIP_THRESHOLD,
-    cleanup_zombie_jobs,
-    can_cron_proceed,
-    get_running_job_count
+    can_cron_proceed
 )
 from cryptography.fernet import Fernet
 from app.config import settings
@@ -49,6 +62,11 @@ DELAY_BETWEEN_ACCOUNTS_MS = 200  # Petit délai pour éviter les burst de rate l
 MAX_CONSECUTIVE_ERRORS = 3  # Auto-disable après X erreurs 403 consécutives
 MAX_RETRY_ATTEMPTS = 3  # Nombre de tentatives avant d'abandonner
 RETRY_DELAY_SECONDS = 5  # Délai entre les tentatives
+CRON_INITIAL_WORKERS = 4  # Départ de la concurrence adaptative (AIMD monte jusqu'aux slots libres)
+CRON_MAX_WORKERS_PER_TENANT = 4  # Comptes d'un même tenant (même token) refresh en parallèle
+
+# 💓 Bails des jobs détenus par ce process (démarré par main() / refresh_worker)
+lease_heartbeat = LeaseHeartbeat(SessionLocal)
 
 # NOTE: Demographics sont auto-skip en mode BASELINE (nouvel user = urgent)
 # En mode TAIL (refresh régulier), demographics sont fetchés normalement
@@ -91,12 +109,67 @@ def release_lock(lock_fd):
             pass
 
 
+def _is_access_error(error: Exception) -> bool:
+    """True si l'erreur indique un token/compte sans accès (circuit ouvert, 403, codes Graph 190/200/10)"""
+    if isinstance(error, CircuitOpenError) or classify_error(error) is not None:
+        return True
+    cause = error.__cause__ if isinstance(error.__cause__, MetaAPIError) else error
+    return not isinstance(cause, MetaAPIError) and "403" in str(error)
+
+
+def find_shared_accounts(db, tenants, open_circuits: Optional[Set[str]] = None) -> Dict[str, List[str]]:
+    """
+    Repère les fb_account_id connectés par plusieurs tenants (agence + client).
+
+    Returns:
+        fb_account_id -> tenant_ids (str) candidats, dans l'ordre de préférence:
+        d'abord les tenants dont le token Meta est valide (et sans circuit ouvert
+        sur ce compte), puis l'ordre des tenants.
+        Le premier est le "leader": il fetch et copie vers les autres.
+    """
+    open_circuits = open_circuits or set()
+    now = datetime.now(timezone.utc)
+    tenant_order = {str(t.id): i for i, t in enumerate(tenants)}
+
+    owners: Dict[str, List[str]] = {}
+    for fb_account_id, tenant_id in db.execute(
+        select(models.AdAccount.fb_account_id, models.AdAccount.tenant_id).where(
+            models.AdAccount.is_disabled == False
+        )
+    ).all():
+        owners.setdefault(fb_account_id, []).append(str(tenant_id))
+
+    shared = {fb: tids for fb, tids in owners.items() if len(tids) > 1}
+    if not shared:
+        return {}
+
+    valid_token_tenants = {
+        str(t.tenant_id) for t in db.execute(
+            select(models.OAuthToken).where(models.OAuthToken.provider == "meta")
+        ).scalars().all()
+        if not t.expires_at or t.expires_at > now
+    }
+
+    for fb, tids in shared.items():
+        tids.sort(key=lambda tid: (
+            tid not in valid_token_tenants or is_blocked(open_circuits, tid, fb),
+            tenant_order.get(tid, len(tenant_order))
+        ))
+    return shared
+
+
 async def refresh_single_account(
     account_id: int,
     account_fb_id: str,
     account_name: str,
     tenant_id: str,
-    semaphore: asyncio.Semaphore
+    semaphore: Union[asyncio.Semaphore, AdaptiveConcurrencyLimiter],
+    mirror_tenant_ids: Optional[List[str]] = None,
+    deadline: Optional[float] = None,
+    prefetched_insights: Optional[Dict[str, Any]] = None,
+    job_id: Optional[Any] = None,
+    lease_token: Optional[Any] = None,
+    cycle_id: Optional[str] = None
 ) -> Tuple[bool, str]:
     """
     Refresh un seul ad account (appelé en parallèle)
@@ -104,12 +177,31 @@ async def refresh_single_account(
     ⚠️ IMPORTANT: Chaque tâche crée sa propre session DB pour éviter
     les race conditions avec asyncio.gather()
 
+    Compte partagé (mirror_tenant_ids): fetch une fois avec le token du tenant,
+    puis copie vers les autres tenants. Si le token n'a pas/plus accès,
+    on réessaie avec le token du tenant suivant.
+
+    prefetched_insights: insights TAIL déjà récupérés via l'API Batch
+    (voir prefetch_small_accounts_insights), valables pour le token de tenant_id.
+
+    job_id: job déjà réclamé dans la file refresh_jobs (refresh_worker.py), avec
+    le lease_token de ce claim. Sans job_id (cron_refresh.py à la main), un job
+    est créé directement RUNNING. Si le bail est perdu (job repris par un autre
+    worker), le refresh est annulé.
+
+    cycle_id: regroupement de la télémétrie (refresh_runs), "cron:<début du cycle>"
+    pour le cron, "worker:<heure>" par défaut.
+
     Returns:
         (success: bool, message: str)
     """
     from uuid import UUID
 
     async with semaphore:
+        # ⏳ Budget du cycle épuisé → le compte passera au cycle suivant
+        if deadline is not None and asyncio.get_running_loop().time() > deadline:
+            return (True, f"⏳ Skipped {account_fb_id} - cycle budget exhausted")
+
         # Petit délai pour éviter burst (stagger les requêtes)
         await asyncio.sleep(DELAY_BETWEEN_ACCOUNTS_MS / 1000)
 
@@ -117,47 +209,87 @@ async def refresh_single_account(
         db = SessionLocal()
 
         try:
-            # Check for existing running job (idempotence)
-            existing_job = db.execute(
-                select(RefreshJob).where(
-                    RefreshJob.tenant_id == UUID(tenant_id),
-                    RefreshJob.ad_account_id == account_id,
-                    RefreshJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])
+            # 🔌 Circuit ouvert (token révoqué / compte sans permission) → pas de job, pas d'appel Meta
+            token_owners = [tenant_id] + list(mirror_tenant_ids or [])
+            open_circuits = load_open_circuits(db)
+            if all(is_blocked(open_circuits, tid, account_fb_id) for tid in token_owners):
+                db.execute(
+                    update(models.AdAccount)
+                    .where(models.AdAccount.id == account_id)
+                    .values(next_refresh_at=schedule_after_error())
                 )
-            ).scalar_one_or_none()
-
-            if existing_job:
-                return (True, f"⏭️ Skipped {account_fb_id} - already running")
-
-            # Create job
-            job = RefreshJob(
-                tenant_id=UUID(tenant_id),
-                ad_account_id=account_id,
-                status=JobStatus.QUEUED
-            )
-            db.add(job)
-            db.commit()
-            db.refresh(job)
-
-            try:
-                # Update job status
-                job.status = JobStatus.RUNNING
-                job.started_at = datetime.now(timezone.utc)
+                if job_id is not None:
+                    finish_job(db, job_id, lease_token, error="Circuit open: Meta access lost for this account")
                 db.commit()
+                if job_id is not None:
+                    lease_heartbeat.release(job_id)
+                    refresh_progress.report_finished(
+                        job_id, UUID(tenant_id), account_fb_id,
+                        error="Circuit open: Meta access lost for this account"
+                    )
+                return (True, f"🔌 Skipped {account_fb_id} - circuit open")
+
+            if job_id is not None:
+                # Job réclamé dans la file: déjà RUNNING, avec un bail
+                job = db.get(RefreshJob, job_id)
+                if job is None or job.status != JobStatus.RUNNING or job.lease_token != lease_token:
+                    # Bail perdu pendant l'attente dans la file locale: le job appartient à un autre claim
+                    lease_heartbeat.release(job_id)
+                    return (True, f"💔 Skipped {account_fb_id} - lease lost")
+            else:
+                # Hors file: idempotence via l'index unique (un seul job actif par compte)
+                job = start_job(db, UUID(tenant_id), account_id, source="cron")
+                if job is None:
+                    return (True, f"⏭️ Skipped {account_fb_id} - already running")
+                lease_token = job.lease_token
+
+            # 💔 Bail perdu (process gelé, DB injoignable > JOB_LEASE_SECONDS): le job a pu
+            # être repris ailleurs → annuler ce refresh plutôt que d'écrire en parallèle
+            loop = asyncio.get_running_loop()
+            refresh_task = asyncio.current_task()
+            lease = {"lost": False, "refreshing": True}
+
+            def _cancel_refresh() -> None:
+                # Sur la boucle: la tâche est suspendue dans le refresh (jamais après son finally)
+                if lease["refreshing"]:
+                    lease["lost"] = True
+                    refresh_task.cancel()
+
+            lease_heartbeat.hold(job.id, lease_token, on_lost=lambda: loop.call_soon_threadsafe(_cancel_refresh))
+
+            # 📈 Télémétrie: compteurs collectés pendant tout le refresh (refresh_runs)
+            metrics, metrics_token = run_metrics.start_run()
+            run_started = datetime.now(timezone.utc)
+            cycle_id = cycle_id or f"worker:{run_started:%Y-%m-%dT%H}"
+            # 📡 Progression en direct (SSE côté API, via NOTIFY)
+            progress_token = refresh_progress.bind(job.id, UUID(tenant_id), account_fb_id)
+            refresh_progress.report("started")
 
+            try:
                 # Run sync (insights data) avec RETRY pour erreurs transitoires
+                # Compte partagé: token_owners[0] fetch, les autres reçoivent une copie
                 result = None
                 last_error = None
                 for attempt in range(1, MAX_RETRY_ATTEMPTS + 1):
                     try:
                         result = await sync_account_data(
                             ad_account_id=account_fb_id,
-                            tenant_id=UUID(tenant_id),
-                            db=db
+                            tenant_id=UUID(token_owners[0]),
+                            db=db,
+                            mirror_tenant_ids=[UUID(tid) for tid in token_owners[1:]],
+                            prefetched_insights=prefetched_insights if token_owners[0] == tenant_id else None
                         )
                         break  # Succès, sortir de la boucle
                     except Exception as retry_error:
                         last_error = retry_error
+                        if len(token_owners) > 1 and _is_access_error(retry_error):
+                            # Token sans accès → essayer le token d'un autre tenant
+                            token_owners = token_owners[1:] + token_owners[:1]
+                            print(f"    🔁 {account_fb_id}: no access, retrying with tenant {token_owners[0]}")
+                            continue
+                        if _is_access_error(retry_error):
+                            # Erreur d'accès: réessayer ne sert à rien (circuit breaker ouvert)
+                            raise
                         if attempt < MAX_RETRY_ATTEMPTS:
                             print(f"    ⚠️ {account_fb_id}: Attempt {attempt}/{MAX_RETRY_ATTEMPTS} failed ({type(retry_error).__name__}), retrying in {RETRY_DELAY_SECONDS}s...")
                             await asyncio.sleep(RETRY_DELAY_SECONDS)
@@ -165,6 +297,9 @@ async def refresh_single_account(
                             # Dernière tentative échouée, propager l'erreur
                             raise last_error
 
+                if result is None:
+                    raise last_error
+
                 # 📊 Run demographics refresh (age/gender breakdowns)
                 # AUTO-SKIP en mode BASELINE (nouvel user = urgent, veut voir ses données vite)
                 # En mode TAIL (refresh régulier), on fetch les demographics normalement
@@ -177,11 +312,14 @@ async def refresh_single_account(
                 else:
                     # Mode TAIL: fetch demographics (pas urgent)
                     try:
-                        demo_result = await refresh_demographics_for_account(
-                            ad_account_id=account_fb_id,
-                            tenant_id=UUID(tenant_id),
-                            db=db
-                        )
+                        refresh_progress.report("demographics")
+                        with run_metrics.stage("demographics"):
+                            demo_result = await refresh_demographics_for_account(
+                                ad_account_id=account_fb_id,
+                                tenant_id=UUID(token_owners[0]),
+                                db=db,
+                                mirror_tenant_ids=[UUID(tid) for tid in token_owners[1:]]
+                            )
                         demo_periods = len(demo_result.get('periods_fetched', []))
                     except DemographicsError as e:
                         # Demographics failure is non-fatal, log and continue
@@ -189,9 +327,9 @@ async def refresh_single_account(
                     except Exception as e:
                         print(f"    ⚠️ Demographics error for {account_fb_id}: {str(e)[:50]}")
 
-                # Mark job as completed
-                job.status = JobStatus.OK
-                job.finished_at = datetime.now(timezone.utc)
+                # Mark job as completed (sauf si le job a été repris entre-temps)
+                if not finish_job(db, job.id, lease_token):
+                    print(f"    💔 {account_fb_id}: lease lost before completion, job left to its new owner")
 
                 # ✅ Reset consecutive errors on success
                 account = db.execute(
@@ -200,33 +338,74 @@ async def refresh_single_account(
                 if account and account.consecutive_errors > 0:
                     account.consecutive_errors = 0
 
+                # 🧠 Coût mémoire observé → empreinte estimée du compte (admission des workers)
+                if account:
+                    update_account_estimate(account, run_metrics.rss_growth_mb(metrics), result.get("daily_rows"))
+
+                # 🗓️ Prochaine échéance (cadence d'après les signaux frais), aussi pour les tenants miroirs
+                if account:
+                    db.execute(
+                        update(models.AdAccount)
+                        .where(
+                            models.AdAccount.fb_account_id == account_fb_id,
+                            models.AdAccount.tenant_id.in_([UUID(tid) for tid in token_owners])
+                        )
+                        .values(next_refresh_at=schedule_after_refresh(account))
+                    )
+
+                refresh_telemetry.add_run(
+                    db, metrics, UUID(tenant_id), account_fb_id, run_started, "ok",
+                    job_id=job.id, cycle_id=cycle_id, source=job.source
+                )
                 db.commit()
+                refresh_progress.report_finished(job.id, UUID(tenant_id), account_fb_id)
 
                 demo_info = f" +{demo_periods}d" if demo_periods > 0 else ""
                 return (True, f"✅ {account_fb_id} ({account_name}){demo_info}")
 
+            except asyncio.CancelledError:
+                if not lease["lost"]:
+                    raise  # Arrêt du worker: le bail expirera, un autre worker reprendra
+                refresh_task.uncancel()
+                db.rollback()
+                print(f"    💔 {account_fb_id}: lease lost, refresh cancelled")
+                return (False, f"💔 {account_fb_id}: lease lost, refresh cancelled")
+
             except Exception as e:
                 error_msg = str(e)[:500]
-                job.status = JobStatus.ERROR
-                job.error = error_msg
-                job.finished_at = datetime.now(timezone.utc)
+                finish_job(db, job.id, lease_token, error=error_msg)
 
                 # 🔴 Handle 403 errors: increment counter, auto-disable after MAX_CONSECUTIVE_ERRORS
                 account = db.execute(
                     select(models.AdAccount).where(models.AdAccount.id == account_id)
                 ).scalar_one_or_none()
+                if account:
+                    account.next_refresh_at = schedule_after_error()
 
-                if account and "403" in error_msg:
+                refresh_telemetry.add_run(
+                    db, metrics, UUID(tenant_id), account_fb_id, run_started, "error",
+                    job_id=job.id, cycle_id=cycle_id, source=job.source, error=error_msg
+                )
+
+                if account and _is_access_error(e) and not isinstance(e, CircuitOpenError):
                     account.consecutive_errors += 1
                     if account.consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
                         account.is_disabled = True
                         account.disabled_reason = f"Auto-disabled: {MAX_CONSECUTIVE_ERRORS}+ consecutive 403 errors"
                         db.commit()
+                        refresh_progress.report_finished(job.id, UUID(tenant_id), account_fb_id, error=error_msg)
                         return (False, f"🚫 {account_fb_id}: DISABLED (403 x{account.consecutive_errors})")
 
                 db.commit()
+                refresh_progress.report_finished(job.id, UUID(tenant_id), account_fb_id, error=error_msg)
                 return (False, f"❌ {account_fb_id}: {type(e).__name__}: {str(e)[:80]}")
 
+            finally:
+                lease["refreshing"] = False
+                run_metrics.end_run(metrics_token)
+                refresh_progress.unbind(progress_token)
+                lease_heartbeat.release(job.id)
+
         finally:
             # ⚡ Toujours fermer la session
             db.close()
@@ -234,116 +413,277 @@ async def refresh_single_account(
             gc.collect()
 
 
-async def refresh_tenant(tenant_id: str, tenant_name: str, db: SessionLocal):
+async def prepare_tenant(
+    tenant_id: str,
+    tenant_name: str,
+    db: SessionLocal,
+    shared_accounts: Optional[Dict[str, List[str]]] = None,
+    due_account_ids: Optional[List[Any]] = None,
+    account_signals: Optional[Dict[Any, Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
     """
-    Refresh tous les ad accounts d'un tenant EN PARALLÈLE
-
-    ⚡ OPTIMISÉ: Utilise asyncio.Semaphore pour limiter la concurrence
-    et éviter de dépasser les rate limits Meta API.
+    Prépare les refresh d'un tenant (comptes dus, token, pré-chargement batch)
 
     Args:
         tenant_id: UUID du tenant
         tenant_name: Nom du tenant (pour logs)
         db: Session DB
+        shared_accounts: fb_account_id -> tenants candidats (voir find_shared_accounts).
+            Un compte partagé n'est refresh que par son tenant leader.
+        due_account_ids: IDs des comptes à refresh, par priorité décroissante
+            (voir refresh_scheduler). None = tous les comptes actifs.
+        account_signals: account.id -> signaux du scheduler (ads_count...), pour
+            regrouper les insights des petits comptes dans des POST batch
+
+    Returns:
+        Arguments de refresh_single_account par compte (sans semaphore/deadline),
+        dans l'ordre de priorité. Liste vide si rien à faire (pas de token, expiré...).
     """
+    shared_accounts = shared_accounts or {}
     from uuid import UUID
 
-    print(f"\n🔄 Refreshing tenant: {tenant_name} ({tenant_id})")
-    start_time = datetime.now(timezone.utc)
-
-    try:
-        # Get all ACTIVE ad accounts for this tenant (skip disabled)
-        accounts = db.execute(
-            select(models.AdAccount).where(
-                models.AdAccount.tenant_id == UUID(tenant_id),
-                models.AdAccount.is_disabled == False
-            )
-        ).scalars().all()
-
-        # Count disabled for logging
-        disabled_count = db.execute(
-            select(models.AdAccount).where(
-                models.AdAccount.tenant_id == UUID(tenant_id),
-                models.AdAccount.is_disabled == True
+    print(f"\n🔄 Preparing tenant: {tenant_name} ({tenant_id})")
+
+    # Get all ACTIVE ad accounts for this tenant (skip disabled)
+    accounts = db.execute(
+        select(models.AdAccount).where(
+            models.AdAccount.tenant_id == UUID(tenant_id),
+            models.AdAccount.is_disabled == False
+        )
+    ).scalars().all()
+
+    # Count disabled for logging
+    disabled_count = db.execute(
+        select(models.AdAccount).where(
+            models.AdAccount.tenant_id == UUID(tenant_id),
+            models.AdAccount.is_disabled == True
+        )
+    ).scalars().all()
+
+    if not accounts:
+        print(f"  ⚠️  No active ad accounts found for {tenant_name}")
+        return []
+
+    disabled_msg = f" ({len(disabled_count)} disabled)" if disabled_count else ""
+    print(f"  📊 Found {len(accounts)} active ad accounts{disabled_msg}")
+
+    # 🎯 Priorité: seulement les comptes dus, score décroissant
+    if due_account_ids is not None:
+        by_id = {account.id: account for account in accounts}
+        not_due = len(accounts)
+        accounts = [by_id[account_id] for account_id in due_account_ids if account_id in by_id]
+        not_due -= len(accounts)
+        if not_due:
+            print(f"  💤 {not_due} account(s) not due yet (idle cadence {IDLE_CADENCE_HOURS}h)")
+
+    # Get OAuth token for this tenant
+    oauth_token = db.execute(
+        select(models.OAuthToken).where(
+            models.OAuthToken.tenant_id == UUID(tenant_id),
+            models.OAuthToken.provider == "meta"
+        )
+    ).scalar_one_or_none()
+
+    if not oauth_token:
+        print(f"  ❌ No OAuth token found for {tenant_name}")
+        return []
+
+    # Decrypt token
+    fernet = Fernet(settings.TOKEN_ENCRYPTION_KEY.encode())
+    access_token = fernet.decrypt(oauth_token.access_token).decode()
+
+    # Check if token is expired
+    if oauth_token.expires_at and oauth_token.expires_at < datetime.now(timezone.utc):
+        print(f"  ⚠️  OAuth token expired for {tenant_name} (expired at {oauth_token.expires_at})")
+        return []
+
+    # Comptes partagés: seul le tenant leader fetch (et copie vers les autres)
+    followers = [
+        account for account in accounts
+        if account.fb_account_id in shared_accounts
+        and shared_accounts[account.fb_account_id][0] != tenant_id
+    ]
+    if followers:
+        print(f"  🔁 {len(followers)} shared account(s) refreshed by another tenant")
+        accounts = [account for account in accounts if account not in followers]
+
+    # 📦 Petits comptes: insights TAIL pré-chargés en quelques POST batch
+    prefetched = {}
+    if account_signals:
+        try:
+            prefetched = await prefetch_small_accounts_insights(
+                [
+                    (account.fb_account_id, account.last_refresh_at, account_signals[account.id].get("ads_count", 0))
+                    for account in accounts if account.id in account_signals
+                ],
+                access_token
             )
-        ).scalars().all()
-
-        if not accounts:
-            print(f"  ⚠️  No active ad accounts found for {tenant_name}")
-            return
+        except Exception as e:
+            # Non bloquant: chaque compte sera fetché individuellement
+            print(f"  ⚠️ Batch insights failed: {str(e)[:100]}")
+
+    return [
+        {
+            "account_id": account.id,
+            "account_fb_id": account.fb_account_id,
+            "account_name": account.name,
+            "tenant_id": tenant_id,
+            "mirror_tenant_ids": shared_accounts.get(account.fb_account_id, [])[1:],
+            "prefetched_insights": prefetched.get(account.fb_account_id),
+        }
+        for account in accounts
+    ]
+
+
+def _summarize_results(results: List[Any]) -> Tuple[int, int]:
+    """Affiche chaque résultat de refresh_single_account et retourne (succès, erreurs)"""
+    success_count = 0
+    error_count = 0
+    for result in results:
+        if isinstance(result, Exception):
+            error_count += 1
+            print(f"    ❌ Exception: {str(result)[:100]}")
+        elif isinstance(result, tuple):
+            success, msg = result
+            if success:
+                success_count += 1
+            else:
+                error_count += 1
+            print(f"    {msg}")
+    return success_count, error_count
 
-        disabled_msg = f" ({len(disabled_count)} disabled)" if disabled_count else ""
-        print(f"  📊 Found {len(accounts)} active ad accounts{disabled_msg}")
 
-        # Get OAuth token for this tenant
-        oauth_token = db.execute(
-            select(models.OAuthToken).where(
-                models.OAuthToken.tenant_id == UUID(tenant_id),
-                models.OAuthToken.provider == "meta"
-            )
-        ).scalar_one_or_none()
+async def refresh_tenant(
+    tenant_id: str,
+    tenant_name: str,
+    db: SessionLocal,
+    shared_accounts: Optional[Dict[str, List[str]]] = None,
+    due_account_ids: Optional[List[Any]] = None,
+    deadline: Optional[float] = None,
+    limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+    account_signals: Optional[Dict[Any, Dict[str, Any]]] = None
+):
+    """
+    Refresh tous les ad accounts d'un seul tenant EN PARALLÈLE
 
-        if not oauth_token:
-            print(f"  ❌ No OAuth token found for {tenant_name}")
+    Le cycle cron complet passe par la file globale (voir run_work_queue);
+    cette fonction sert à rafraîchir un tenant isolé (scripts, debug).
+    Concurrence bornée par `limiter` ou un Semaphore(MAX_CRON_WORKERS) fixe.
+    """
+    start_time = datetime.now(timezone.utc)
+    try:
+        tasks = await prepare_tenant(
+            tenant_id, tenant_name, db, shared_accounts, due_account_ids, account_signals
+        )
+        if not tasks:
             return
 
-        # Decrypt token
-        fernet = Fernet(settings.TOKEN_ENCRYPTION_KEY.encode())
-        access_token = fernet.decrypt(oauth_token.access_token).decode()
+        semaphore = limiter or asyncio.Semaphore(MAX_CRON_WORKERS)
+        results = await asyncio.gather(
+            *[refresh_single_account(**task, semaphore=semaphore, deadline=deadline) for task in tasks],
+            return_exceptions=True
+        )
+        success_count, error_count = _summarize_results(results)
 
-        # Check if token is expired
-        if oauth_token.expires_at and oauth_token.expires_at < datetime.now(timezone.utc):
-            print(f"  ⚠️  OAuth token expired for {tenant_name} (expired at {oauth_token.expires_at})")
-            return
+        elapsed = (datetime.now(timezone.utc) - start_time).total_seconds()
+        print(f"  📊 Rate limit status: {meta_client.rate_monitor.get_usage_summary()}")
+        print(f"  ✅ Tenant {tenant_name}: {success_count} success, {error_count} errors in {elapsed:.1f}s")
 
-        # ⚡ PARALLÉLISATION avec Semaphore
-        # Limité à MAX_CRON_WORKERS (8) pour laisser 2 slots à l'API
-        semaphore = asyncio.Semaphore(MAX_CRON_WORKERS)
+    except Exception as e:
+        print(f"  ❌ Fatal error for tenant {tenant_name}: {e}")
 
-        print(f"  ⚡ Starting parallel refresh (max {MAX_CRON_WORKERS} concurrent)...")
 
-        # Créer les tâches parallèles (chaque tâche aura sa propre session DB)
-        tasks = [
-            refresh_single_account(
-                account_id=account.id,
-                account_fb_id=account.fb_account_id,
-                account_name=account.name,
-                tenant_id=tenant_id,
-                semaphore=semaphore
-            )
-            for account in accounts
-        ]
+async def run_work_queue(
+    due_by_tenant: Dict[str, List[Any]],
+    tenant_names: Dict[str, str],
+    db: SessionLocal,
+    shared_accounts: Dict[str, List[str]],
+    account_signals: Dict[Any, Dict[str, Any]],
+    limiter: AdaptiveConcurrencyLimiter,
+    deadline: Optional[float] = None,
+    cycle_id: Optional[str] = None
+) -> Dict[str, List[Any]]:
+    """
+    ⚖️ Refresh de tous les tenants via UNE file globale et un pool fixe de workers
 
-        # Exécuter en parallèle
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+    - Le producteur prépare les tenants un par un (ordre de priorité) et
+      enfile leurs comptes: les workers démarrent dès le premier tenant prêt
+    - limiter.max_limit workers vident la file en round-robin entre tenants,
+      au plus CRON_MAX_WORKERS_PER_TENANT comptes d'un même tenant à la fois
+    - La concurrence effective reste pilotée par le limiteur AIMD
 
-        # Compter les résultats
-        success_count = 0
-        error_count = 0
+    Returns:
+        tenant_id -> résultats de refresh_single_account
+    """
+    queue = FairWorkQueue(per_tenant_limit=CRON_MAX_WORKERS_PER_TENANT)
+    results_by_tenant: Dict[str, List[Any]] = {}
 
-        for result in results:
-            if isinstance(result, Exception):
-                error_count += 1
-                print(f"    ❌ Exception: {str(result)[:100]}")
-            elif isinstance(result, tuple):
-                success, msg = result
-                if success:
-                    success_count += 1
-                else:
-                    error_count += 1
-                print(f"    {msg}")
+    async def produce() -> None:
+        try:
+            for tenant_id, due_account_ids in due_by_tenant.items():
+                if tenant_id not in tenant_names:
+                    continue
+                try:
+                    tasks = await prepare_tenant(
+                        tenant_id, tenant_names[tenant_id], db, shared_accounts,
+                        due_account_ids=due_account_ids, account_signals=account_signals
+                    )
+                except Exception as e:
+                    print(f"  ❌ Fatal error for tenant {tenant_names[tenant_id]}: {e}")
+                    continue
+                for task in tasks:
+                    queue.put(tenant_id, task)
+        finally:
+            queue.close()
+
+    async def work() -> None:
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            tenant_id, task = entry
+            try:
+                result = await refresh_single_account(
+                    **task, semaphore=limiter, deadline=deadline, cycle_id=cycle_id
+                )
+            except Exception as e:
+                result = e
+            finally:
+                queue.task_done(tenant_id)
+            _summarize_results([result])
+            results_by_tenant.setdefault(tenant_id, []).append(result)
 
-        # Calculer le temps total
-        elapsed = (datetime.now(timezone.utc) - start_time).total_seconds()
+    workers = [asyncio.create_task(work()) for _ in range(limiter.max_limit)]
+    try:
+        await asyncio.gather(produce(), *workers)
+    finally:
+        for worker in workers:
+            worker.cancel()
 
-        # Log le résumé du rate monitor
-        from app.services.meta_client import meta_client
-        print(f"  📊 Rate limit status: {meta_client.rate_monitor.get_usage_summary()}")
+    print(f"⚖️ File globale: pic {queue.peak_running} comptes en parallèle "
+          f"({limiter.max_limit} workers, max {CRON_MAX_WORKERS_PER_TENANT}/tenant)")
+    return results_by_tenant
 
-        print(f"  ✅ Tenant {tenant_name}: {success_count} success, {error_count} errors in {elapsed:.1f}s")
 
-    except Exception as e:
-        print(f"  ❌ Fatal error for tenant {tenant_name}: {e}")
+async def adjust_concurrency_loop(limiter: AdaptiveConcurrencyLimiter) -> None:
+    """
+    Réévalue la concurrence du cycle toutes les AIMD_TICK_SECONDS
+
+    Lit l'usage Meta (décroissant dans le temps) et les 429 reçus depuis
+    le dernier tick, puis applique une étape AIMD au limiteur.
+    """
+    monitor = meta_client.rate_monitor
+    seen_throttle_events = monitor.throttle_events
+    while True:
+        await asyncio.sleep(AIMD_TICK_SECONDS)
+        throttled = monitor.throttle_events > seen_throttle_events
+        seen_throttle_events = monitor.throttle_events
+        previous = limiter.limit
+        usage = monitor.global_usage
+        new_limit = limiter.observe(usage, throttled=throttled)
+        if new_limit != previous:
+            print(f"  🎚️ Concurrence {previous} → {new_limit} (usage Meta {usage:.0f}%"
+                  f"{', throttled' if throttled else ''})")
 
 
 async def main():
@@ -352,7 +692,7 @@ async def main():
     Refresh tous les tenants actifs
 
     🔒 FILE LOCK: Empêche deux crons simultanés
-    🧟 ZOMBIE CLEANUP: Nettoie les jobs bloqués
+    💓 BAILS: Heartbeat des jobs en cours, reprise des bails expirés
     ⏭️ SKIP SI OCCUPÉ: Laisse la priorité à l'API (nouveaux users)
     """
     print(f"🕐 Cron Refresh Started at {datetime.now(timezone.utc).isoformat()}")
@@ -365,9 +705,11 @@ async def main():
         return
 
     db = SessionLocal()
+    lease_heartbeat.start()
 
     try:
         # 2. Vérifier si le système est déjà occupé (priorité à l'API)
+        requeue_expired_jobs(db)
         can_proceed, available_slots, message = can_cron_proceed(db)
         print(f"📊 {message}")
 
@@ -375,6 +717,11 @@ async def main():
             print("⏭️ CRON skip ce cycle, réessai dans 2h")
             return
 
+        # Spools de refresh interrompus trop vieux (ou au-delà du budget disque)
+        removed_spools = cleanup_spool()
+        if removed_spools:
+            print(f"🧹 {removed_spools} spool(s) de refresh obsolète(s) supprimé(s)")
+
         # 3. Get all tenants
         tenants = db.execute(select(models.Tenant)).scalars().all()
 
@@ -384,9 +731,56 @@ async def main():
 
         print(f"📊 Found {len(tenants)} tenants to refresh (max {MAX_CRON_WORKERS} workers)")
 
-        # 4. Refresh each tenant sequentially
-        for tenant in tenants:
-            await refresh_tenant(str(tenant.id), tenant.name, db)
+        # 4. Comptes connectés par plusieurs tenants → un seul fetch
+        # (leader = un tenant dont le token n'a pas de circuit ouvert)
+        open_circuits = load_open_circuits(db)
+        if open_circuits:
+            print(f"🔌 {len(open_circuits)} circuit(s) ouvert(s) (token/compte sans accès)")
+        shared_accounts = find_shared_accounts(db, tenants, open_circuits)
+        if shared_accounts:
+            print(f"🔁 {len(shared_accounts)} ad account(s) shared across tenants (fetched once)")
+
+        # 5. Priorité: score (staleness, spend, ads actives, activité user)
+        deadline = asyncio.get_running_loop().time() + CYCLE_BUDGET_SECONDS
+        active_accounts = db.execute(
+            select(models.AdAccount).where(models.AdAccount.is_disabled == False)
+        ).scalars().all()
+        plan = await plan_refresh_order(active_accounts, open_circuits=open_circuits)
+        print(f"🎯 {len(plan)}/{len(active_accounts)} accounts due this cycle "
+              f"(budget {CYCLE_BUDGET_SECONDS // 60}min)")
+
+        due_by_tenant: Dict[str, List[Any]] = {}
+        account_signals = {entry["account"].id: entry["signals"] for entry in plan}
+        for entry in plan:
+            due_by_tenant.setdefault(str(entry["account"].tenant_id), []).append(entry["account"].id)
+
+        # 6. Concurrence adaptative: démarre bas, monte tant que Meta le permet
+        limiter = AdaptiveConcurrencyLimiter(
+            initial=CRON_INITIAL_WORKERS,
+            max_limit=max(1, min(MAX_CRON_WORKERS, available_slots))
+        )
+        controller = asyncio.create_task(adjust_concurrency_loop(limiter))
+
+        # 7. File globale cross-tenant (round-robin, plafond par tenant)
+        tenant_names = {str(tenant.id): tenant.name for tenant in tenants}
+        cycle_start = datetime.now(timezone.utc)
+        try:
+            results_by_tenant = await run_work_queue(
+                due_by_tenant, tenant_names, db, shared_accounts, account_signals,
+                limiter, deadline=deadline, cycle_id=f"cron:{cycle_start:%Y-%m-%dT%H:%M}"
+            )
+        finally:
+            controller.cancel()
+
+        for tenant_id, results in results_by_tenant.items():
+            ok = sum(1 for r in results if isinstance(r, tuple) and r[0])
+            print(f"  ✅ Tenant {tenant_names[tenant_id]}: {ok} success, {len(results) - ok} errors")
+        elapsed = (datetime.now(timezone.utc) - cycle_start).total_seconds()
+        print(f"📊 Rate limit status: {meta_client.rate_monitor.get_usage_summary()}")
+        print(f"⏱️ {sum(len(r) for r in results_by_tenant.values())} comptes en {elapsed:.1f}s")
+
+        print(f"🎚️ Concurrence: pic {limiter.peak_limit}, "
+              f"{limiter.increases} hausse(s), {limiter.decreases} baisse(s)")
 
         print(f"\n✅ Cron Refresh Completed at {datetime.now(timezone.utc).isoformat()}")
 
@@ -396,6 +790,11 @@ async def main():
         traceback.print_exc()
         sys.exit(1)
     finally:
+        stats = meta_client.get_pool_stats()
+        print(f"🌐 HTTP pool: {stats['requests']} requêtes, pic {stats['peak_in_flight']} en vol, "
+              f"{stats['clients_created']} client(s) créé(s)")
+        await meta_client.aclose()
+        lease_heartbeat.stop()
         db.close()
         release_lock(lock)
 
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+🔁 Worker de refresh continu (consommateur de la file refresh_jobs)
+
+Un ou plusieurs process (containers) qui tournent en permanence:
+- 📬 toutes les WORKER_CLAIM_SECONDS, réclament des jobs QUEUED dans
+  refresh_jobs (FOR UPDATE SKIP LOCKED, interactif avant planifié, voir
+  job_queue) et les passent à la file équitable cross-tenant locale
+- 🗓️ toutes les WORKER_POLL_SECONDS, enfilent un job SCHEDULED pour chaque
+  compte dont ad_accounts.next_refresh_at est dépassé (idempotent: plusieurs
+  workers peuvent le faire en même temps)
+- après chaque refresh, next_refresh_at = maintenant + cadence ± jitter
+  (voir refresh_scheduler): la charge se répartit dans le temps
+- état chaud entre deux comptes: pool HTTP keep-alive, cache metadata,
+  rate monitor et limiteur AIMD
+
+Pour plus de débit: ajouter des containers worker (plafond global
+MAX_GLOBAL_WORKERS jobs RUNNING, tous workers confondus).
+
+🧠 Mémoire: chaque process n'admet un job que si son empreinte estimée tient
+dans settings.MEMORY_BUDGET_MB (voir utils/memory_admission): beaucoup de
+petits comptes en parallèle, les gros un par un.
+
+🛑 SIGTERM / SIGINT: plus de nouveaux jobs, les jobs réclamés non démarrés
+retournent en file, les refresh en cours ont WORKER_SHUTDOWN_GRACE_SECONDS
+pour finir (docker stop_grace_period doit être plus long). Au-delà, le
+heartbeat s'arrête, le bail expire (~1 minute) et un autre worker reprend le job.
+"""
+import asyncio
+import signal
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import select, update, or_, exists
+from app.database import SessionLocal
+from app import models
+from app.models import JobStatus, RefreshJob
+from app.services.meta_client import meta_client
+from app.services.insights_spool import cleanup_spool
+from app.services.circuit_breaker import load_open_circuits
+from app.services.refresh_telemetry import cleanup_old_runs
+from app.services.refresh_progress import report_finished
+from app.services.job_queue import (
+    JOB_PRIORITY_INTERACTIVE,
+    JOB_PRIORITY_SCHEDULED,
+    claim_jobs,
+    enqueue_job,
+    finish_job,
+    queued_jobs_in_order,
+    release_jobs,
+    requeue_expired_jobs
+)
+from app.services.refresh_scheduler import load_account_signals, plan_refresh_order, schedule_after_error
+from app.utils.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from app.utils.fair_queue import FairWorkQueue
+from app.utils.memory_admission import MemoryAdmission, estimate_account_mb
+from app.config import settings
+from app.utils.job_limiter import (
+    MAX_CRON_WORKERS,
+    MAX_GLOBAL_WORKERS,
+    get_running_job_count
+)
+from cron_refresh import (
+    CRON_INITIAL_WORKERS,
+    CRON_MAX_WORKERS_PER_TENANT,
+    adjust_concurrency_loop,
+    find_shared_accounts,
+    lease_heartbeat,
+    prepare_tenant,
+    refresh_single_account,
+    _summarize_results
+)
+
+# Configuration
+WORKER_CLAIM_SECONDS = 2              # Réclamation des jobs (un user attend les jobs interactifs)
+WORKER_POLL_SECONDS = 30              # Recherche des comptes dus
+WORKER_SHUTDOWN_GRACE_SECONDS = 90    # Temps laissé aux refresh en cours sur SIGTERM
+WORKER_SPOOL_CLEANUP_SECONDS = 3600   # Nettoyage des spools obsolètes
+
+
+def _postpone(db, account_ids: List[Any]) -> None:
+    """Comptes dus mais non enfilés (circuit ouvert...): pas de re-scan à chaque poll"""
+    if not account_ids:
+        return
+    db.execute(
+        update(models.AdAccount)
+        .where(models.AdAccount.id.in_(account_ids))
+        .values(next_refresh_at=schedule_after_error())
+    )
+    db.commit()
+
+
+async def enqueue_due_accounts() -> int:
+    """
+    🗓️ Producteur SCHEDULED: un job par compte dû sans job actif
+
+    Returns:
+        Nombre de jobs créés
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        has_active_job = exists().where(
+            RefreshJob.ad_account_id == models.AdAccount.id,
+            RefreshJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])
+        )
+        candidates = db.execute(
+            select(models.AdAccount).where(
+                models.AdAccount.is_disabled == False,
+                or_(models.AdAccount.next_refresh_at.is_(None), models.AdAccount.next_refresh_at <= now),
+                ~has_active_job
+            )
+        ).scalars().all()
+        if not candidates:
+            return 0
+
+        # Ordre du scheduler (score): created_at croissant = ordre de claim à priorité égale
+        plan = await plan_refresh_order(candidates, now, open_circuits=load_open_circuits(db, now))
+        created = 0
+        for entry in plan:
+            account = entry["account"]
+            _, is_new = enqueue_job(db, account.tenant_id, account.id, JOB_PRIORITY_SCHEDULED, source="scheduler")
+            created += is_new
+
+        planned = {entry["account"].id for entry in plan}
+        _postpone(db, [account.id for account in candidates if account.id not in planned])
+        if created:
+            print(f"🗓️ {created} compte(s) dus mis en file")
+        return created
+    finally:
+        db.close()
+
+
+async def dispatch_claimed_jobs(
+    queue: FairWorkQueue,
+    limiter: AdaptiveConcurrencyLimiter,
+    admission: MemoryAdmission
+) -> int:
+    """
+    📬 Réclame des jobs dans refresh_jobs et les passe à la file locale
+
+    Ne réclame que ce que ce worker peut démarrer (limite AIMD) sans dépasser
+    MAX_GLOBAL_WORKERS jobs RUNNING au total, et que ce qui tient dans le
+    budget mémoire: la tête de file est lue (sans verrou) avant le claim. Un
+    job en tête trop gros pour la mémoire libre n'est pas réclamé: il reste
+    QUEUED (ni attempts ni statut touchés) et passera quand release() libère
+    de la mémoire. Si un autre worker a pris la tête entre-temps, les jobs
+    réclamés qui ne tiennent plus sont rendus à la file.
+
+    Returns:
+        Nombre de jobs réclamés
+    """
+    free = limiter.limit - queue.running - queue.pending
+    if free <= 0:
+        return 0
+
+    db = SessionLocal()
+    try:
+        free = min(free, MAX_GLOBAL_WORKERS - get_running_job_count(db))
+        head = queued_jobs_in_order(db, limit=free) if free > 0 else []
+        if not head:
+            return 0
+
+        # 🧠 Admission mémoire AVANT le claim (compte disparu: coût nul, terminé plus bas)
+        admission.calibrate()
+        head_accounts = {
+            account.id: account for account in db.execute(
+                select(models.AdAccount).where(models.AdAccount.id.in_([job.ad_account_id for job in head]))
+            ).scalars().all()
+        }
+        head_mb = [
+            estimate_account_mb(head_accounts[job.ad_account_id]) if job.ad_account_id in head_accounts else 0
+            for job in head
+        ]
+        fitting = admission.admissible_count(head_mb)
+        if not fitting:
+            if admission.wait_for(head[0].id):
+                print(f"🧠 Job {head[0].id} en attente de mémoire: ~{int(head_mb[0] * admission.scale)}MB, "
+                      f"{admission.available_mb}MB libres ({admission.reserved_mb}MB réservés)")
+            return 0
+        admission.waiting_job_id = None
+
+        jobs = claim_jobs(db, fitting)
+        if not jobs:
+            return 0
+        leases = {job.id: job.lease_token for job in jobs}  # Token de CE claim (exigé pour rendre/terminer)
+
+        accounts = {
+            account.id: account for account in db.execute(
+                select(models.AdAccount).where(models.AdAccount.id.in_([job.ad_account_id for job in jobs]))
+            ).scalars().all()
+        }
+
+        # Réservation des jobs effectivement réclamés (la tête a pu changer depuis la lecture)
+        admitted, deferred = [], []
+        for job in jobs:
+            account = accounts.get(job.ad_account_id)
+            fits = account is None or admission.try_admit(job.id, estimate_account_mb(account))
+            (deferred if deferred or not fits else admitted).append(job)
+        if deferred:
+            admission.release(*[job.id for job in deferred])
+            release_jobs(db, {job.id: leases[job.id] for job in deferred})
+            jobs = admitted
+            print(f"🧠 {len(deferred)} job(s) rendu(s) à la file: budget mémoire "
+                  f"({admission.reserved_mb}MB réservés + base {admission.idle_rss_mb}MB / {admission.budget_mb}MB)")
+            if not jobs:
+                return 0
+
+        # 💓 Bail entretenu dès le claim: un job peut attendre dans la file locale
+        for job in jobs:
+            lease_heartbeat.hold(job.id, leases[job.id])
+        tenants = db.execute(select(models.Tenant)).scalars().all()
+        tenant_names = {str(tenant.id): tenant.name for tenant in tenants}
+        shared_accounts = find_shared_accounts(db, tenants, load_open_circuits(db))
+
+        jobs_by_tenant: Dict[str, List[Any]] = {}
+        finished = []  # (job_id, tenant_id, fb_account_id, error): événement SSE après commit
+        for job in jobs:
+            account = accounts.get(job.ad_account_id)
+            tenant_id = str(job.tenant_id)
+            if account is None or account.is_disabled:
+                finish_job(db, job.id, leases[job.id], error="Ad account disabled")
+                lease_heartbeat.release(job.id)
+                admission.release(job.id)
+                finished.append((job.id, job.tenant_id, account.fb_account_id if account else "", "Ad account disabled"))
+                continue
+            leader = shared_accounts.get(account.fb_account_id, [tenant_id])[0]
+            if job.priority < JOB_PRIORITY_INTERACTIVE and leader != tenant_id:
+                # Compte partagé: le tenant leader le fetch et copie vers celui-ci
+                # (son succès réécrit next_refresh_at de ce compte aussi)
+                finish_job(db, job.id, leases[job.id])
+                lease_heartbeat.release(job.id)
+                admission.release(job.id)
+                finished.append((job.id, job.tenant_id, account.fb_account_id, None))
+                account.next_refresh_at = schedule_after_error()
+                continue
+            jobs_by_tenant.setdefault(tenant_id, []).append(job)
+        db.commit()
+
+        for tenant_id, tenant_jobs in jobs_by_tenant.items():
+            job_by_account = {job.ad_account_id: job for job in tenant_jobs}
+            # Seuls les comptes dont ce tenant est leader reçoivent des miroirs;
+            # un job interactif d'un tenant non leader est fetché avec son propre token
+            leading = {fb: tids for fb, tids in shared_accounts.items() if tids[0] == tenant_id}
+            signals = {
+                account_id: load_account_signals(accounts[account_id].tenant_id, accounts[account_id].fb_account_id)
+                for account_id in job_by_account
+            }
+            # Sans tâche préparée: pas de token Meta valide pour ce tenant
+            not_started_error = "No valid Meta token for this workspace. Reconnect Meta."
+            try:
+                tasks = await prepare_tenant(
+                    tenant_id, tenant_names.get(tenant_id, tenant_id), db, leading,
+                    due_account_ids=list(job_by_account), account_signals=signals
+                )
+            except Exception as e:
+                print(f"  ❌ Fatal error for tenant {tenant_id}: {e}")
+                not_started_error = f"{type(e).__name__}: {e}"
+                tasks = []
+
+            for task in tasks:
+                job = job_by_account.pop(task["account_id"])
+                queue.put(tenant_id, {**task, "job_id": job.id, "lease_token": leases[job.id]})
+
+            for account_id, job in job_by_account.items():
+                finish_job(db, job.id, leases[job.id], error=not_started_error)
+                accounts[account_id].next_refresh_at = schedule_after_error()
+                finished.append((job.id, job.tenant_id, accounts[account_id].fb_account_id, not_started_error))
+            db.commit()
+            lease_heartbeat.release(*[job.id for job in job_by_account.values()])
+            admission.release(*[job.id for job in job_by_account.values()])
+
+        for job_id, tenant_id, fb_account_id, error in finished:
+            report_finished(job_id, tenant_id, fb_account_id, error=error)
+
+        print(f"📬 {len(jobs)} job(s) réclamé(s) ({queue.pending} en file locale, {queue.running} en cours)")
+        return len(jobs)
+    finally:
+        db.close()
+
+
+def housekeeping() -> None:
+    """Bails expirés (workers morts, cron crashé) et vieille télémétrie"""
+    db = SessionLocal()
+    try:
+        requeue_expired_jobs(db)
+        cleanup_old_runs(db)
+    finally:
+        db.close()
+
+
+async def run_worker() -> int:
+    """
+    Boucle principale du worker (jusqu'à SIGTERM / SIGINT)
+
+    Returns:
+        Code de sortie du process
+    """
+    print(f"🔁 Refresh worker started at {datetime.now(timezone.utc).isoformat()}")
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    lease_heartbeat.start()
+    limiter = AdaptiveConcurrencyLimiter(initial=CRON_INITIAL_WORKERS, max_limit=MAX_CRON_WORKERS)
+    admission = MemoryAdmission(settings.MEMORY_BUDGET_MB)
+    print(f"🧠 Budget mémoire {admission.budget_mb}MB (base process {admission.idle_rss_mb}MB)")
+    controller = asyncio.create_task(adjust_concurrency_loop(limiter))
+    queue = FairWorkQueue(per_tenant_limit=CRON_MAX_WORKERS_PER_TENANT)
+
+    async def work() -> None:
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            tenant_id, task = entry
+            try:
+                result = await refresh_single_account(**task, semaphore=limiter)
+            except Exception as e:
+                result = e
+            finally:
+                queue.task_done(tenant_id)
+                admission.release(task["job_id"])
+            _summarize_results([result])
+
+    workers = [asyncio.create_task(work()) for _ in range(MAX_CRON_WORKERS)]
+    last_poll = 0.0
+    last_spool_cleanup = 0.0
+
+    try:
+        while not stop.is_set():
+            try:
+                if time.monotonic() - last_poll > WORKER_POLL_SECONDS:
+                    housekeeping()
+                    await enqueue_due_accounts()
+                    last_poll = time.monotonic()
+                await dispatch_claimed_jobs(queue, limiter, admission)
+            except Exception as e:
+                # DB indisponible, etc.: on réessaie au prochain tour
+                print(f"❌ Poll error: {type(e).__name__}: {str(e)[:200]}")
+
+            if time.monotonic() - last_spool_cleanup > WORKER_SPOOL_CLEANUP_SECONDS:
+                removed = cleanup_spool()
+                if removed:
+                    print(f"🧹 {removed} spool(s) de refresh obsolète(s) supprimé(s)")
+                last_spool_cleanup = time.monotonic()
+
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=WORKER_CLAIM_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        # 🛑 Arrêt propre: jobs non démarrés rendus à la file, les refresh en cours finissent
+        dropped = queue.drop_pending()
+        queue.close()
+        if dropped:
+            db = SessionLocal()
+            try:
+                release_jobs(db, {task["job_id"]: task["lease_token"] for _, task in dropped})
+                lease_heartbeat.release(*[task["job_id"] for _, task in dropped])
+            finally:
+                db.close()
+        print(f"🛑 Arrêt: {len(dropped)} job(s) rendu(s) à la file, {queue.running} refresh en cours...")
+        _, unfinished = await asyncio.wait(workers, timeout=WORKER_SHUTDOWN_GRACE_SECONDS)
+        for worker in unfinished:
+            worker.cancel()
+        if unfinished:
+            print(f"⚠️ {len(unfinished)} refresh interrompu(s) après {WORKER_SHUTDOWN_GRACE_SECONDS}s "
+                  f"(spool conservé, repris à l'expiration du bail)")
+        controller.cancel()
+        # Refresh interrompus: plus de heartbeat, leur bail expire et un autre worker les reprend
+        lease_heartbeat.stop()
+        await meta_client.aclose()
+        print(f"🧠 Mémoire: pic {admission.peak_reserved_mb}MB réservés, {admission.deferred} admission(s) "
+              f"différée(s), facteur d'échelle {admission.scale:.2f}")
+        print(f"✅ Refresh worker stopped at {datetime.now(timezone.utc).isoformat()}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run_worker()))
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Load test du cron refresh contre le faux serveur Graph (tests/fake_graph.py)
+
+Crée N tenants synthétiques (token + ad accounts), lance un cycle complet de
+cron_refresh.main() contre un faux Graph local, puis affiche:
+- temps total du cycle
+- appels Graph par type et par ad account
+- pic de RSS du process
+- stats du pool HTTP, du cache metadata et du throttling
+
+⚠️ Utiliser une base JETABLE: le cron refresh TOUS les tenants de la base.
+Le script refuse de tourner si la base contient d'autres tenants (sauf --force).
+
+Usage:
+    DATABASE_URL=postgresql+psycopg://localhost/ct_loadtest?sslmode=disable \\
+    TOKEN_ENCRYPTION_KEY=... \\
+    python scripts/load_test_cron.py --tenants 20 --accounts 3 --ads 40 --latency 0.05
+
+    # 2 cycles: BASELINE puis TAIL
+    python scripts/load_test_cron.py --tenants 10 --runs 2 --fault-rate 0.02 --usage 60
+"""
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(API_DIR))
+
+from tests.fake_graph import FakeGraphServer, make_insight_rows  # noqa: E402
+
+TENANT_PREFIX = "loadtest-"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test du cron refresh (faux Graph local)")
+    parser.add_argument("--tenants", type=int, default=10, help="Nombre de tenants synthétiques")
+    parser.add_argument("--accounts", type=int, default=2, help="Ad accounts par tenant")
+    parser.add_argument("--ads", type=int, default=30, help="Ads par ad account")
+    parser.add_argument("--days", type=int, default=90, help="Jours d'historique servis par le faux Graph")
+    parser.add_argument("--shared", type=float, default=0.0,
+                        help="Part des ad accounts partagés avec le tenant suivant (0-1)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latence par requête (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Jitter de latence (s)")
+    parser.add_argument("--fault-rate", type=float, default=0.0, help="Probabilité d'erreur 429/5xx par requête")
+    parser.add_argument("--usage", type=float, default=0.0, help="Usage BUC renvoyé par défaut (%%)")
+    parser.add_argument("--fixture", type=str, default=None, help="Fixture JSON à charger en plus")
+    parser.add_argument("--runs", type=int, default=1, help="Nombre de cycles (le 2e+ est en mode TAIL)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="Ne pas supprimer les tenants créés")
+    parser.add_argument("--force", action="store_true", help="Tourner même si la base contient d'autres tenants")
+    return parser.parse_args()
+
+
+def seed_tenants(db, models, graph: FakeGraphServer, args: argparse.Namespace) -> list:
+    """Crée les tenants / tokens / ad accounts et remplit le faux Graph"""
+    from cryptography.fernet import Fernet
+    from app.config import settings
+
+    fernet = Fernet(settings.TOKEN_ENCRYPTION_KEY.encode())
+    expires_at = datetime.now(timezone.utc) + timedelta(days=60)
+    tenants = []
+
+    for t in range(args.tenants):
+        tenant = models.Tenant(name=f"{TENANT_PREFIX}{t}", meta_user_id=f"{TENANT_PREFIX}{t}")
+        db.add(tenant)
+        db.flush()
+        db.add(models.OAuthToken(
+            tenant_id=tenant.id,
+            provider="meta",
+            fb_user_id=f"{TENANT_PREFIX}{t}",
+            access_token=fernet.encrypt(f"token_{t}".encode()),
+            expires_at=expires_at,
+            scopes=["ads_read"],
+        ))
+
+        fb_ids = [f"act_9{t:04d}{a:03d}" for a in range(args.accounts)]
+        # Comptes partagés: le tenant t connecte aussi une partie des comptes du tenant t-1
+        shared_count = int(args.accounts * args.shared)
+        if t > 0 and shared_count:
+            fb_ids += [f"act_9{t - 1:04d}{a:03d}" for a in range(shared_count)]
+
+        for fb_id in fb_ids:
+            db.add(models.AdAccount(tenant_id=tenant.id, fb_account_id=fb_id, name=fb_id, currency="EUR"))
+            if fb_id not in graph.accounts:
+                graph.accounts[fb_id] = make_insight_rows(fb_id, ads=args.ads, days=args.days)
+        tenants.append(tenant)
+
+    db.commit()
+    return tenants
+
+
+def cleanup(db, models) -> None:
+    tenants = db.query(models.Tenant).filter(models.Tenant.name.like(f"{TENANT_PREFIX}%")).all()
+    for tenant in tenants:
+        db.delete(tenant)
+    db.commit()
+    print(f"🧹 {len(tenants)} tenants de test supprimés")
+
+
+def print_report(run: int, wall: float, graph: FakeGraphServer, meta_client, accounts_count: int) -> None:
+    per_account = list(graph.calls_by_account.values()) or [0]
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KiB
+
+    print(f"\n{'=' * 60}")
+    print(f"📊 Cycle {run}: {wall:.1f}s pour {accounts_count} ad accounts")
+    print(f"{'=' * 60}")
+    print(f"  🌐 Appels Graph: {sum(graph.calls.values())} "
+          f"({', '.join(f'{k}={v}' for k, v in graph.calls.most_common())})")
+    print(f"  📈 Appels par compte: moyenne {statistics.mean(per_account):.1f}, "
+          f"médiane {statistics.median(per_account):.0f}, max {max(per_account)}")
+    print(f"  🧠 Pic RSS: {peak_rss_mb:.0f} MB")
+    print(f"  🔌 Pool HTTP: {meta_client.get_pool_stats()}")
+    print(f"  🗂️ Cache metadata: {meta_client.get_cache_stats()}")
+    monitor = meta_client.rate_monitor
+    print(f"  ⏸️ Throttling: {monitor.throttle_events} erreur(s), "
+          f"{monitor.throttle_sleep_seconds:.1f}s de pause cumulée")
+
+
+async def run(args: argparse.Namespace) -> int:
+    graph = FakeGraphServer(seed=args.seed).start()
+    graph.latency_seconds = args.latency
+    graph.latency_jitter_seconds = args.jitter
+    graph.fault_rate = args.fault_rate
+    graph.default_usage = args.usage
+    if args.fixture:
+        graph.load_fixture(args.fixture)
+
+    data_root = tempfile.mkdtemp(prefix="ct_loadtest_")
+    # Avant tout import de app.*: meta_client lit META_GRAPH_URL à l'init
+    os.environ["META_GRAPH_URL"] = graph.root_url
+    os.environ["STORAGE_MODE"] = "local"
+    os.environ["LOCAL_DATA_ROOT"] = data_root
+
+    from app import models
+    from app.database import SessionLocal
+    from app.services.meta_client import meta_client
+    import cron_refresh
+
+    db = SessionLocal()
+    try:
+        others = db.query(models.Tenant).filter(~models.Tenant.name.like(f"{TENANT_PREFIX}%")).count()
+        if others and not args.force:
+            print(f"❌ La base contient {others} autre(s) tenant(s): utiliser une base jetable (ou --force)")
+            return 1
+
+        cleanup(db, models)
+        seed_tenants(db, models, graph, args)
+        accounts_count = db.query(models.AdAccount).join(models.Tenant).filter(
+            models.Tenant.name.like(f"{TENANT_PREFIX}%")
+        ).count()
+        print(f"🧪 {args.tenants} tenants, {accounts_count} ad accounts, {args.ads} ads, "
+              f"{args.days}j servis par {graph.base_url}")
+
+        for run_index in range(1, args.runs + 1):
+            if run_index > 1:
+                # Rendre les comptes "dus" à nouveau → cycle TAIL
+                stale = datetime.now(timezone.utc) - timedelta(hours=3)
+                db.query(models.AdAccount).update({models.AdAccount.last_refresh_at: stale})
+                db.commit()
+
+            graph.calls.clear()
+            graph.calls_by_account.clear()
+            started = time.perf_counter()
+            try:
+                await cron_refresh.main()
+            except SystemExit as e:
+                print(f"⚠️ cron_refresh.main() a quitté avec le code {e.code}")
+            print_report(run_index, time.perf_counter() - started, graph, meta_client, accounts_count)
+
+        return 0
+    finally:
+        if not args.keep:
+            cleanup(db, models)
+        db.close()
+        graph.stop()
+        shutil.rmtree(data_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run(parse_args())))
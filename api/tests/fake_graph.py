@@ -0,0 +1,538 @@
+"""
+Faux serveur Meta Graph API pour les tests et les benchmarks (stdlib uniquement)
+
+Tourne dans un thread sur 127.0.0.1 et sert:
+- GET  /{version}/{act_id}/insights           (synchrone, paginé par curseur; breakdowns=age,gender → demographics)
+- POST /{version}/{act_id}/insights           (création d'un rapport asynchrone)
+- GET  /{version}/{report_run_id}             (statut du rapport)
+- GET  /{version}/{report_run_id}/insights    (résultat paginé)
+- GET  /{version}/{act_id}/campaigns          (campaigns déduites des insights)
+- POST /{version}/                            (API Batch: creatives des ads, insights de petits comptes)
+- GET  /{version}/me, /me/adaccounts, /debug_token
+- GET  /{version}/oauth/access_token          (échange de token)
+
+Simulation réaliste:
+- Headers X-Business-Use-Case-Usage / X-FB-Ads-Insights-Throttle / X-App-Usage (usage configurable)
+- Latence configurable (+ jitter)
+- Injection d'erreurs: ciblées (inject_fault) ou aléatoires (fault_rate, reproductible via seed)
+- Erreur "reduce the amount of data" au-delà de reduce_data_over_rows
+
+Usage:
+    with FakeGraphServer() as graph:
+        graph.accounts["act_1"] = make_insight_rows("act_1", ads=10, days=3)
+        meta_client.base_url = graph.base_url
+
+Fixtures enregistrées: graph.load_fixture("tests/fixtures/graph_small.json")
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import parse_qs, urlencode, urlparse
+
+DEMOGRAPHIC_AGES = ["18-24", "25-34", "35-44", "45-54", "55-64", "65+"]
+DEMOGRAPHIC_GENDERS = ["female", "male", "unknown"]
+
+
+def make_insight_rows(act_id: str, ads: int, days: int, until: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Génère des rows daily synthétiques (1 row par ad et par jour)"""
+    until = until or date.today() - timedelta(days=1)
+    rows = []
+    for d in range(days):
+        day = (until - timedelta(days=d)).isoformat()
+        for i in range(ads):
+            rows.append({
+                "ad_id": f"{act_id}_ad{i}",
+                "ad_name": f"Ad {i}",
+                "campaign_id": f"{act_id}_c{i % 3}",
+                "campaign_name": f"Campaign {i % 3}",
+                "adset_id": f"{act_id}_as{i % 5}",
+                "adset_name": f"Adset {i % 5}",
+                "impressions": str(1000 + i),
+                "clicks": str(10 + i),
+                "spend": f"{5 + i * 0.5:.2f}",
+                "date_start": day,
+                "date_stop": day,
+            })
+    return rows
+
+
+def make_demographic_rows(act_id: str, days: int = 1, until: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Génère des rows age/gender synthétiques (1 row par segment et par jour)"""
+    until = until or date.today() - timedelta(days=1)
+    seed = sum(ord(c) for c in act_id)
+    rows = []
+    for d in range(days):
+        day = (until - timedelta(days=d)).isoformat()
+        for a, age in enumerate(DEMOGRAPHIC_AGES):
+            for g, gender in enumerate(DEMOGRAPHIC_GENDERS):
+                weight = (seed + a * 7 + g * 3) % 11 + 1
+                rows.append({
+                    "age": age,
+                    "gender": gender,
+                    "impressions": str(weight * 100),
+                    "clicks": str(weight * 2),
+                    "spend": f"{weight * 1.5:.2f}",
+                    "actions": [{"action_type": "purchase", "value": str(weight % 3)}],
+                    "action_values": [{"action_type": "purchase", "value": f"{weight * 10:.2f}"}],
+                    "date_start": day,
+                    "date_stop": day,
+                })
+    return rows
+
+
+def make_creative(ad_id: str) -> Dict[str, Any]:
+    """Creative synthétique déterministe (alterne vidéo / image)"""
+    if sum(ord(c) for c in ad_id) % 2:
+        creative = {"status": "ACTIVE", "video_id": f"v_{ad_id}"}
+    else:
+        creative = {"status": "ACTIVE", "image_url": f"https://cdn.example.com/{ad_id}.jpg"}
+    return {
+        "id": ad_id,
+        "status": "ACTIVE",
+        "effective_status": "ACTIVE",
+        "created_time": "2025-01-01T00:00:00+0000",
+        "creative": creative,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"  # Keep-alive comme Graph (réutilisation des connexions)
+
+    def log_message(self, format, *args):  # Silence stderr
+        pass
+
+    def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _params(self) -> Dict[str, str]:
+        query = parse_qs(urlparse(self.path).query)
+        return {k: v[0] for k, v in query.items()}
+
+    def _route(self) -> List[str]:
+        # /v23.0/act_1/insights → ["act_1", "insights"]
+        return [p for p in urlparse(self.path).path.split("/") if p][1:]
+
+    def do_GET(self):
+        self.server.fake.handle(self, "GET", self._route(), self._params())
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        params = self._params()
+        if body.startswith("{"):
+            params.update({k: v if isinstance(v, str) else json.dumps(v) for k, v in json.loads(body).items()})
+        else:
+            params.update({k: v[0] for k, v in parse_qs(body).items()})
+        self.server.fake.handle(self, "POST", self._route(), params)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: "FakeGraphServer"
+
+
+class FakeGraphServer:
+    """
+    Faux Graph API configurable
+
+    Attributes:
+        accounts: act_id -> rows daily servies par /insights
+        demographics: act_id -> rows age/gender (défaut: synthétiques, 1 jour)
+        creatives: ad_id -> réponse Graph de l'ad (défaut: make_creative)
+        ad_accounts: Comptes renvoyés par /me/adaccounts (défaut: tous les `accounts`)
+        reduce_data_over_rows: Si défini, un /insights synchrone couvrant plus de
+            rows renvoie l'erreur Graph code 1 ("reduce the amount of data")
+        reduce_data_over_limit: Idem pour une page demandée (`limit`) plus grande
+        async_polls_before_complete: Nombre de polls "Job Running" avant "Job Completed"
+        usage: act_id -> % d'usage BUC renvoyé dans les headers (défaut: default_usage)
+        default_usage: % d'usage BUC des comptes absents de `usage`
+        regain_minutes: act_id -> estimated_time_to_regain_access (minutes)
+        app_usage: % d'usage app (X-App-Usage), None = header absent
+        latency_seconds / latency_jitter_seconds: Temps de réponse simulé
+        fault_rate: Probabilité d'une erreur aléatoire (parmi fault_statuses) par requête
+        calls: Compteur des appels par type ("insights", "async_create", "batch", "me", ...)
+        calls_by_account: Compteur des appels par ad account
+    """
+
+    def __init__(self, api_version: str = "v23.0", seed: int = 0):
+        self.api_version = api_version
+        self.accounts: Dict[str, List[Dict[str, Any]]] = {}
+        self.demographics: Dict[str, List[Dict[str, Any]]] = {}
+        self.creatives: Dict[str, Dict[str, Any]] = {}
+        self.ad_accounts: Optional[List[Dict[str, Any]]] = None
+        self.reduce_data_over_rows: Optional[int] = None
+        self.reduce_data_over_limit: Optional[int] = None
+        self.async_polls_before_complete = 2
+        self.usage: Dict[str, float] = {}
+        self.default_usage: float = 0.0
+        self.regain_minutes: Dict[str, int] = {}
+        self.app_usage: Optional[float] = None
+        self.latency_seconds = 0.0
+        self.latency_jitter_seconds = 0.0
+        self.fault_rate = 0.0
+        self.fault_statuses = (500, 503, 429)
+        self.calls: Counter = Counter()
+        self.calls_by_account: Counter = Counter()
+        self._faults: List[Dict[str, Any]] = []
+        self._rng = random.Random(seed)
+        self._reports: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._httpd: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/{self.api_version}"
+
+    @property
+    def root_url(self) -> str:
+        """URL sans version (équivalent de settings.META_GRAPH_URL)"""
+        return self.base_url.rsplit("/", 1)[0]
+
+    def start(self) -> "FakeGraphServer":
+        self._httpd = _Server(("127.0.0.1", 0), _Handler)
+        self._httpd.fake = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def __enter__(self) -> "FakeGraphServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Configuration
+    # ------------------------------------------------------------------
+
+    def inject_fault(
+        self,
+        status: int,
+        code: Optional[int] = None,
+        kind: Optional[str] = None,
+        account_id: Optional[str] = None,
+        times: int = 1,
+        message: str = "Injected fault",
+        skip: int = 0,
+    ) -> None:
+        """
+        Fait échouer les `times` prochaines requêtes correspondantes
+
+        Args:
+            status: Code HTTP (429, 500, 400, ...)
+            code: Code d'erreur Graph (17, 80004, 190, ...)
+            kind: Type d'appel ciblé ("insights", "batch", "me", ...), None = tous
+            account_id: Ad account ciblé, None = tous
+            skip: Nombre de requêtes correspondantes servies normalement avant la panne
+        """
+        with self._lock:
+            self._faults.append({
+                "status": status, "code": code, "kind": kind,
+                "account_id": account_id, "times": times, "message": message, "skip": skip,
+            })
+
+    def load_fixture(self, path: Union[str, Path]) -> None:
+        """
+        Charge un enregistrement JSON: {"accounts", "demographics", "creatives", "ad_accounts"}
+
+        Les réponses réelles peuvent être enregistrées via save_fixture après
+        avoir rempli les attributs (tokens à retirer avant commit).
+        """
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        self.accounts.update(data.get("accounts", {}))
+        self.demographics.update(data.get("demographics", {}))
+        self.creatives.update(data.get("creatives", {}))
+        if "ad_accounts" in data:
+            self.ad_accounts = data["ad_accounts"]
+
+    def save_fixture(self, path: Union[str, Path]) -> None:
+        """Sauvegarde l'état courant au format de load_fixture"""
+        data = {
+            "accounts": self.accounts,
+            "demographics": self.demographics,
+            "creatives": self.creatives,
+        }
+        if self.ad_accounts is not None:
+            data["ad_accounts"] = self.ad_accounts
+        Path(path).write_text(json.dumps(data, indent=1), encoding="utf-8")
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+
+    def handle(self, req: _Handler, method: str, route: List[str], params: Dict[str, str]) -> None:
+        kind = self._kind(method, route, params)
+        account_id = route[0] if route and route[0].startswith("act_") else None
+        self._count(kind, account_id)
+
+        if self.latency_seconds or self.latency_jitter_seconds:
+            time.sleep(self.latency_seconds + self._rng.random() * self.latency_jitter_seconds)
+
+        headers = self._usage_headers(account_id)
+        fault = self._take_fault(kind, account_id)
+        if fault:
+            return req._send(fault["status"], {"error": {
+                "message": fault["message"],
+                "type": "OAuthException",
+                "code": fault["code"] or (4 if fault["status"] == 429 else 2),
+            }}, headers)
+
+        handler = getattr(self, f"_handle_{kind}", None)
+        if handler is None:
+            return req._send(404, {"error": {"message": f"Unknown path {route}", "code": 803}})
+        handler(req, route, params, headers)
+
+    def _kind(self, method: str, route: List[str], params: Dict[str, str]) -> str:
+        if not route:
+            return "batch" if method == "POST" else "unknown"
+        if route[0] in self._reports:
+            return "async_result" if len(route) == 2 else "async_status"
+        if route == ["me"]:
+            return "me"
+        if route == ["me", "adaccounts"]:
+            return "adaccounts"
+        if route == ["debug_token"]:
+            return "debug_token"
+        if route == ["oauth", "access_token"]:
+            return "token_exchange"
+        if len(route) == 2 and route[1] == "campaigns":
+            return "campaigns"
+        if len(route) == 2 and route[1] == "insights":
+            if method == "POST":
+                return "async_create"
+            return "demographics" if params.get("breakdowns") else "insights"
+        return "unknown"
+
+    def _handle_insights(self, req, route, params, headers) -> None:
+        rows = self._filter_rows(self.accounts.get(route[0], []), params)
+        too_many_rows = self.reduce_data_over_rows is not None and len(rows) > self.reduce_data_over_rows
+        page_too_big = self.reduce_data_over_limit is not None and int(params.get("limit", 25)) > self.reduce_data_over_limit
+        if too_many_rows or page_too_big:
+            return req._send(400, {"error": {
+                "message": "Please reduce the amount of data you're asking for, then retry your request",
+                "type": "OAuthException",
+                "code": 1,
+            }}, headers)
+        self._send_page(req, route, params, rows, headers)
+
+    def _handle_async_create(self, req, route, params, headers) -> None:
+        rows = self._filter_rows(self.accounts.get(route[0], []), params)
+        with self._lock:
+            report_id = f"rr_{len(self._reports) + 1}"
+            self._reports[report_id] = {"rows": rows, "polls": 0}
+        req._send(200, {"report_run_id": report_id}, headers)
+
+    def _handle_async_status(self, req, route, params, headers) -> None:
+        report = self._reports[route[0]]
+        with self._lock:
+            report["polls"] += 1
+            done = report["polls"] > self.async_polls_before_complete
+        req._send(200, {
+            "id": route[0],
+            "async_status": "Job Completed" if done else "Job Running",
+            "async_percent_completion": 100 if done else 50,
+        }, headers)
+
+    def _handle_async_result(self, req, route, params, headers) -> None:
+        self._send_page(req, route, params, self._reports[route[0]]["rows"], headers)
+
+    def _handle_demographics(self, req, route, params, headers) -> None:
+        if route[0] not in self.demographics:
+            self.demographics[route[0]] = make_demographic_rows(route[0])
+        rows = self._filter_rows(self.demographics[route[0]], params)
+        if params.get("time_increment") != "1":
+            rows = self._aggregate_demographics(rows)
+        self._send_page(req, route, params, rows, headers)
+
+    def _handle_campaigns(self, req, route, params, headers) -> None:
+        campaigns = {}
+        for row in self.accounts.get(route[0], []):
+            campaigns.setdefault(row["campaign_id"], {
+                "id": row["campaign_id"], "name": row["campaign_name"], "status": "ACTIVE"
+            })
+        self._send_page(req, route, params, list(campaigns.values()), headers)
+
+    def _handle_batch(self, req, route, params, headers) -> None:
+        results = []
+        for item in json.loads(params.get("batch", "[]")):
+            path, _, query = item["relative_url"].partition("?")
+            item_route = [p for p in path.split("/") if p]
+            item_params = {k: v[0] for k, v in parse_qs(query).items()}
+
+            if len(item_route) == 2 and item_route[1] == "insights":
+                # Insights d'un compte dans un batch (petits comptes)
+                act_id = item_route[0]
+                self._count("batch_insights", act_id)
+                item_headers = [{"name": k, "value": v} for k, v in self._usage_headers(act_id).items()]
+                rows = self._filter_rows(self.accounts.get(act_id, []), item_params)
+                fault = self._take_fault("batch_insights", act_id)
+                if fault:
+                    results.append({"code": fault["status"], "headers": item_headers, "body": json.dumps(
+                        {"error": {"message": fault["message"], "code": fault["code"] or 2}}
+                    )})
+                    continue
+                payload = self._page_payload(item_route, item_params, rows)
+                results.append({"code": 200, "headers": item_headers, "body": json.dumps(payload)})
+                continue
+
+            self._count("batch_item", None)
+            body = self.creatives.get(item_route[0]) or make_creative(item_route[0])
+            results.append({"code": 200, "headers": [], "body": json.dumps(body)})
+        req._send(200, results, headers)
+
+    def _handle_me(self, req, route, params, headers) -> None:
+        token = params.get("access_token", "")
+        req._send(200, {"id": f"user_{abs(hash(token)) % 10**8}", "name": "Load Test", "email": None}, headers)
+
+    def _handle_adaccounts(self, req, route, params, headers) -> None:
+        accounts = self.ad_accounts
+        if accounts is None:
+            accounts = [{
+                "id": act_id, "name": act_id, "currency": "EUR",
+                "timezone_name": "Europe/Paris", "account_status": 1,
+            } for act_id in self.accounts]
+        self._send_page(req, route, params, accounts, headers)
+
+    def _handle_debug_token(self, req, route, params, headers) -> None:
+        token = params.get("input_token", "")
+        req._send(200, {"data": {
+            "app_id": "fake_app",
+            "user_id": f"user_{abs(hash(token)) % 10**8}",
+            "is_valid": True,
+            "scopes": ["ads_read", "business_management"],
+            "expires_at": int(time.time()) + 60 * 86400,
+        }}, headers)
+
+    def _handle_token_exchange(self, req, route, params, headers) -> None:
+        token = params.get("fb_exchange_token") or params.get("code") or "fake"
+        req._send(200, {"access_token": f"long_{token}", "token_type": "bearer", "expires_in": 5184000}, headers)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _count(self, kind: str, account_id: Optional[str]) -> None:
+        with self._lock:
+            self.calls[kind] += 1
+            if account_id:
+                self.calls_by_account[account_id] += 1
+
+    def _take_fault(self, kind: str, account_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for fault in self._faults:
+                if fault["kind"] not in (None, kind) or fault["account_id"] not in (None, account_id):
+                    continue
+                if fault["skip"] > 0:
+                    fault["skip"] -= 1
+                    continue
+                fault["times"] -= 1
+                if fault["times"] <= 0:
+                    self._faults.remove(fault)
+                return fault
+            if self.fault_rate and self._rng.random() < self.fault_rate:
+                status = self._rng.choice(self.fault_statuses)
+                return {
+                    "status": status,
+                    "code": 80004 if status == 429 else 2,
+                    "message": "Random injected fault",
+                }
+        return None
+
+    def _usage_headers(self, account_id: Optional[str]) -> Dict[str, str]:
+        headers = {}
+        if account_id:
+            usage = self.usage.get(account_id, self.default_usage)
+            if usage or account_id in self.regain_minutes:
+                headers["x-business-use-case-usage"] = json.dumps({account_id.replace("act_", ""): [{
+                    "type": "ads_insights",
+                    "call_count": usage,
+                    "total_time": usage,
+                    "total_cputime": usage,
+                    "estimated_time_to_regain_access": self.regain_minutes.get(account_id, 0),
+                }]})
+                headers["x-fb-ads-insights-throttle"] = json.dumps({
+                    "app_id_util_pct": self.app_usage or 0, "acc_id_util_pct": usage
+                })
+        if self.app_usage is not None:
+            headers["x-app-usage"] = json.dumps({
+                "call_count": self.app_usage, "total_time": self.app_usage, "total_cputime": self.app_usage
+            })
+        return headers
+
+    def _filter_rows(self, rows: List[Dict[str, Any]], params: Dict[str, str]) -> List[Dict[str, Any]]:
+        if "time_range" in params:
+            time_range = json.loads(params["time_range"])
+            rows = [r for r in rows if time_range["since"] <= r.get("date_start", "") <= time_range["until"]]
+        return rows
+
+    def _aggregate_demographics(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Sans time_increment, Graph renvoie un total par segment sur la période"""
+        totals: Dict[tuple, Dict[str, Any]] = {}
+        for row in rows:
+            key = (row["age"], row["gender"])
+            total = totals.setdefault(key, {
+                "age": row["age"], "gender": row["gender"],
+                "impressions": 0, "clicks": 0, "spend": 0.0,
+                "actions": {}, "action_values": {},
+            })
+            total["impressions"] += int(row["impressions"])
+            total["clicks"] += int(row["clicks"])
+            total["spend"] += float(row["spend"])
+            for field in ("actions", "action_values"):
+                for action in row.get(field, []):
+                    total[field][action["action_type"]] = (
+                        total[field].get(action["action_type"], 0.0) + float(action["value"])
+                    )
+        return [{
+            **total,
+            "impressions": str(total["impressions"]),
+            "clicks": str(total["clicks"]),
+            "spend": f"{total['spend']:.2f}",
+            "actions": [{"action_type": k, "value": str(v)} for k, v in total["actions"].items()],
+            "action_values": [{"action_type": k, "value": f"{v:.2f}"} for k, v in total["action_values"].items()],
+        } for total in totals.values()]
+
+    def _send_page(
+        self,
+        req: _Handler,
+        route: List[str],
+        params: Dict[str, str],
+        rows: List[Dict],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        req._send(200, self._page_payload(route, params, rows), headers)
+
+    def _page_payload(self, route: List[str], params: Dict[str, str], rows: List[Dict]) -> Dict[str, Any]:
+        limit = int(params.get("limit", 25))
+        offset = int(params.get("after", 0))
+        page = rows[offset:offset + limit]
+        payload: Dict[str, Any] = {"data": page, "paging": {"cursors": {"after": str(offset + limit)}}}
+        if offset + limit < len(rows):
+            next_params = {**params, "after": str(offset + limit)}
+            payload["paging"]["next"] = f"{self.base_url}/{'/'.join(route)}?{urlencode(next_params)}"
+        return payload
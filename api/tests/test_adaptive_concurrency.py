@@ -0,0 +1,70 @@
+"""
+Test: Concurrence adaptative (AIMD) et usage Meta décroissant
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services import meta_client as meta_client_module
+from app.services.meta_client import AsyncRateLimitMonitor
+from app.utils import adaptive_concurrency
+from app.utils.adaptive_concurrency import AdaptiveConcurrencyLimiter
+
+
+@pytest.mark.asyncio
+async def test_limit_is_enforced_and_resized_live():
+    limiter = AdaptiveConcurrencyLimiter(initial=2, max_limit=4)
+    active = 0
+    peak = 0
+    release = asyncio.Event()
+
+    async def worker():
+        nonlocal active, peak
+        async with limiter:
+            active += 1
+            peak = max(peak, active)
+            await release.wait()
+            active -= 1
+
+    tasks = [asyncio.create_task(worker()) for _ in range(6)]
+    await asyncio.sleep(0)
+    assert active == 2
+
+    limiter.set_limit(4)
+    await asyncio.sleep(0)
+    assert active == 4
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert peak == 4
+    assert limiter.in_use == 0
+
+
+def test_aimd_grows_when_saturated_and_halves_on_throttle(monkeypatch):
+    monkeypatch.setattr(adaptive_concurrency, "AIMD_DECREASE_COOLDOWN_SECONDS", 0)
+    limiter = AdaptiveConcurrencyLimiter(initial=4, max_limit=10)
+
+    limiter.in_use = 4  # Tous les slots occupés
+    assert limiter.observe(usage_percent=20) == 5
+    assert limiter.observe(usage_percent=70) == 5   # Zone neutre: on garde
+    assert limiter.observe(usage_percent=20, throttled=True) == 2
+    assert limiter.observe(usage_percent=95) == 1
+    assert limiter.observe(usage_percent=95) == 1   # Plancher min_limit
+
+
+def test_global_usage_decays(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(meta_client_module.time, "monotonic", lambda: clock[0])
+    monitor = AsyncRateLimitMonitor()
+    headers = httpx.Headers({"x-business-use-case-usage": json.dumps({
+        "act_1": [{"type": "ads_insights", "call_count": 90, "total_time": 10, "total_cputime": 10}]
+    })})
+    monitor.parse_headers(headers, "act_1")
+    assert monitor.global_usage == pytest.approx(90)
+    assert monitor.get_recommended_concurrency() == 2
+
+    clock[0] += 2 * meta_client_module.USAGE_HALF_LIFE_SECONDS
+    assert monitor.global_usage == pytest.approx(22.5)
+    assert monitor.get_recommended_concurrency() == 8
@@ -0,0 +1,70 @@
+"""
+Test: Fetch BASELINE par shards de dates
+
+Vérifie que:
+1. Les shards couvrent [since, until] sans trou ni chevauchement
+   (dernier shard tronqué, shard unique, fenêtre d'un jour)
+2. Les rows des shards sont fusionnées et dédupliquées sur (ad_id, date)
+   quand des shards se chevauchent
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.services import refresher
+from app.services.refresher import BASELINE_DAYS, BASELINE_SHARD_DAYS, _split_date_shards
+
+
+def test_shards_cover_window_without_overlap():
+    since = date(2026, 7, 21)
+    until = since + timedelta(days=BASELINE_DAYS - 1)
+
+    shards = _split_date_shards(since.isoformat(), until.isoformat(), BASELINE_SHARD_DAYS)
+
+    assert len(shards) == BASELINE_DAYS // BASELINE_SHARD_DAYS
+    assert shards[0][0] == since.isoformat()
+    assert shards[-1][1] == until.isoformat()
+    for (_, prev_end), (next_start, _) in zip(shards, shards[1:]):
+        assert date.fromisoformat(next_start) == date.fromisoformat(prev_end) + timedelta(days=1)
+    for start, end in shards:
+        assert (date.fromisoformat(end) - date.fromisoformat(start)).days == BASELINE_SHARD_DAYS - 1
+
+
+def test_shard_boundaries_edge_cases():
+    assert _split_date_shards("2026-10-01", "2026-10-01", 15) == [("2026-10-01", "2026-10-01")]
+    assert _split_date_shards("2026-10-01", "2026-10-15", 15) == [("2026-10-01", "2026-10-15")]
+    assert _split_date_shards("2026-10-01", "2026-10-16", 15) == [
+        ("2026-10-01", "2026-10-15"), ("2026-10-16", "2026-10-16"),
+    ]
+    assert _split_date_shards("2026-12-25", "2027-01-05", 7) == [
+        ("2026-12-25", "2026-12-31"), ("2027-01-01", "2027-01-05"),
+    ]
+    assert _split_date_shards("2026-10-02", "2026-10-01", 15) == []
+
+
+@pytest.mark.asyncio
+async def test_sharded_fetch_dedups_overlapping_rows(monkeypatch):
+    calls = []
+
+    async def fake_get_insights_daily(ad_account_id, access_token, since_date, until_date, **kwargs):
+        calls.append((since_date, until_date))
+        # Meta renvoie parfois le jour frontière dans les deux shards (fuseau du compte)
+        end = date.fromisoformat(until_date) + timedelta(days=1)
+        day = date.fromisoformat(since_date)
+        rows = []
+        while day <= end:
+            for ad in ("ad_1", "ad_2"):
+                rows.append({"ad_id": ad, "date_start": day.isoformat(), "shard": since_date})
+            day += timedelta(days=1)
+        return rows
+
+    monkeypatch.setattr(refresher.meta_client, "get_insights_daily", fake_get_insights_daily)
+
+    rows = await refresher._fetch_insights_sharded("act_1", "token", "2026-10-01", "2026-10-30")
+
+    assert calls == [("2026-10-01", "2026-10-15"), ("2026-10-16", "2026-10-30")]
+    keys = [(r["ad_id"], r["date_start"]) for r in rows]
+    assert len(keys) == len(set(keys))
+    assert len(keys) == 2 * 31  # 30 jours + le jour débordant du dernier shard
+    # Jour frontière présent dans les deux shards: une seule row conservée
+    assert sum(1 for r in rows if r["date_start"] == "2026-10-16" and r["ad_id"] == "ad_1") == 1
@@ -0,0 +1,90 @@
+"""
+Test: Circuit breaker des erreurs d'accès Meta (token / ad account)
+
+Vérifie (SQLite en mémoire) que:
+1. Un 190 ouvre le circuit du token: tous les comptes du tenant échouent sans appel
+2. Après le backoff, une seule sonde passe (half-open); un nouvel échec allonge le backoff
+3. Un succès ferme le circuit, une erreur sans rapport avec l'accès ne l'ouvre pas
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.models.graph_circuit import CircuitState
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.meta_client import MetaAPIError
+from app.services.refresher import RefreshError
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    models.Tenant.__table__.create(engine)
+    models.GraphCircuit.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def tenant(db):
+    tenant = models.Tenant(name="Agency")
+    db.add(tenant)
+    db.commit()
+    return tenant
+
+
+def _refresh_error(code=None, status_code=400):
+    try:
+        raise MetaAPIError("Meta API error", status_code=status_code, code=code)
+    except MetaAPIError as e:
+        try:
+            raise RefreshError(f"Meta API error: {e}") from e
+        except RefreshError as wrapped:
+            return wrapped
+
+
+def test_revoked_token_opens_circuit_then_single_probe(db, tenant):
+    circuit_breaker.record_failure(db, tenant.id, "act_1", _refresh_error(code=190), now=NOW)
+
+    assert circuit_breaker.load_open_circuits(db, now=NOW) == {f"token:{tenant.id}"}
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.acquire(db, tenant.id, "act_2", now=NOW + timedelta(minutes=5))
+
+    # Backoff écoulé: une sonde passe, les autres attendent son résultat
+    probe_time = NOW + timedelta(minutes=31)
+    circuit_breaker.acquire(db, tenant.id, "act_1", now=probe_time)
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.acquire(db, tenant.id, "act_2", now=probe_time)
+
+    # Sonde ratée → rouvert, backoff suivant
+    circuit = circuit_breaker.record_failure(db, tenant.id, "act_1", _refresh_error(code=190), now=probe_time)
+    assert circuit.state == CircuitState.OPEN
+    assert circuit.failures == 2
+    assert circuit.next_probe_at.replace(tzinfo=timezone.utc) == probe_time + timedelta(minutes=120)
+
+    circuit_breaker.record_success(db, tenant.id, "act_1")
+    db.commit()
+    assert circuit_breaker.load_open_circuits(db, now=probe_time) == set()
+
+
+def test_permission_error_only_blocks_that_account(db, tenant):
+    circuit_breaker.record_failure(db, tenant.id, "act_1", _refresh_error(code=200), now=NOW)
+    open_circuits = circuit_breaker.load_open_circuits(db, now=NOW)
+
+    assert circuit_breaker.is_blocked(open_circuits, tenant.id, "act_1")
+    assert not circuit_breaker.is_blocked(open_circuits, tenant.id, "act_2")
+    circuit_breaker.acquire(db, tenant.id, "act_2", now=NOW)
+
+
+def test_other_errors_do_not_open_circuit(db, tenant):
+    assert circuit_breaker.record_failure(db, tenant.id, "act_1", _refresh_error(code=17, status_code=400)) is None
+    assert circuit_breaker.record_failure(db, tenant.id, "act_1", RefreshError("Storage error")) is None
+    assert circuit_breaker.classify_error(_refresh_error(status_code=403)) == "account"
+    assert circuit_breaker.load_open_circuits(db) == set()
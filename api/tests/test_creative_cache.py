@@ -0,0 +1,77 @@
+"""
+Test: Sélection des creatives à re-fetcher (cache persistant)
+
+Vérifie que:
+1. Une ad absente du cache ou dont l'entrée a dépassé le TTL est re-fetchée
+2. Un statut transitoire (PENDING_REVIEW, ...) est toujours re-fetché
+3. Un changement de statut probable (non-ACTIVE qui diffuse, ACTIVE qui
+   diffusait et ne diffuse plus) déclenche un re-fetch
+4. Une ad ACTIVE qui n'a jamais diffusé n'est PAS re-fetchée à chaque refresh
+"""
+from datetime import datetime, timedelta, timezone
+
+from app.services.creative_cache import (
+    CREATIVE_CACHE_TTL_HOURS,
+    mark_seen,
+    select_ad_ids_to_fetch,
+)
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+FRESH = (NOW - timedelta(hours=1)).isoformat()
+
+
+def _row(ad_id, day, impressions):
+    return {"ad_id": ad_id, "date_start": day, "impressions": str(impressions)}
+
+
+def _entry(status, fetched_at=FRESH, delivering=None):
+    entry = {"effective_status": status, "fetched_at": fetched_at, "seen_at": fetched_at}
+    if delivering is not None:
+        entry["delivering"] = delivering
+    return entry
+
+
+def test_new_and_expired_ads_are_fetched():
+    expired = (NOW - timedelta(hours=CREATIVE_CACHE_TTL_HOURS, minutes=1)).isoformat()
+    ads = [_row("new", "2026-10-18", 10), _row("old", "2026-10-18", 10), _row("fresh", "2026-10-18", 10)]
+    cache = {"old": _entry("ACTIVE", fetched_at=expired), "fresh": _entry("ACTIVE", delivering=True)}
+
+    assert sorted(select_ad_ids_to_fetch(ads, cache, NOW)) == ["new", "old"]
+
+
+def test_transitional_status_is_always_fetched():
+    ads = [_row("pending", "2026-10-18", 0), _row("paused", "2026-10-18", 0)]
+    cache = {"pending": _entry("PENDING_REVIEW"), "paused": _entry("PAUSED")}
+
+    assert select_ad_ids_to_fetch(ads, cache, NOW) == ["pending"]
+
+
+def test_delivery_mismatch_refetches_only_probable_status_changes():
+    ads = [
+        _row("reactivated", "2026-10-17", 0), _row("reactivated", "2026-10-18", 50),
+        _row("stopped", "2026-10-17", 80), _row("stopped", "2026-10-18", 0),
+        _row("never_delivered", "2026-10-18", 0),
+        _row("legacy_entry", "2026-10-18", 0),
+    ]
+    cache = {
+        "reactivated": _entry("PAUSED", delivering=False),
+        "stopped": _entry("ACTIVE", delivering=True),
+        "never_delivered": _entry("ACTIVE", delivering=False),
+        "legacy_entry": _entry("ACTIVE"),  # Entrée sans le champ delivering
+    }
+
+    assert sorted(select_ad_ids_to_fetch(ads, cache, NOW)) == ["reactivated", "stopped"]
+
+
+def test_mark_seen_records_latest_day_delivery():
+    ads = [_row("a", "2026-10-17", 10), _row("a", "2026-10-18", 0), _row("b", "2026-10-18", 5)]
+    cache = {"a": _entry("ACTIVE", delivering=True), "b": _entry("ACTIVE"), "gone": _entry("ACTIVE")}
+
+    mark_seen(ads, cache, NOW)
+
+    assert cache["a"]["delivering"] is False
+    assert cache["b"]["delivering"] is True
+    assert cache["a"]["seen_at"] == NOW.isoformat()
+    assert "delivering" not in cache["gone"]
+    # Plus de diffusion enregistrée: l'ad ACTIVE sans impressions n'est plus re-fetchée
+    assert select_ad_ids_to_fetch(ads, cache, NOW) == []
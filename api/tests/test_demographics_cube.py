@@ -0,0 +1,76 @@
+"""
+Test: Cube démographique journalier (jour × âge × genre)
+
+Vérifie (faux serveur Graph) que:
+1. Sans cube, UNE requête journalière (paginée) couvre les 90 jours, et les périodes dérivées
+   sont identiques à l'ancienne agrégation par période
+2. Le refresh suivant ne refetch que les derniers jours (un appel), le cube glisse
+3. Un cube trop vieux est reconstruit entièrement
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.services.demographics_fetcher import (
+    DEMOGRAPHICS_BACKFILL_DAYS,
+    DEMOGRAPHICS_CUBE_DAYS,
+    _aggregate_segments,
+    _cube_fetch_range,
+    _cube_period_rows,
+    _extract_metrics,
+    _merge_cube,
+)
+from app.services.meta_client import MetaClient
+from tests.fake_graph import FakeGraphServer, make_demographic_rows
+
+ACT = "act_2001"
+REFERENCE = date(2026, 10, 18)
+
+
+@pytest.fixture
+def graph():
+    with FakeGraphServer() as server:
+        server.demographics[ACT] = make_demographic_rows(ACT, days=120, until=REFERENCE + timedelta(days=1))
+        yield server
+
+
+async def _fetch(graph: FakeGraphServer, since: date, until: date):
+    client = MetaClient()
+    client.base_url = graph.base_url
+    return await client.get_demographics(ACT, "token", since.isoformat(), until.isoformat(), time_increment=1)
+
+
+@pytest.mark.asyncio
+async def test_full_cube_then_tail_only(graph):
+    since, full = _cube_fetch_range(None, REFERENCE)
+    assert full and since == REFERENCE - timedelta(days=DEMOGRAPHICS_CUBE_DAYS - 1)
+
+    raw = await _fetch(graph, since, REFERENCE)
+    cube = _merge_cube(None, raw, since, REFERENCE, ACT)
+
+    full_requests = graph.calls["demographics"]  # Une requête paginée (1620 rows)
+    assert len(cube["days"]) == DEMOGRAPHICS_CUBE_DAYS
+    week = [r for r in raw if r["date_start"] >= (REFERENCE - timedelta(days=6)).isoformat()]
+    assert _aggregate_segments(_cube_period_rows(cube, 7, REFERENCE)) == \
+        _aggregate_segments([_extract_metrics(r) for r in week])
+
+    # Lendemain: seulement la marge de correction + le nouveau jour
+    next_reference = REFERENCE + timedelta(days=1)
+    since, full = _cube_fetch_range(cube, next_reference)
+    assert not full
+    assert (next_reference - since).days + 1 == DEMOGRAPHICS_BACKFILL_DAYS + 1
+
+    cube = _merge_cube(cube, await _fetch(graph, since, next_reference), since, next_reference, ACT)
+
+    assert graph.calls["demographics"] == full_requests + 1
+    assert len(cube["days"]) == DEMOGRAPHICS_CUBE_DAYS
+    assert next_reference.isoformat() in cube["days"]
+    assert (REFERENCE - timedelta(days=DEMOGRAPHICS_CUBE_DAYS - 1)).isoformat() not in cube["days"]
+
+
+def test_stale_cube_is_rebuilt():
+    cube = _merge_cube(None, [], REFERENCE, REFERENCE, ACT)
+
+    assert _cube_fetch_range(cube, REFERENCE + timedelta(days=60)) == (
+        REFERENCE + timedelta(days=60 - DEMOGRAPHICS_CUBE_DAYS + 1), True
+    )
@@ -0,0 +1,98 @@
+"""
+Test: File de travail équitable entre tenants (cron refresh)
+
+Vérifie que:
+1. Les tenants sont servis à tour de rôle (un gros tenant n'affame pas les petits)
+2. Le plafond de comptes en parallèle par tenant est respecté
+3. Un compte lent n'empêche pas les autres workers d'avancer
+4. À l'arrêt du worker, la file est vidée sans attendre les items non démarrés
+"""
+import asyncio
+
+import pytest
+
+from app.utils.fair_queue import FairWorkQueue
+
+
+async def _drain(queue: FairWorkQueue, workers: int, durations: dict) -> list:
+    started = []
+    running = {}
+    peak = {}
+
+    async def work():
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            tenant_id, item = entry
+            started.append(item)
+            running[tenant_id] = running.get(tenant_id, 0) + 1
+            peak[tenant_id] = max(peak.get(tenant_id, 0), running[tenant_id])
+            await asyncio.sleep(durations.get(item, 0.01))
+            running[tenant_id] -= 1
+            queue.task_done(tenant_id)
+
+    await asyncio.gather(*[work() for _ in range(workers)])
+    return started, peak
+
+
+@pytest.mark.asyncio
+async def test_round_robin_with_per_tenant_cap():
+    queue = FairWorkQueue(per_tenant_limit=2)
+    for i in range(8):
+        queue.put("big", f"big_{i}")
+    queue.put("small_1", "s1")
+    queue.put("small_2", "s2")
+    queue.close()
+
+    started, peak = await _drain(queue, workers=4, durations={})
+
+    assert set(started[:3]) == {"big_0", "s1", "s2"}
+    assert peak["big"] <= 2
+    assert len(started) == 10
+
+
+@pytest.mark.asyncio
+async def test_slow_account_does_not_block_other_tenants():
+    queue = FairWorkQueue(per_tenant_limit=4)
+    durations = {"a_slow": 0.3}
+    queue.put("a", "a_slow")
+    for tenant in ("b", "c", "d"):
+        for i in range(6):
+            queue.put(tenant, f"{tenant}_{i}")
+            durations[f"{tenant}_{i}"] = 0.05
+
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    queue.close()
+    started, _ = await _drain(queue, workers=4, durations=durations)
+
+    # 18 × 0.05s sur 3 workers libres ≈ 0.3s, en parallèle du compte lent (pas 0.3s + 0.9s)
+    assert loop.time() - started_at < 0.6
+    assert len(started) == 19
+
+
+@pytest.mark.asyncio
+async def test_workers_wait_for_producer():
+    queue = FairWorkQueue(per_tenant_limit=1)
+
+    async def produce():
+        await asyncio.sleep(0.05)
+        queue.put("t", "late")
+        queue.close()
+
+    (started, _), _ = await asyncio.gather(_drain(queue, workers=2, durations={}), produce())
+    assert started == ["late"]
+
+
+@pytest.mark.asyncio
+async def test_drop_pending_on_shutdown():
+    queue = FairWorkQueue(per_tenant_limit=1)
+    for i in range(5):
+        queue.put("t", f"t_{i}")
+
+    assert await queue.get() == ("t", "t_0")
+    assert queue.drop_pending() == [("t", f"t_{i}") for i in range(1, 5)]
+    queue.close()
+    queue.task_done("t")
+    assert await queue.get() is None
@@ -0,0 +1,65 @@
+"""
+Test: Taille de page insights adaptative par ad account
+
+Vérifie contre un faux serveur Graph local que:
+1. Une page refusée ("reduce the amount of data") est rejouée au même curseur, plus petite
+2. La taille apprise est retenue pour le compte (et pas pour les autres)
+3. Les pages pleines et rapides font grossir la taille, les pages lentes/lourdes la réduisent
+"""
+import pytest
+
+from app.services.meta_client import (
+    INSIGHTS_PAGE_SIZE_DEFAULT,
+    INSIGHTS_PAGE_SIZE_MAX,
+    INSIGHTS_PAGE_SIZE_MIN,
+    PAGE_MAX_BYTES,
+    MetaClient,
+    next_page_size,
+)
+from tests.fake_graph import FakeGraphServer, make_insight_rows
+
+
+@pytest.fixture
+def graph():
+    with FakeGraphServer() as server:
+        yield server
+
+
+@pytest.mark.asyncio
+async def test_refused_page_is_replayed_smaller(graph):
+    rows = make_insight_rows("act_1", ads=100, days=10)
+    graph.accounts["act_1"] = rows
+    graph.reduce_data_over_limit = 200
+    since, until = min(r["date_start"] for r in rows), max(r["date_start"] for r in rows)
+    client = MetaClient()
+    client.base_url = graph.base_url
+
+    fetched = await client.get_insights_daily("act_1", "token", since, until)
+
+    assert len(fetched) == len(rows)
+    assert graph.calls["async_create"] == 0  # Pas de bascule en rapport asynchrone
+    assert client.get_page_size("act_1") <= 200
+    assert client.get_page_size("act_2") == INSIGHTS_PAGE_SIZE_DEFAULT
+
+
+@pytest.mark.asyncio
+async def test_learned_size_is_reused(graph):
+    graph.accounts["act_1"] = make_insight_rows("act_1", ads=20, days=10)
+    client = MetaClient()
+    client.base_url = graph.base_url
+    client.set_page_size("act_1", 60)
+
+    await client.get_insights_daily("act_1", "token", "2000-01-01", "2100-01-01")
+
+    # Pages pleines et rapides: 60 → 90, puis dernière page incomplète (50 rows sur 135)
+    assert graph.calls["insights"] == 3
+    assert client.get_page_size("act_1") == 135
+
+
+def test_next_page_size_bounds():
+    assert next_page_size(500, rows=500, seconds=0.5, payload_bytes=1000) == 750
+    assert next_page_size(500, rows=120, seconds=0.5, payload_bytes=1000) == 500
+    assert next_page_size(500, rows=500, seconds=20, payload_bytes=1000) == 250
+    assert next_page_size(500, rows=500, seconds=1, payload_bytes=PAGE_MAX_BYTES + 1) == 250
+    assert next_page_size(INSIGHTS_PAGE_SIZE_MAX, 1000, 0.5, 1000) == INSIGHTS_PAGE_SIZE_MAX
+    assert next_page_size(INSIGHTS_PAGE_SIZE_MIN, 50, 30, 1000) == INSIGHTS_PAGE_SIZE_MIN
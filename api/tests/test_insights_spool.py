@@ -0,0 +1,75 @@
+"""
+Test: Spool disque des insights (reprise d'un fetch interrompu)
+
+Vérifie contre un faux serveur Graph local que:
+1. Un fetch qui échoue à la page 4 reprend à la page 4 (pas de refetch)
+2. Aucun access_token n'est écrit sur disque
+3. Les étapes terminées sont rechargées, et un spool d'une autre fenêtre est ignoré
+"""
+from uuid import uuid4
+
+import pytest
+
+from app.services import meta_client as meta_client_module
+from app.services.insights_spool import InsightsSpool
+from app.services.meta_client import MetaAPIError, MetaClient
+from tests.fake_graph import FakeGraphServer, make_insight_rows
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(meta_client_module.asyncio, "sleep", no_sleep)
+    with FakeGraphServer() as server:
+        yield server
+
+
+@pytest.mark.asyncio
+async def test_interrupted_fetch_resumes_at_cursor(graph, tmp_path):
+    rows = make_insight_rows("act_1", ads=25, days=4)
+    graph.accounts["act_1"] = rows
+    since, until = min(r["date_start"] for r in rows), max(r["date_start"] for r in rows)
+    graph.inject_fault(500, kind="insights", skip=3, times=4)  # Page 4 échoue malgré les retries
+    tenant_id = uuid4()
+    client = MetaClient()
+    client.base_url = graph.base_url
+
+    spool = InsightsSpool(tenant_id, "act_1", "TAIL", since, until, root=str(tmp_path))
+    with pytest.raises(MetaAPIError):
+        await client.get_insights_daily(
+            "act_1", "secret_token", since, until, limit=10, checkpoint=spool.checkpoint(since, until)
+        )
+    assert graph.calls["insights"] == 3 + 4
+
+    # Retry (nouveau spool, même fenêtre) → reprise à la page 4
+    graph.calls.clear()
+    spool = InsightsSpool(tenant_id, "act_1", "TAIL", since, until, root=str(tmp_path))
+    assert spool.resumed
+    fetched = await client.get_insights_daily(
+        "act_1", "secret_token", since, until, limit=10, checkpoint=spool.checkpoint(since, until)
+    )
+
+    assert graph.calls["insights"] == 7  # Pages 4 à 10
+    assert [(r["ad_id"], r["date_start"]) for r in fetched] == [(r["ad_id"], r["date_start"]) for r in rows]
+    assert not any("secret_token" in f.read_text() for f in tmp_path.rglob("*.json"))
+
+    spool.save_stage("fetched", fetched)
+    assert not list(spool.directory.glob("pages_*"))
+    spool.clear()
+    assert not spool.directory.exists()
+
+
+def test_stages_reload_only_for_same_window(tmp_path):
+    tenant_id = uuid4()
+    spool = InsightsSpool(tenant_id, "act_1", "TAIL", "2026-10-15", "2026-10-18", root=str(tmp_path))
+    spool.save_stage("enriched", [{"ad_id": "1"}])
+
+    same = InsightsSpool(tenant_id, "act_1", "TAIL", "2026-10-15", "2026-10-18", root=str(tmp_path))
+    assert same.resumed
+    assert same.load_stage("enriched") == [{"ad_id": "1"}]
+
+    other = InsightsSpool(tenant_id, "act_1", "TAIL", "2026-10-16", "2026-10-19", root=str(tmp_path))
+    assert not other.resumed
+    assert other.load_stage("enriched") is None
@@ -0,0 +1,233 @@
+"""
+Test: File de jobs de refresh (refresh_jobs)
+
+Vérifie (SQLite en mémoire) que:
+1. L'enqueue est idempotent (un job actif par compte), un clic user remonte la priorité
+2. Les jobs interactifs sont réclamés avant les jobs planifiés
+3. Un bail expiré remet le job en file, puis l'abandonne après MAX_JOB_ATTEMPTS
+4. Les jobs réclamés mais pas démarrés retournent en file à l'arrêt du worker
+5. Le heartbeat prolonge les bails; sans heartbeat le slot se libère dès
+   l'expiration du bail, et un bail repris ailleurs est signalé perdu
+   (callback on_lost: annulation du refresh)
+6. Position et ETA: simulation des slots dans l'ordre de claim
+7. Un claim dont le bail a expiré ne peut plus renouveler, rendre ni terminer
+   le job une fois réclamé par un autre worker (lease_token)
+8. POST /refresh-tenant-accounts garde les champs de l'ancienne réponse
+   (jobs_launched, available_slots, system_busy) à côté de position / ETA
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.database import get_db
+from app.dependencies.auth import get_current_tenant_id
+from app.models import JobStatus
+from app.routers import accounts as accounts_router
+from app.services import job_queue
+from app.services.job_queue import (
+    JOB_LEASE_SECONDS,
+    JOB_PRIORITY_INTERACTIVE,
+    JOB_PRIORITY_SCHEDULED,
+    MAX_JOB_ATTEMPTS,
+    LeaseHeartbeat,
+)
+from app.utils import job_limiter
+from app.utils.job_limiter import get_running_job_count
+
+
+@pytest.fixture
+def db():
+    # StaticPool: même base en mémoire pour le thread du heartbeat
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    for model in (models.Tenant, models.AdAccount, models.RefreshJob, models.RefreshRun, models.GraphCircuit):
+        model.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def accounts(db):
+    tenant = models.Tenant(name="Agency")
+    db.add(tenant)
+    db.commit()
+    rows = [models.AdAccount(tenant_id=tenant.id, fb_account_id=f"act_{i}") for i in range(3)]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def test_enqueue_is_idempotent_and_bumps_priority(db, accounts):
+    account = accounts[0]
+    job, created = job_queue.enqueue_job(db, account.tenant_id, account.id, JOB_PRIORITY_SCHEDULED)
+    again, created_again = job_queue.enqueue_job(
+        db, account.tenant_id, account.id, JOB_PRIORITY_INTERACTIVE, source="api"
+    )
+
+    assert created and not created_again
+    assert again.id == job.id
+    assert again.priority == JOB_PRIORITY_INTERACTIVE
+    assert job_queue.start_job(db, account.tenant_id, account.id) is None
+
+
+def test_interactive_jobs_claimed_first(db, accounts):
+    scheduled = [
+        job_queue.enqueue_job(db, account.tenant_id, account.id, JOB_PRIORITY_SCHEDULED)[0]
+        for account in accounts[:2]
+    ]
+    interactive, _ = job_queue.enqueue_job(
+        db, accounts[2].tenant_id, accounts[2].id, JOB_PRIORITY_INTERACTIVE, source="api"
+    )
+
+    claimed = job_queue.claim_jobs(db, limit=2)
+
+    assert [job.id for job in claimed] == [interactive.id, scheduled[0].id]
+    assert all(job.status == JobStatus.RUNNING and job.lease_expires_at for job in claimed)
+    assert [job.id for job in job_queue.claim_jobs(db, limit=5)] == [scheduled[1].id]
+
+
+def test_expired_lease_requeues_then_abandons(db, accounts):
+    account = accounts[0]
+    job, _ = job_queue.enqueue_job(db, account.tenant_id, account.id)
+
+    for attempt in range(1, MAX_JOB_ATTEMPTS + 1):
+        (claimed,) = job_queue.claim_jobs(db, limit=1)
+        assert claimed.attempts == attempt
+        job_queue.requeue_expired_jobs(db, now=claimed.lease_expires_at + timedelta(seconds=1))
+        db.refresh(job)
+
+    assert job.status == JobStatus.ERROR
+    assert job_queue.claim_jobs(db, limit=1) == []
+
+
+def test_release_unstarted_jobs(db, accounts):
+    for account in accounts:
+        job_queue.enqueue_job(db, account.tenant_id, account.id)
+    claimed = job_queue.claim_jobs(db, limit=3)
+
+    assert job_queue.release_jobs(db, {job.id: job.lease_token for job in claimed[1:]}) == 2
+    again = job_queue.claim_jobs(db, limit=3)
+    assert {job.id for job in again} == {job.id for job in claimed[1:]}
+    assert all(job.attempts == 1 for job in again)
+
+
+def test_heartbeat_keeps_slot_and_expired_lease_frees_it(db, accounts):
+    for account in accounts[:2]:
+        job_queue.enqueue_job(db, account.tenant_id, account.id)
+    # Réclamés il y a 50s: bails à 10s de l'expiration
+    claimed_at = datetime.now(timezone.utc) - timedelta(seconds=JOB_LEASE_SECONDS - 10)
+    alive, crashed = job_queue.claim_jobs(db, limit=2, now=claimed_at)
+    lease = crashed.lease_expires_at
+    assert get_running_job_count(db, now=lease - timedelta(seconds=1)) == 2
+
+    heartbeat = LeaseHeartbeat(lambda: Session(bind=db.get_bind()))
+    lost = []
+    heartbeat.hold(alive.id, alive.lease_token, on_lost=lambda: lost.append(alive.id))
+    assert heartbeat.beat() == 1
+    db.refresh(alive)
+
+    # Process du 2e job mort: son slot est libre dès l'expiration, avant toute remise en file
+    after_expiry = lease + timedelta(seconds=1)
+    assert alive.lease_expires_at > after_expiry
+    assert get_running_job_count(db, now=after_expiry) == 1
+    assert job_queue.requeue_expired_jobs(db, now=after_expiry) == 1
+
+    # Heartbeat bloqué au-delà du bail: le job est repris ailleurs, le bail est perdu
+    job_queue.requeue_expired_jobs(db, now=alive.lease_expires_at + timedelta(seconds=JOB_LEASE_SECONDS))
+    assert heartbeat.beat() == 0
+    assert heartbeat.lost_leases == 1
+    assert lost == [alive.id]
+    assert heartbeat.held == {}
+
+
+def test_queue_position_and_eta(db, accounts):
+    for account in accounts:
+        job_queue.enqueue_job(db, account.tenant_id, account.id, JOB_PRIORITY_INTERACTIVE, source="api")
+    job_queue.enqueue_job(db, accounts[0].tenant_id, accounts[0].id)  # Déjà en file: pas de doublon
+    queued = job_queue.queued_jobs_in_order(db, min_priority=JOB_PRIORITY_INTERACTIVE)
+    seconds = {accounts[0].id: 10, accounts[1].id: 20, accounts[2].id: 600}
+
+    # 2 slots dont 1 occupé par un job en cours (~15s restantes supposées)
+    estimates = job_queue.estimate_queue(queued, seconds, slots=2, running=1, default_seconds=30)
+
+    assert [estimates[job.id] for job in queued] == [(1, 10), (2, 30), (3, 615)]
+
+
+def test_stale_claim_cannot_touch_reclaimed_job(db, accounts):
+    account = accounts[0]
+    job_queue.enqueue_job(db, account.tenant_id, account.id)
+    claimed_at = datetime.now(timezone.utc) - timedelta(seconds=2 * JOB_LEASE_SECONDS)
+    (stale,) = job_queue.claim_jobs(db, limit=1, now=claimed_at)
+    stale_token = stale.lease_token
+
+    # Worker gelé au-delà de son bail: le job est remis en file et réclamé ailleurs
+    job_queue.requeue_expired_jobs(db, now=stale.lease_expires_at + timedelta(seconds=1))
+    (current,) = job_queue.claim_jobs(db, limit=1)
+    current_token = current.lease_token
+    assert current.id == stale.id and current_token != stale_token
+
+    assert job_queue.renew_leases(db, {stale.id: stale_token}) == set()
+    assert job_queue.release_jobs(db, {stale.id: stale_token}) == 0
+    assert not job_queue.finish_job(db, stale.id, stale_token, error="late failure")
+    db.commit()
+    db.refresh(current)
+    assert current.status == JobStatus.RUNNING and current.error is None
+
+    assert job_queue.renew_leases(db, {current.id: current_token}) == {current.id}
+    assert job_queue.finish_job(db, current.id, current_token)
+    db.commit()
+    db.refresh(current)
+    assert current.status == JobStatus.OK and current.lease_token is None
+
+
+@pytest.mark.asyncio
+async def test_lost_lease_cancels_running_refresh(db, accounts):
+    account = accounts[0]
+    job_queue.enqueue_job(db, account.tenant_id, account.id)
+    (job,) = job_queue.claim_jobs(db, limit=1)
+    heartbeat = LeaseHeartbeat(lambda: Session(bind=db.get_bind()))
+    loop = asyncio.get_running_loop()
+
+    async def refresh():
+        await asyncio.sleep(30)
+
+    task = asyncio.create_task(refresh())
+    heartbeat.hold(job.id, job.lease_token, on_lost=lambda: loop.call_soon_threadsafe(task.cancel))
+    job_queue.requeue_expired_jobs(db, now=job.lease_expires_at + timedelta(seconds=1))
+
+    # Le heartbeat tourne dans son thread
+    assert await asyncio.to_thread(heartbeat.beat) == 0
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(task, timeout=1)
+
+
+def test_refresh_tenant_accounts_keeps_legacy_fields(db, accounts, monkeypatch):
+    app = FastAPI()
+    app.include_router(accounts_router.router, prefix="/api/accounts")
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_tenant_id] = lambda: accounts[0].tenant_id
+
+    max_slots = job_limiter.MAX_API_WORKERS
+    with TestClient(app) as client:
+        first = client.post("/api/accounts/refresh-tenant-accounts").json()
+        monkeypatch.setattr(job_limiter, "MAX_API_WORKERS", 0)
+        busy = client.post("/api/accounts/refresh-tenant-accounts").json()
+
+    assert first["status"] == "processing"
+    assert first["jobs_launched"] == first["jobs_queued"] == 3
+    assert first["accounts_queued_for_cron"] == 0
+    assert first["available_slots"] == max_slots
+    assert [job["queue_position"] for job in first["jobs"]] == [1, 2, 3]
+
+    # Saturé: ancien statut, jobs toujours présents (idempotent, rien de recréé)
+    assert busy["status"] == "system_busy" and busy["retry_in_minutes"] == 5
+    assert busy["available_slots"] == 0
+    assert busy["jobs_launched"] == 0 and busy["jobs_already_running"] == 3
+    assert {job["job_id"] for job in busy["jobs"]} == {job["job_id"] for job in first["jobs"]}
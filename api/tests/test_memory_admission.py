@@ -0,0 +1,144 @@
+"""
+Test: Admission des refresh selon la mémoire
+
+Vérifie que:
+1. Plusieurs petits comptes tiennent ensemble, un gros compte passe seul
+   (même plus gros que le budget) et bloque les suivants jusqu'à sa fin
+2. L'empreinte d'un compte suit ses observations (EWMA), modèle par rows sinon
+3. Le RSS réel corrige le facteur d'échelle (vite à la hausse, lentement à la baisse)
+4. La tête de file est vérifiée avant le claim: un job trop gros pour la
+   mémoire libre reste QUEUED (pas de claim / release à chaque tick), l'attente
+   est loguée une fois, et il est réclamé seul dès que la mémoire se libère
+"""
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import refresh_worker
+from app import models
+from app.models import JobStatus
+from app.services.job_queue import JOB_PRIORITY_INTERACTIVE, enqueue_job
+from app.utils.memory_admission import (
+    DEFAULT_JOB_MB,
+    JOB_BASE_MB,
+    MB_PER_1K_ROWS,
+    MemoryAdmission,
+    estimate_account_mb,
+    update_account_estimate,
+)
+
+
+def _account(memory_estimate_mb=None, daily_rows=None):
+    return SimpleNamespace(memory_estimate_mb=memory_estimate_mb, daily_rows=daily_rows)
+
+
+def test_small_accounts_share_budget_large_ones_run_alone():
+    admission = MemoryAdmission(budget_mb=1000, idle_rss_mb=200)
+
+    assert all(admission.try_admit(f"small_{i}", 100) for i in range(8))
+    assert not admission.try_admit("small_8", 100)
+    assert not admission.try_admit("large", 1500)
+
+    admission.release(*[f"small_{i}" for i in range(8)])
+    assert admission.try_admit("large", 1500)  # Rien d'autre réservé: passe seul
+    assert not admission.try_admit("small_9", 100)
+    assert admission.deferred == 3
+
+
+def test_account_estimate_follows_observations():
+    account = _account()
+    assert estimate_account_mb(account) == DEFAULT_JOB_MB
+
+    update_account_estimate(account, observed_mb=None, daily_rows=50_000)
+    assert estimate_account_mb(account) == JOB_BASE_MB + 50 * MB_PER_1K_ROWS
+
+    update_account_estimate(account, observed_mb=400, daily_rows=50_000)
+    update_account_estimate(account, observed_mb=200, daily_rows=50_000)
+    assert account.memory_estimate_mb == 340  # 0.3 × 200 + 0.7 × 400
+
+    update_account_estimate(account, observed_mb=0, daily_rows=50_000)  # RSS réutilisé: plancher
+    assert account.memory_estimate_mb == round(0.3 * JOB_BASE_MB + 0.7 * 340)
+
+
+def test_measured_rss_corrects_scale():
+    admission = MemoryAdmission(budget_mb=2000, idle_rss_mb=200)
+    admission.try_admit("job", 500)
+
+    # Jobs 2x plus gourmands que prévu
+    assert admission.calibrate(rss_mb=1200) > 1.1
+    raised = admission.scale
+    # Mesure basse (job qui démarre): baisse lente
+    assert raised - admission.calibrate(rss_mb=200) < 0.1
+
+    admission.release("job")
+    admission.calibrate(rss_mb=350)
+    assert admission.idle_rss_mb == 350  # Rien en cours: nouvelle base du process
+
+
+def test_admissible_count_matches_try_admit():
+    admission = MemoryAdmission(budget_mb=1000, idle_rss_mb=200)
+
+    assert admission.admissible_count([100] * 10) == 8
+    assert admission.admissible_count([1500, 100]) == 1  # Rien de réservé: le gros passe seul
+    admission.try_admit("running", 300)
+    assert admission.admissible_count([600, 100]) == 0
+    assert admission.admissible_count([500, 100]) == 1
+    assert admission.deferred == 0  # Simple lecture: rien réservé, rien compté
+
+    assert admission.wait_for("big") and not admission.wait_for("big")
+    assert admission.deferred == 1
+
+
+@pytest.fixture
+def worker_db(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    for model in (models.Tenant, models.AdAccount, models.RefreshJob):
+        model.__table__.create(engine)
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(refresh_worker, "SessionLocal", Session)
+    db = Session()
+    yield db
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_oversized_head_job_waits_without_claim(worker_db, monkeypatch, capsys):
+    tenant = models.Tenant(name="Agency")
+    worker_db.add(tenant)
+    worker_db.commit()
+    big = models.AdAccount(tenant_id=tenant.id, fb_account_id="act_big", memory_estimate_mb=900)
+    small = models.AdAccount(tenant_id=tenant.id, fb_account_id="act_small", memory_estimate_mb=100)
+    worker_db.add_all([big, small])
+    worker_db.commit()
+    big_job, _ = enqueue_job(worker_db, tenant.id, big.id, JOB_PRIORITY_INTERACTIVE, source="api")
+    enqueue_job(worker_db, tenant.id, small.id, JOB_PRIORITY_INTERACTIVE, source="api")
+
+    claims = []
+
+    def fake_claim(db, limit, now=None):
+        claims.append(limit)
+        return []
+
+    monkeypatch.setattr(refresh_worker, "claim_jobs", fake_claim)
+    admission = MemoryAdmission(budget_mb=1000, idle_rss_mb=200)
+    monkeypatch.setattr(admission, "calibrate", lambda rss_mb=None: admission.scale)
+    admission.try_admit("running", 300)
+    queue, limiter = SimpleNamespace(running=1, pending=0), SimpleNamespace(limit=5)
+
+    for _ in range(3):
+        assert await refresh_worker.dispatch_claimed_jobs(queue, limiter, admission) == 0
+
+    assert claims == []
+    worker_db.expire_all()
+    assert big_job.status == JobStatus.QUEUED and not big_job.attempts
+    assert capsys.readouterr().out.count("en attente de mémoire") == 1
+    assert admission.waiting_job_id == big_job.id and admission.deferred == 1
+
+    # Le refresh en cours se termine: le gros job est réclamé, seul
+    admission.release("running")
+    await refresh_worker.dispatch_claimed_jobs(queue, limiter, admission)
+    assert claims == [1]
+    assert admission.waiting_job_id is None
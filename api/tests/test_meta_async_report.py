@@ -0,0 +1,98 @@
+"""
+Test: Insights via rapport asynchrone Meta
+
+Vérifie contre un faux serveur Graph local que:
+1. Le mode async fait POST → poll du statut → pagination du résultat
+2. Une erreur "reduce the amount of data" en synchrone bascule en async
+3. Une erreur code 1 sans ce message (erreur transitoire générique) est réessayée
+4. Choix du rapport async: densité du baseline, sinon AdAccount.daily_rows,
+   sinon (premier BASELINE, taille inconnue) synchrone avec bascule reduce-data
+"""
+import pytest
+
+from app.services import meta_client as meta_client_module
+from app.services.meta_client import MetaAPIError, MetaClient
+from app.services.refresher import ASYNC_REPORT_MIN_ROWS, BASELINE_DAYS, _estimate_window_rows
+from tests.fake_graph import FakeGraphServer, make_insight_rows
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setattr(meta_client_module, "ASYNC_REPORT_POLL_INITIAL_DELAY", 0.01)
+    with FakeGraphServer() as server:
+        yield server
+
+
+def _client(graph: FakeGraphServer) -> MetaClient:
+    client = MetaClient()
+    client.base_url = graph.base_url
+    return client
+
+
+def _range(rows):
+    dates = sorted(r["date_start"] for r in rows)
+    return dates[0], dates[-1]
+
+
+@pytest.mark.asyncio
+async def test_async_report_polls_then_pages(graph):
+    rows = make_insight_rows("act_big", ads=120, days=3)
+    graph.accounts["act_big"] = rows
+    since, until = _range(rows)
+
+    insights = await _client(graph).get_insights_daily(
+        "act_big", "token", since, until, limit=100, use_async_report=True
+    )
+
+    assert len(insights) == len(rows)
+    assert graph.calls["async_create"] == 1
+    assert graph.calls["async_status"] == graph.async_polls_before_complete + 1
+    assert graph.calls["async_result"] == 4  # 360 rows / 100 par page
+    assert graph.calls["insights"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reduce_data_error_falls_back_to_async(graph):
+    rows = make_insight_rows("act_big", ads=50, days=2)
+    graph.accounts["act_big"] = rows
+    graph.reduce_data_over_rows = 10
+    since, until = _range(rows)
+
+    insights = await _client(graph).get_insights_daily("act_big", "token", since, until, limit=500)
+
+    assert {(r["ad_id"], r["date_start"]) for r in insights} == {
+        (r["ad_id"], r["date_start"]) for r in rows
+    }
+    assert graph.calls["async_create"] == 1
+
+
+@pytest.mark.asyncio
+async def test_generic_code_1_error_is_retried(graph):
+    rows = make_insight_rows("act_1", ads=5, days=2)
+    graph.accounts["act_1"] = rows
+    graph.inject_fault(500, code=1, kind="insights", message="An unknown error occurred")
+    since, until = _range(rows)
+
+    insights = await _client(graph).get_insights_daily("act_1", "token", since, until, limit=500)
+
+    assert len(insights) == len(rows)
+    assert graph.calls["insights"] == 2
+    assert graph.calls["async_create"] == 0
+
+
+def test_reduce_data_rule_uses_message_not_code():
+    assert MetaAPIError("(Please reduce the amount of data you're asking for)", code=1).is_reduce_data_error
+    assert not MetaAPIError("(An unknown error occurred)", code=1).is_reduce_data_error
+
+
+def test_async_report_estimate_fallbacks():
+    big_baseline = {"metadata": {"total_daily_rows": BASELINE_DAYS * 1000}}
+
+    assert _estimate_window_rows(big_baseline, 15) == 15000
+    assert _estimate_window_rows({"daily_ads": [{}] * 90}, 15) == 15
+    # Baseline absent: rows du dernier refresh réussi
+    assert _estimate_window_rows(None, 15, known_daily_rows=BASELINE_DAYS * 1000) >= ASYNC_REPORT_MIN_ROWS
+    assert _estimate_window_rows(None, 15, known_daily_rows=900) == 150
+    # Premier BASELINE d'un compte jamais refresh: inconnu (→ synchrone)
+    assert _estimate_window_rows(None, 15) is None
+    assert _estimate_window_rows(None, 15, known_daily_rows=0) is None
@@ -0,0 +1,55 @@
+"""
+Test: Insights des petits comptes via l'API Batch Graph
+
+Vérifie contre un faux serveur Graph local que:
+1. 60 comptes tiennent en 2 POST batch (50 max par batch)
+2. Seuls les comptes paginés déclenchent des appels supplémentaires
+3. Un compte en erreur est absent du résultat (fetch individuel ensuite)
+"""
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.services.meta_client import MetaClient
+from app.services.refresher import tail_window_for
+from tests.fake_graph import FakeGraphServer, make_insight_rows
+
+UNTIL = date(2026, 10, 15)
+
+
+@pytest.fixture
+def graph():
+    with FakeGraphServer() as server:
+        yield server
+
+
+@pytest.mark.asyncio
+async def test_small_accounts_share_batch_posts(graph):
+    windows = {}
+    for i in range(60):
+        act = f"act_{i}"
+        graph.accounts[act] = make_insight_rows(act, ads=2, days=4, until=UNTIL)
+        windows[act] = ("2026-10-12", "2026-10-15")
+    # Un compte "moins petit": 3 pages de 10
+    graph.accounts["act_0"] = make_insight_rows("act_0", ads=6, days=4, until=UNTIL)
+    graph.inject_fault(500, kind="batch_insights", account_id="act_7")
+
+    client = MetaClient()
+    client.base_url = graph.base_url
+    results = await client.get_insights_daily_batch(windows, "token", limit=10)
+
+    assert graph.calls["batch"] == 2
+    assert len(results) == 59
+    assert "act_7" not in results
+    assert len(results["act_0"]) == 24
+    assert graph.calls["insights"] == 2  # Pages 2 et 3 de act_0 uniquement
+    assert all(len(results[f"act_{i}"]) == 8 for i in range(1, 60) if i != 7)
+
+
+def test_tail_window_matches_refresh_mode():
+    today = date(2026, 10, 19)
+    refreshed = datetime(2026, 10, 18, 22, 0, tzinfo=timezone.utc)
+
+    assert tail_window_for(refreshed, today) == ("2026-10-14", "2026-10-18")
+    assert tail_window_for(None, today) is None
+    assert tail_window_for(refreshed - timedelta(days=60), today) is None
@@ -0,0 +1,115 @@
+"""
+Test: MetaClient contre le faux serveur Graph (fixture enregistrée + injection d'erreurs)
+
+Vérifie que:
+1. Une fixture enregistrée rejoue insights, creatives et demographics
+2. Un 429 injecté est retenté et ne bloque que le compte concerné
+3. Les headers BUC du serveur alimentent le rate monitor
+4. Les batches creatives passent par le helper de requête: compteur
+   graph_calls, retry d'un throttle, blocage du compte concerné
+5. Une erreur d'auth / permission (4xx hors throttling) n'est tentée qu'une fois
+"""
+from pathlib import Path
+
+import pytest
+
+from app.services import meta_client as meta_client_module
+from app.services.meta_client import MetaAPIError, MetaClient
+from app.utils import run_metrics
+from tests.fake_graph import FakeGraphServer
+
+FIXTURE = Path(__file__).parent / "fixtures" / "graph_small.json"
+
+
+@pytest.fixture
+def graph():
+    with FakeGraphServer() as server:
+        server.load_fixture(FIXTURE)
+        yield server
+
+
+def _client(graph: FakeGraphServer) -> MetaClient:
+    client = MetaClient()
+    client.base_url = graph.base_url
+    return client
+
+
+@pytest.mark.asyncio
+async def test_fixture_replays_insights_creatives_and_demographics(graph):
+    client = _client(graph)
+
+    insights = await client.get_insights_daily("act_1001", "token", "2026-10-13", "2026-10-15")
+    creatives = await client.fetch_creatives_batch(sorted({r["ad_id"] for r in insights}), "token")
+    demographics = await client.get_demographics("act_1001", "token", "2026-10-15", "2026-10-15")
+    accounts = await client.get_ad_accounts("token")
+
+    assert len(insights) == 12  # 4 ads × 3 jours
+    assert set(creatives) == {f"act_1001_ad{i}" for i in range(4)}
+    assert {c["format"] for c in creatives.values()} <= {"VIDEO", "IMAGE"}
+    assert len(demographics) == 18  # 6 âges × 3 genres
+    assert {a["id"] for a in accounts} == {"act_1001", "act_1002"}
+    assert graph.calls["batch_item"] == 4
+
+
+@pytest.mark.asyncio
+async def test_injected_throttle_is_retried_for_that_account_only(graph, monkeypatch):
+    monkeypatch.setattr(meta_client_module, "THROTTLE_BLOCKED_DEFAULT_SECONDS", 0.05)
+    graph.inject_fault(429, code=80004, kind="insights", account_id="act_1001")
+    client = _client(graph)
+
+    rows = await client.get_insights_daily("act_1001", "token", "2026-10-13", "2026-10-15")
+
+    assert len(rows) == 12
+    assert graph.calls_by_account["act_1001"] == 2
+    assert client.rate_monitor.throttle_events == 1
+    assert client.rate_monitor.get_throttle_delay("act_1002") == 0
+
+
+@pytest.mark.asyncio
+async def test_usage_headers_feed_rate_monitor(graph):
+    graph.usage["act_1002"] = 65
+    graph.app_usage = 30
+    client = _client(graph)
+
+    await client.get_insights_daily("act_1002", "token", "2026-10-13", "2026-10-15")
+
+    usage = client.rate_monitor.usage_by_account["act_1002"]
+    assert usage["usage_percent"] == 65
+    assert usage["app_usage_percent"] == 30
+
+
+@pytest.mark.asyncio
+async def test_creatives_batch_goes_through_request_helper(graph, monkeypatch):
+    monkeypatch.setattr(meta_client_module, "THROTTLE_BLOCKED_DEFAULT_SECONDS", 0.05)
+    graph.inject_fault(429, code=80004, kind="batch")
+    client = _client(graph)
+    ad_ids = [f"act_1001_ad{i}" for i in range(4)]
+
+    metrics, token = run_metrics.start_run()
+    try:
+        creatives = await client.fetch_creatives_batch(ad_ids, "token", "act_1001")
+    finally:
+        run_metrics.end_run(token)
+
+    assert set(creatives) == set(ad_ids)
+    assert graph.calls["batch"] == 2
+    assert metrics["graph_calls"] == 2
+    assert client.rate_monitor.throttle_events == 1
+    # Le throttle est imputé au compte des ads, pas à "global"
+    assert "act_1001" in client.rate_monitor._throttle
+    assert "global" not in client.rate_monitor._throttle
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status,code", [(400, 190), (403, 200), (400, 10)])
+async def test_auth_errors_are_not_retried(graph, status, code):
+    graph.inject_fault(status, code=code, kind="insights", account_id="act_1001", message="Invalid OAuth access token")
+    client = _client(graph)
+
+    with pytest.raises(MetaAPIError) as exc_info:
+        await client.get_insights_daily("act_1001", "token", "2026-10-13", "2026-10-15")
+
+    assert exc_info.value.code == code
+    assert exc_info.value.status_code == status
+    assert graph.calls_by_account["act_1001"] == 1
+    assert client.rate_monitor.throttle_events == 0
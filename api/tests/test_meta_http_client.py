@@ -0,0 +1,33 @@
+"""
+Test: Client HTTP partagé de MetaClient
+
+Vérifie contre un faux serveur Graph local que les pages d'insights
+réutilisent le même pool de connexions keep-alive.
+"""
+import asyncio
+
+import pytest
+
+from app.services.meta_client import MetaClient, HTTP_MAX_CONNECTIONS
+from tests.fake_graph import FakeGraphServer, make_insight_rows
+
+
+@pytest.mark.asyncio
+async def test_pages_reuse_shared_pool():
+    with FakeGraphServer() as graph:
+        graph.accounts["act_1"] = make_insight_rows("act_1", ads=10, days=3)
+        client = MetaClient()
+        client.base_url = graph.base_url
+
+        results = await asyncio.gather(*[
+            client.get_insights_daily("act_1", "token", "2000-01-01", "2100-01-01", limit=5)
+            for _ in range(4)
+        ])
+        stats = client.get_pool_stats()
+        await client.aclose()
+
+    assert all(len(rows) == 30 for rows in results)
+    assert stats["requests"] == 4 * 6  # 30 rows / 5 par page
+    assert stats["clients_created"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["open_connections"] <= min(4, HTTP_MAX_CONNECTIONS)
@@ -0,0 +1,84 @@
+"""
+Test: Single-flight et cache TTL des appels metadata Meta
+"""
+import asyncio
+
+import pytest
+
+from app.services import meta_client as meta_client_module
+from app.services.meta_client import MetaClient
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = MetaClient()
+    client.calls = []
+
+    async def fake_request(method, url, params=None, **kwargs):
+        client.calls.append((url, params.get("access_token")))
+        await asyncio.sleep(0.01)
+        return {"id": "42", "name": "Jane", "token": params.get("access_token")}
+
+    monkeypatch.setattr(client, "_request_with_retry", fake_request)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_request(client):
+    results = await asyncio.gather(*[client.get_user_info("token_a") for _ in range(5)])
+
+    assert len(client.calls) == 1
+    assert all(r == results[0] for r in results)
+    assert results[0] is not results[1]  # Copies indépendantes
+    assert client.get_cache_stats()["coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_is_keyed_by_token(client, monkeypatch):
+    await client.get_user_info("token_a")
+    await client.get_user_info("token_a")
+    await client.get_user_info("token_b")
+
+    assert [token for _, token in client.calls] == ["token_a", "token_b"]
+    assert client.get_cache_stats()["hits"] == 1
+
+    # Expiré → nouvel appel
+    monkeypatch.setattr(meta_client_module, "METADATA_CACHE_TTL_SECONDS", 0)
+    client.invalidate_metadata_cache()
+    await client.get_user_info("token_a")
+    assert len(client.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_expired_entry_is_replaced(client):
+    async def call():
+        client.calls.append(("call", None))
+        return {"n": len(client.calls)}
+
+    assert await client._single_flight("key", call, ttl_seconds=10) == {"n": 1}
+    expires_at, value = client._metadata_cache["key"]
+    client._metadata_cache["key"] = (expires_at - 10, value)  # TTL dépassé
+
+    assert await client._single_flight("key", call, ttl_seconds=10) == {"n": 2}
+    assert await client._single_flight("key", call, ttl_seconds=10) == {"n": 2}
+    assert await client._single_flight("key", call, ttl_seconds=10) == {"n": 2}
+
+    stats = client.get_cache_stats()
+    assert (stats["misses"], stats["hits"]) == (2, 2)
+    assert len(client.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached(client, monkeypatch):
+    attempts = []
+
+    async def failing_request(method, url, params=None, **kwargs):
+        attempts.append(url)
+        raise meta_client_module.MetaAPIError("boom", status_code=500)
+
+    monkeypatch.setattr(client, "_request_with_retry", failing_request)
+    for _ in range(2):
+        with pytest.raises(meta_client_module.MetaAPIError):
+            await client.get_user_info("token_a")
+
+    assert len(attempts) == 2
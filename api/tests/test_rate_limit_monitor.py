@@ -0,0 +1,72 @@
+"""
+Test: Throttling proactif par ad account
+
+Vérifie que la saturation d'un compte ne ralentit pas les autres
+et que la pause suit estimated_time_to_regain_access.
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services import meta_client as meta_client_module
+from app.services.meta_client import AsyncRateLimitMonitor, APP_THROTTLE_KEY
+
+
+def _buc_headers(account_id: str, usage: int, regain_minutes: int = 0) -> httpx.Headers:
+    return httpx.Headers({"x-business-use-case-usage": json.dumps({
+        account_id: [{
+            "type": "ads_insights",
+            "call_count": usage,
+            "total_time": usage // 2,
+            "total_cputime": usage // 2,
+            "estimated_time_to_regain_access": regain_minutes,
+        }]
+    })})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+
+    async def fake_sleep(seconds):
+        recorded.append(seconds)
+
+    monkeypatch.setattr(meta_client_module.asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+@pytest.mark.asyncio
+async def test_saturated_account_does_not_block_others(sleeps):
+    monitor = AsyncRateLimitMonitor()
+    monitor.parse_headers(_buc_headers("act_big", 100, regain_minutes=3), "act_big")
+    monitor.parse_headers(_buc_headers("act_small", 10), "act_small")
+
+    assert await monitor.check_and_throttle("act_small") is False
+    assert sleeps == []
+
+    assert await monitor.check_and_throttle("act_big") is True
+    assert 180 <= sleeps[0] <= 180 * 1.1
+
+
+@pytest.mark.asyncio
+async def test_high_usage_spaces_calls_instead_of_fixed_pause(sleeps):
+    monitor = AsyncRateLimitMonitor()
+    monitor.parse_headers(_buc_headers("act_1", 90), "act_1")
+
+    results = await asyncio.gather(*[monitor.check_and_throttle("act_1") for _ in range(3)])
+
+    # 1er appel immédiat, les suivants espacés d'un intervalle croissant (< pause fixe de 120s)
+    assert results == [False, True, True]
+    assert 0 < sleeps[0] < sleeps[1] < 60
+
+
+@pytest.mark.asyncio
+async def test_app_level_throttle_applies_to_every_account(sleeps):
+    monitor = AsyncRateLimitMonitor()
+    monitor.note_rate_limited("act_1", app_level=True)
+
+    assert APP_THROTTLE_KEY in monitor._throttle
+    assert await monitor.check_and_throttle("act_2") is True
+    assert sleeps and sleeps[0] > 0
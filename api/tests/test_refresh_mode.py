@@ -0,0 +1,55 @@
+"""
+Test: Choix du mode de refresh (BASELINE vs TAIL)
+
+Vérifie que:
+1. Sans baseline (ou sans reference_date): BASELINE de BASELINE_DAYS jours
+2. Gap de 0 ou 1 jour: TAIL couvrant le gap + TAIL_BACKFILL_DAYS
+3. Fenêtre de TAIL_MAX_DAYS jours: encore TAIL; un jour de plus: BASELINE
+4. tail_window_for (estimation sans baseline) suit les mêmes bornes
+"""
+from datetime import date, datetime, timedelta, timezone
+
+from app.services.refresher import (
+    BASELINE_DAYS,
+    TAIL_BACKFILL_DAYS,
+    TAIL_MAX_DAYS,
+    _determine_refresh_mode,
+    tail_window_for,
+)
+
+REFERENCE = "2026-10-19"
+
+
+def _baseline(age_days):
+    baseline_date = date(2026, 10, 19) - timedelta(days=age_days)
+    return {"metadata": {"reference_date": baseline_date.isoformat()}}
+
+
+def test_missing_baseline_is_full_sync():
+    assert _determine_refresh_mode(None, REFERENCE) == ("BASELINE", BASELINE_DAYS)
+    assert _determine_refresh_mode({"metadata": {}}, REFERENCE) == ("BASELINE", BASELINE_DAYS)
+    assert _determine_refresh_mode(_baseline(-1), REFERENCE) == ("BASELINE", BASELINE_DAYS)
+
+
+def test_small_gap_is_tail_with_backfill():
+    assert _determine_refresh_mode(_baseline(0), REFERENCE) == ("TAIL", TAIL_BACKFILL_DAYS)
+    assert _determine_refresh_mode(_baseline(1), REFERENCE) == ("TAIL", 1 + TAIL_BACKFILL_DAYS)
+
+
+def test_tail_max_days_boundary():
+    last_tail_gap = TAIL_MAX_DAYS - TAIL_BACKFILL_DAYS
+    assert _determine_refresh_mode(_baseline(last_tail_gap), REFERENCE) == ("TAIL", TAIL_MAX_DAYS)
+    assert _determine_refresh_mode(_baseline(last_tail_gap + 1), REFERENCE) == ("BASELINE", BASELINE_DAYS)
+
+
+def test_tail_window_estimate():
+    today = date(2026, 10, 19)
+
+    assert tail_window_for(None, today) is None
+    last_refresh = datetime(2026, 10, 18, 6, 0, tzinfo=timezone.utc)
+    # 1 jour de gap + backfill + 1 jour de marge, jusqu'à hier
+    assert tail_window_for(last_refresh, today) == (
+        (today - timedelta(days=1 + TAIL_BACKFILL_DAYS + 1)).isoformat(), "2026-10-18"
+    )
+    too_old = datetime.combine(today - timedelta(days=TAIL_MAX_DAYS), datetime.min.time(), timezone.utc)
+    assert tail_window_for(too_old, today) is None
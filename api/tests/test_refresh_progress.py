@@ -0,0 +1,133 @@
+"""
+Test: Progression des refresh en direct (SSE)
+
+Vérifie (broker en mémoire, sans LISTEN/NOTIFY quel que soit DATABASE_URL) que:
+1. Les étapes et pages publiées pendant un refresh arrivent aux abonnés du
+   tenant / du job, pas aux autres tenants; les événements "pages" sont limités
+2. Le flux SSE d'un job terminé renvoie son état final puis se ferme
+3. PostgreSQL: publish() ne bloque pas la boucle asyncio, les NOTIFY partent
+   en arrière-plan dans l'ordre de publication
+"""
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import database, models
+from app.database import get_db
+from app.dependencies.auth import get_current_tenant_id
+from app.models import JobStatus
+from app.routers import accounts
+from app.services import refresh_progress
+from app.utils import run_metrics
+
+
+@pytest.fixture
+def local_broker(monkeypatch):
+    """Livraison au broker du process, quel que soit DATABASE_URL (pas de NOTIFY / LISTEN)"""
+    monkeypatch.setattr(database, "engine", SimpleNamespace(dialect=SimpleNamespace(name="sqlite")))
+
+
+@pytest.mark.asyncio
+async def test_events_reach_matching_subscribers(local_broker):
+    tenant_id, other_tenant_id, job_id = uuid4(), uuid4(), uuid4()
+    broker = refresh_progress.broker
+    tenant_sub = broker.subscribe(tenant_id)
+    job_sub = broker.subscribe(tenant_id, job_id)
+    other_sub = broker.subscribe(other_tenant_id)
+    try:
+        metrics, metrics_token = run_metrics.start_run()
+        token = refresh_progress.bind(job_id, tenant_id, "act_1")
+        try:
+            refresh_progress.report("fetch")
+            for _ in range(5):  # Rafale de pages: au plus un événement par seconde
+                run_metrics.record("graph_pages")
+                run_metrics.record("graph_rows", 100)
+                refresh_progress.report_pages()
+            refresh_progress.report("write")
+        finally:
+            refresh_progress.unbind(token)
+            run_metrics.end_run(metrics_token)
+        refresh_progress.report_finished(job_id, tenant_id, "act_1")
+
+        events = [tenant_sub.queue.get_nowait() for _ in range(tenant_sub.queue.qsize())]
+        assert [e["stage"] for e in events] == ["fetch", "write", "done"]
+        assert events[1]["pages"] == 5 and events[1]["rows"] == 500
+        assert events[2]["percent"] == 100 and events[2]["status"] == "ok"
+        assert job_sub.queue.qsize() == 3
+        assert other_sub.queue.empty()
+    finally:
+        for subscription in (tenant_sub, job_sub, other_sub):
+            broker.unsubscribe(subscription)
+
+
+def test_finished_job_stream_sends_final_state_and_closes(local_broker):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    for model in (models.Tenant, models.AdAccount, models.RefreshJob):
+        model.__table__.create(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    tenant = models.Tenant(name="Agency")
+    db.add(tenant)
+    db.commit()
+    account = models.AdAccount(tenant_id=tenant.id, fb_account_id="act_9")
+    db.add(account)
+    db.commit()
+    job = models.RefreshJob(tenant_id=tenant.id, ad_account_id=account.id, status=JobStatus.ERROR, error="Token expired")
+    db.add(job)
+    db.commit()
+    tenant_id, job_id = tenant.id, job.id
+    db.close()
+
+    app = FastAPI()
+    app.include_router(accounts.router, prefix="/api/accounts")
+    app.dependency_overrides[get_db] = lambda: Session()
+    app.dependency_overrides[get_current_tenant_id] = lambda: tenant_id
+
+    with TestClient(app) as client:
+        response = client.get("/api/accounts/refresh/events", params={"job_id": str(job_id)})
+        assert response.headers["content-type"].startswith("text/event-stream")
+        (message,) = [m for m in response.text.split("\n\n") if m]
+        event = json.loads(message.split("data: ", 1)[1])
+        assert event["stage"] == "done" and event["status"] == "error"
+        assert event["account_id"] == "act_9" and "tenant_id" not in event
+
+        assert client.get("/api/accounts/refresh/events", params={"job_id": str(uuid4())}).status_code == 404
+    assert refresh_progress.broker.subscriber_count == 0
+
+
+@pytest.mark.asyncio
+async def test_postgres_publish_does_not_block_event_loop(monkeypatch):
+    sent = []
+
+    def slow_notify(event):
+        time.sleep(0.1)  # Connexion du pool + pg_notify
+        sent.append((event["stage"], threading.current_thread() is threading.main_thread()))
+
+    monkeypatch.setattr(database, "engine", SimpleNamespace(dialect=SimpleNamespace(name="postgresql")))
+    monkeypatch.setattr(refresh_progress, "_notify", slow_notify)
+
+    started = time.monotonic()
+    for stage in ("fetch", "write", "done"):
+        refresh_progress.publish({"stage": stage})
+    assert time.monotonic() - started < 0.05
+    assert sent == []
+
+    for _ in range(100):
+        if len(sent) == 3:
+            break
+        await asyncio.sleep(0.02)
+    assert sent == [("fetch", False), ("write", False), ("done", False)]
+
+    # Hors boucle asyncio: NOTIFY direct
+    await asyncio.to_thread(refresh_progress.publish, {"stage": "started"})
+    assert sent[-1] == ("started", False)
@@ -0,0 +1,123 @@
+"""
+Test: Scheduler de priorité des refresh
+
+Vérifie que:
+1. Le score suit la formule staleness × spend × ads actives × consultation
+2. Un compte idle (0 spend, 0 ad active, non consulté) passe à la cadence 24h,
+   un compte jamais refresh passe en premier
+3. L'échéance suivante reste dans cadence ± NEXT_REFRESH_JITTER
+4. Après une erreur, nouvelle tentative ERROR_RETRY_MINUTES plus tard
+5. plan_refresh_order ne garde que les comptes dus (hors circuits ouverts), score décroissant
+"""
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.services import refresh_scheduler
+from app.services.circuit_breaker import account_key
+from app.services.refresh_scheduler import (
+    ACTIVE_CADENCE_HOURS,
+    ERROR_RETRY_MINUTES,
+    IDLE_CADENCE_HOURS,
+    NEVER_REFRESHED_SCORE,
+    NEXT_REFRESH_JITTER,
+    next_refresh_time,
+    plan_refresh_order,
+    schedule_after_error,
+    score_account,
+)
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+def _account(hours_ago=None, viewed_hours_ago=None, next_refresh_in=None, fb_account_id="act_1"):
+    return SimpleNamespace(
+        tenant_id=uuid4(),
+        fb_account_id=fb_account_id,
+        last_refresh_at=NOW - timedelta(hours=hours_ago) if hours_ago is not None else None,
+        last_viewed_at=NOW - timedelta(hours=viewed_hours_ago) if viewed_hours_ago is not None else None,
+        next_refresh_at=NOW + timedelta(hours=next_refresh_in) if next_refresh_in is not None else None,
+    )
+
+
+def test_score_formula():
+    signals = {"spend_7d": 99.0, "active_ads": 25}
+
+    plain = score_account(_account(hours_ago=4), signals, NOW)
+    viewed = score_account(_account(hours_ago=4, viewed_hours_ago=1), signals, NOW)
+    capped = score_account(_account(hours_ago=4), {"spend_7d": 99.0, "active_ads": 500}, NOW)
+
+    assert plain["score"] == pytest.approx(4 * (1 + math.log10(100)) * 1.5)
+    assert viewed["score"] == pytest.approx(2 * plain["score"])
+    assert capped["score"] == pytest.approx(4 * 3 * 2)  # active_ads plafonné à 50
+    assert score_account(_account(hours_ago=4), {"spend_7d": -5}, NOW)["score"] == pytest.approx(4)
+    assert score_account(_account(), {}, NOW)["score"] == NEVER_REFRESHED_SCORE
+
+
+def test_idle_accounts_use_daily_cadence():
+    idle = score_account(_account(hours_ago=3), {"spend_7d": 0, "active_ads": 0}, NOW)
+    viewed = score_account(_account(hours_ago=3, viewed_hours_ago=2), {}, NOW)
+    spending = score_account(_account(hours_ago=3), {"spend_7d": 1.0}, NOW)
+
+    assert idle["cadence_hours"] == IDLE_CADENCE_HOURS and not idle["due"]
+    assert viewed["cadence_hours"] == ACTIVE_CADENCE_HOURS and viewed["due"]
+    assert spending["cadence_hours"] == ACTIVE_CADENCE_HOURS and spending["due"]
+    assert score_account(_account(hours_ago=IDLE_CADENCE_HOURS), {}, NOW)["due"]
+    # Vue ancienne: ne compte plus comme "suivi"
+    assert score_account(_account(hours_ago=3, viewed_hours_ago=30), {}, NOW)["cadence_hours"] == IDLE_CADENCE_HOURS
+
+
+def test_next_refresh_at_overrides_staleness():
+    assert not score_account(_account(hours_ago=10, next_refresh_in=1), {"spend_7d": 10}, NOW)["due"]
+    assert score_account(_account(hours_ago=1, next_refresh_in=-0.1), {}, NOW)["due"]
+
+
+def test_next_refresh_jitter_bounds(monkeypatch):
+    low, high = (
+        NOW + timedelta(hours=ACTIVE_CADENCE_HOURS * (1 - NEXT_REFRESH_JITTER)),
+        NOW + timedelta(hours=ACTIVE_CADENCE_HOURS * (1 + NEXT_REFRESH_JITTER)),
+    )
+    monkeypatch.setattr(refresh_scheduler.random, "uniform", lambda a, b: a)
+    assert next_refresh_time(ACTIVE_CADENCE_HOURS, NOW) == low
+    monkeypatch.setattr(refresh_scheduler.random, "uniform", lambda a, b: b)
+    assert next_refresh_time(ACTIVE_CADENCE_HOURS, NOW) == high
+
+    monkeypatch.undo()
+    random.seed(0)
+    samples = [next_refresh_time(IDLE_CADENCE_HOURS, NOW) for _ in range(200)]
+    assert all(
+        NOW + timedelta(hours=IDLE_CADENCE_HOURS * (1 - NEXT_REFRESH_JITTER)) <= s
+        <= NOW + timedelta(hours=IDLE_CADENCE_HOURS * (1 + NEXT_REFRESH_JITTER))
+        for s in samples
+    )
+    assert len(set(samples)) > 1
+
+
+def test_error_backoff():
+    assert schedule_after_error(NOW) == NOW + timedelta(minutes=ERROR_RETRY_MINUTES)
+    assert ERROR_RETRY_MINUTES == 30
+
+
+@pytest.mark.asyncio
+async def test_plan_keeps_due_accounts_by_score(monkeypatch):
+    signals = {"act_big": {"spend_7d": 1000.0, "active_ads": 10}, "act_small": {"spend_7d": 1.0}}
+    monkeypatch.setattr(
+        refresh_scheduler, "load_account_signals",
+        lambda tenant_id, fb_account_id: signals.get(fb_account_id, {})
+    )
+    small = _account(hours_ago=3, fb_account_id="act_small")
+    big = _account(hours_ago=3, fb_account_id="act_big")
+    new = _account(fb_account_id="act_new")
+    fresh = _account(hours_ago=0.5, fb_account_id="act_fresh")
+    blocked = _account(hours_ago=48, fb_account_id="act_blocked")
+
+    plan = await plan_refresh_order(
+        [small, big, new, fresh, blocked], NOW,
+        open_circuits={account_key(blocked.tenant_id, "act_blocked")}
+    )
+
+    assert [s["account"].fb_account_id for s in plan] == ["act_new", "act_big", "act_small"]
@@ -0,0 +1,121 @@
+"""
+Test: Télémétrie des refresh (refresh_runs)
+
+Vérifie que:
+1. Les compteurs run_metrics sont collectés par les tâches filles du refresh
+   et isolés entre refresh parallèles
+2. add_run persiste les compteurs, et les agrégats par compte / par cycle
+   classent les comptes les plus coûteux
+3. La télémétrie au-delà de la rétention est purgée
+4. La durée estimée d'un compte suit son historique dans le mode attendu
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.services import refresh_telemetry
+from app.utils import run_metrics
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    for model in (models.Tenant, models.AdAccount, models.RefreshJob, models.RefreshRun):
+        model.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def tenant(db):
+    tenant = models.Tenant(name="Agency")
+    db.add(tenant)
+    db.commit()
+    return tenant
+
+
+@pytest.mark.asyncio
+async def test_metrics_follow_child_tasks_and_stay_isolated():
+    async def fetch_page():
+        await asyncio.sleep(0)
+        run_metrics.record("graph_pages")
+
+    async def fake_refresh(pages: int):
+        metrics, token = run_metrics.start_run()
+        try:
+            with run_metrics.stage("fetch"):
+                # Shards en parallèle: héritent du contexte du refresh
+                await asyncio.gather(*[asyncio.create_task(fetch_page()) for _ in range(pages)])
+            run_metrics.set_value("unique_ads", pages * 10)
+            return metrics
+        finally:
+            run_metrics.end_run(token)
+
+    small, large = await asyncio.gather(fake_refresh(2), fake_refresh(5))
+    run_metrics.record("graph_pages")  # Hors refresh: ignoré
+
+    assert small["graph_pages"] == 2 and large["graph_pages"] == 5
+    assert large["unique_ads"] == 50
+    assert "fetch_ms" in small
+
+
+def test_add_run_and_aggregates(db, tenant):
+    runs = [
+        ("act_big", "cron:2026-10-19T11:00", "ok", 90_000, 40),
+        ("act_big", "cron:2026-10-19T11:00", "error", 30_000, 10),
+        ("act_small", "cron:2026-10-19T11:00", "ok", 5_000, 2),
+    ]
+    for fb_account_id, cycle_id, status, total_ms, calls in runs:
+        started = NOW - timedelta(hours=1)
+        run = refresh_telemetry.add_run(
+            db, {"graph_calls": calls, "rows_fetched": 100, "bytes_written": 2048, "refresh_mode": "TAIL"},
+            tenant.id, fb_account_id, started, status, cycle_id=cycle_id, source="cron"
+        )
+        run.finished_at = started + timedelta(milliseconds=total_ms)
+        run.total_ms = total_ms
+    db.commit()
+
+    stored = db.execute(select(models.RefreshRun)).scalars().first()
+    assert stored.refresh_mode == "TAIL" and stored.fetch_ms == 0
+
+    accounts = refresh_telemetry.account_aggregates(db, NOW - timedelta(days=1))
+    assert [a["fb_account_id"] for a in accounts] == ["act_big", "act_small"]
+    assert accounts[0]["runs"] == 2 and accounts[0]["errors"] == 1
+    assert accounts[0]["total_ms"] == 120_000 and accounts[0]["graph_calls"] == 50
+
+    cycles = refresh_telemetry.cycle_aggregates(db, NOW - timedelta(days=1))
+    assert len(cycles) == 1
+    assert cycles[0]["runs"] == 3 and cycles[0]["bytes_written"] == 3 * 2048
+    assert cycles[0]["wall_ms"] == 90_000
+
+
+def test_cleanup_old_runs(db, tenant):
+    for age_days in (1, refresh_telemetry.REFRESH_RUN_RETENTION_DAYS + 1):
+        refresh_telemetry.add_run(db, {}, tenant.id, "act_1", NOW - timedelta(days=age_days), "ok")
+    db.commit()
+
+    assert refresh_telemetry.cleanup_old_runs(db, now=NOW) == 1
+    assert db.query(models.RefreshRun).count() == 1
+
+
+def test_estimate_account_seconds(db, tenant):
+    known = models.AdAccount(tenant_id=tenant.id, fb_account_id="act_known", last_refresh_at=NOW)
+    new = models.AdAccount(tenant_id=tenant.id, fb_account_id="act_new")
+    db.add_all([known, new])
+    db.commit()
+    for mode, total_ms in (("TAIL", 8_000), ("TAIL", 12_000), ("BASELINE", 300_000)):
+        run = refresh_telemetry.add_run(db, {"refresh_mode": mode}, tenant.id, "act_known", NOW, "ok")
+        run.total_ms = total_ms
+    db.commit()
+
+    estimates = refresh_telemetry.estimate_account_seconds(db, [known, new])
+
+    assert estimates[known.id] == 10
+    assert estimates[new.id] == refresh_telemetry.DEFAULT_BASELINE_SECONDS
@@ -0,0 +1,140 @@
+"""
+Test: Comptes partagés entre tenants (agence + client)
+
+Vérifie (SQLite en mémoire, faux serveur Graph, storage local) que:
+1. find_shared_accounts regroupe les tenants d'un même fb_account_id et
+   choisit comme leader un tenant au token valide, sans circuit ouvert
+2. Un compte partagé est fetché UNE fois (token du leader) puis ses fichiers
+   sont copiés dans le préfixe de chaque tenant, dont le last_refresh_at est mis à jour
+3. Premier BASELINE (taille inconnue): insights synchrones; un gros compte
+   bascule en rapport async sur "reduce the amount of data"
+"""
+import json
+from pathlib import Path
+
+import pytest
+from sqlalchemy import ARRAY, create_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.config import settings
+from app.services import meta_client as meta_client_module
+from app.services import refresher, storage
+from app.services.circuit_breaker import token_key
+from app.services.meta_client import MetaClient
+from app.services.refresher import BASELINE_DAYS, BASELINE_SHARD_DAYS
+from cron_refresh import find_shared_accounts
+from tests.fake_graph import FakeGraphServer, make_insight_rows
+
+SHARED = "act_shared"
+
+
+@compiles(ARRAY, "sqlite")
+def _array_as_json(type_, compiler, **kw):
+    # oauth_tokens.scopes (ARRAY PostgreSQL): non utilisé ici
+    return "JSON"
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    for model in (models.Tenant, models.User, models.AdAccount, models.OAuthToken, models.GraphCircuit):
+        model.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def tenants(db):
+    """Agence, client et second client (sans token Meta) connectés au même compte"""
+    agency, client, other = models.Tenant(name="Agency"), models.Tenant(name="Client"), models.Tenant(name="Other")
+    db.add_all([agency, client, other])
+    db.commit()
+    for tenant in (agency, client, other):
+        db.add(models.AdAccount(tenant_id=tenant.id, fb_account_id=SHARED, name="Shared"))
+    for tenant in (agency, client):
+        db.add(models.OAuthToken(
+            tenant_id=tenant.id,
+            provider="meta",
+            access_token=refresher.fernet.encrypt(f"token-{tenant.name}".encode()),
+        ))
+    db.add(models.AdAccount(tenant_id=agency.id, fb_account_id="act_agency_only"))
+    db.commit()
+    return agency, client, other
+
+
+@pytest.fixture
+def graph(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "STORAGE_MODE", "local")
+    monkeypatch.setattr(settings, "LOCAL_DATA_ROOT", str(tmp_path / "data"))
+    monkeypatch.setattr(settings, "INSIGHTS_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(meta_client_module, "ASYNC_REPORT_POLL_INITIAL_DELAY", 0.01)
+    with FakeGraphServer() as server:
+        server.accounts[SHARED] = make_insight_rows(SHARED, ads=4, days=5)
+        client = MetaClient()
+        client.base_url = server.base_url
+        monkeypatch.setattr(refresher, "meta_client", client)
+        yield server
+
+
+def _account_files(tenant_id):
+    root = Path(settings.LOCAL_DATA_ROOT) / "tenants" / str(tenant_id) / "accounts" / SHARED / "data"
+    return sorted(p.relative_to(root).as_posix() for p in root.rglob("*") if p.is_file())
+
+
+def test_find_shared_accounts_prefers_valid_token(db, tenants):
+    agency, client, other = tenants
+
+    # Token de l'agence révoqué (circuit ouvert), pas de token pour "Other"
+    shared = find_shared_accounts(db, [agency, client, other], {token_key(agency.id)})
+
+    assert shared == {SHARED: [str(client.id), str(agency.id), str(other.id)]}
+    assert find_shared_accounts(db, [agency, client, other])[SHARED][0] == str(agency.id)
+
+
+@pytest.mark.asyncio
+async def test_shared_account_fetched_once_and_mirrored(db, tenants, graph):
+    agency, client, other = tenants
+    result = await refresher.sync_account_data(
+        ad_account_id=SHARED,
+        tenant_id=client.id,
+        db=db,
+        mirror_tenant_ids=[agency.id, other.id],
+    )
+
+    # Un seul BASELINE (un appel insights par shard), aucun fetch pour les miroirs
+    assert graph.calls["insights"] == BASELINE_DAYS // BASELINE_SHARD_DAYS
+    assert graph.calls["async_create"] == 0
+    assert result["mirrored_tenants"] == [str(agency.id), str(other.id)]
+
+    leader_files = _account_files(client.id)
+    assert "baseline_daily.json" in leader_files
+    for tenant in (agency, other):
+        assert _account_files(tenant.id) == leader_files
+        assert storage.get_object(f"tenants/{tenant.id}/accounts/{SHARED}/data/baseline_daily.json") == \
+            storage.get_object(f"tenants/{client.id}/accounts/{SHARED}/data/baseline_daily.json")
+
+    db.expire_all()
+    refreshed = {
+        account.tenant_id: account.last_refresh_at
+        for account in db.query(models.AdAccount).filter(models.AdAccount.fb_account_id == SHARED)
+    }
+    assert all(refreshed.values())
+    assert len(set(refreshed.values())) == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_size_baseline_is_sync_with_reduce_data_fallback(db, tenants, graph):
+    agency, _, _ = tenants
+    graph.reduce_data_over_rows = 5  # Compte plus gros que prévu: chaque shard refusé en synchrone
+
+    await refresher.sync_account_data(ad_account_id=SHARED, tenant_id=agency.id, db=db)
+
+    # Tous les shards en synchrone d'abord; seul le shard qui contient les rows
+    # (5 derniers jours) dépasse la limite: pages réduites, puis rapport async
+    assert graph.calls["insights"] > BASELINE_DAYS // BASELINE_SHARD_DAYS
+    assert graph.calls["async_create"] == 1
+    baseline = json.loads(storage.get_object(f"tenants/{agency.id}/accounts/{SHARED}/data/baseline_daily.json"))
+    assert len(baseline["daily_ads"]) == len(graph.accounts[SHARED])
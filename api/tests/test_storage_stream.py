@@ -0,0 +1,156 @@
+"""
+Test: Écriture JSON en streaming (storage.put_json_stream)
+
+Vérifie que:
+1. iter_json_chunks produit exactement json.dumps(obj, separators=(',', ':'))
+   (objets imbriqués, vides, unicode)
+2. Local: une erreur en cours de stream ne laisse ni objet partiel ni fichier
+   temporaire, et l'ancien objet reste intact
+3. R2: l'objet est envoyé en multipart par parts, et une erreur en cours de
+   stream annule l'upload (abort, pas de complete)
+"""
+import json
+
+import pytest
+
+from app.config import settings
+from app.services import storage
+
+PAYLOADS = [
+    {"metadata": {"reference_date": "2026-10-19", "nested": {"a": [1, 2.5, None, True]}},
+     "daily_ads": [{"ad_id": "1", "spend": 1.25, "tags": ["x", {"y": []}]}, {"ad_id": "2"}]},
+    {},
+    [],
+    {"empty_list": [], "empty_dict": {}, "rows": [[], {}]},
+    {"café": "crème brûlée", "emoji": "🚀", "rows": ["naïve", {"clé": "日本語"}]},
+    {1: "int key", "s": "quote \" and \\ backslash"},
+    "scalar",
+    42,
+]
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+@pytest.mark.parametrize("depth", [0, 1, 2, 5])
+def test_chunks_match_json_dumps(payload, depth):
+    expected = json.dumps(payload, separators=(',', ':'))
+    assert "".join(storage.iter_json_chunks(payload, depth)) == expected
+    assert b"".join(c.encode("utf-8") for c in storage.iter_json_chunks(payload, depth)) == expected.encode("utf-8")
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_MODE", "local")
+    monkeypatch.setattr(settings, "LOCAL_DATA_ROOT", str(tmp_path))
+    return tmp_path
+
+
+def test_local_stream_writes_full_object(local_storage):
+    payload = PAYLOADS[0]
+    written = storage.put_json_stream("tenants/t/accounts/act_1/data/baseline.json", payload)
+
+    data = storage.get_object("tenants/t/accounts/act_1/data/baseline.json")
+    assert written == len(data)
+    assert json.loads(data) == payload
+
+
+def test_local_stream_error_leaves_no_partial_file(local_storage):
+    key = "tenants/t/accounts/act_1/data/baseline.json"
+    storage.put_object(key, b'{"old":true}')
+
+    # Valeur non sérialisable au milieu des daily_ads: échec après les premiers chunks
+    broken = {"metadata": {}, "daily_ads": [{"ad_id": "1"}, object(), {"ad_id": "3"}]}
+    with pytest.raises(storage.StorageError):
+        storage.put_json_stream(key, broken)
+
+    assert storage.get_object(key) == b'{"old":true}'
+    assert [p.name for p in (local_storage / key).parent.iterdir()] == ["baseline.json"]
+
+    with pytest.raises(storage.StorageError):
+        storage.put_json_stream("tenants/t/accounts/act_1/data/new.json", broken)
+    assert not storage.object_exists("tenants/t/accounts/act_1/data/new.json")
+    assert [p.name for p in (local_storage / key).parent.iterdir()] == ["baseline.json"]
+
+
+class FakeS3:
+    """Client S3 minimal: enregistre les appels multipart"""
+
+    def __init__(self, fail_on_part=None):
+        self.fail_on_part = fail_on_part
+        self.parts = []
+        self.objects = {}
+        self.completed = False
+        self.aborted = False
+
+    def create_multipart_upload(self, **kwargs):
+        return {"UploadId": "upload-1"}
+
+    def upload_part(self, PartNumber, Body, **kwargs):
+        if PartNumber == self.fail_on_part:
+            raise RuntimeError("connection reset")
+        self.parts.append(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Key, MultipartUpload, **kwargs):
+        assert [p["PartNumber"] for p in MultipartUpload["Parts"]] == list(range(1, len(self.parts) + 1))
+        self.objects[Key] = b"".join(self.parts)
+        self.completed = True
+
+    def abort_multipart_upload(self, **kwargs):
+        self.aborted = True
+
+    def put_object(self, Key, Body, **kwargs):
+        self.objects[Key] = Body
+
+
+@pytest.fixture
+def r2_storage(monkeypatch):
+    def _install(fake):
+        monkeypatch.setattr(settings, "STORAGE_MODE", "r2")
+        monkeypatch.setattr(storage, "_s3_client", fake)
+        monkeypatch.setattr(storage, "STREAM_PART_SIZE", 64)
+        return fake
+    return _install
+
+
+def _rows(count):
+    return {"metadata": {"n": count}, "daily_ads": [{"ad_id": str(i), "spend": i * 1.5} for i in range(count)]}
+
+
+def test_r2_stream_uploads_parts(r2_storage):
+    fake = r2_storage(FakeS3())
+    payload = _rows(50)
+
+    written = storage.put_json_stream("key.json", payload)
+
+    assert fake.completed and not fake.aborted
+    assert len(fake.parts) > 2
+    assert all(len(part) >= 64 for part in fake.parts[:-1])
+    assert fake.objects["key.json"] == json.dumps(payload, separators=(',', ':')).encode("utf-8")
+    assert written == len(fake.objects["key.json"])
+
+
+def test_r2_small_object_single_put(r2_storage):
+    fake = r2_storage(FakeS3())
+
+    storage.put_json_stream("small.json", {"a": 1})
+
+    assert fake.objects["small.json"] == b'{"a":1}'
+    assert fake.parts == [] and not fake.completed
+
+
+@pytest.mark.parametrize("failure", ["upload", "serialization"])
+def test_r2_stream_error_aborts_multipart(r2_storage, failure):
+    if failure == "upload":
+        fake = r2_storage(FakeS3(fail_on_part=3))
+        payload = _rows(50)
+    else:
+        fake = r2_storage(FakeS3())
+        payload = _rows(50)
+        payload["daily_ads"][40] = object()
+
+    with pytest.raises(storage.StorageError):
+        storage.put_json_stream("key.json", payload)
+
+    assert fake.aborted
+    assert not fake.completed
+    assert "key.json" not in fake.objects